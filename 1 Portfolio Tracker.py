@@ -1,66 +1,85 @@
 import streamlit as st
 import pandas as pd
-import yfinance as yf
-import json
-import matplotlib.pyplot as plt
-from utils import highlight_gains  
-from datetime import datetime
+from utils import highlight_gains, get_earnings_date
+from pages.helper.apiCall import UNCLASSIFIED, get_symbol_metadata
+from pages.helper.charts import allocation_pie, correlation_heatmap, line_chart, percentile_bands, value_chart
+from pages.helper.concurrency import map_concurrently
+from pages.helper.costBasis import COST_BASIS_METHODS
+from pages.helper.ledger import load_past_trades
+from pages.helper.optimizer import OBJECTIVES, estimate_moments, optimize_weights, portfolio_statistics, rebalance_trades
+from pages.helper.portfolio import drawdown, get_nav
+from pages.helper.priceStore import get_price_store, get_quotes
+from pages.helper.rateLimit import show_rate_limit_usage
+from pages.helper.returns import grouped_xirr, portfolio_returns, ticker_flows
+from pages.helper.risk import BENCHMARK, compute_risk
+from pages.helper.simulation import SIMULATION_METHODS, simulate_portfolio
+from pages.helper.transactionLog import EVENT_TYPES, append_transaction, load_positions, load_transactions
+from pages.helper.utils import get_secret
+
+EARNINGS_MAX_WORKERS = 8 # number of earnings calendars fetched at the same time
+EARNINGS_TIMEOUT = 10 # seconds allowed for each calendar lookup
+SIMULATION_PROCESSES = get_secret("SIMULATION_PROCESSES") # worker processes for large simulations, None runs in-process
 
 
 # --- Load and Process Trades Data ---
-with open("data/trades.json") as f:
-    trades_data = json.load(f)
-
-rows = []
-for trade in trades_data:
-    rows.append({
-        "Ticker": trade["ticker"],
-        "Company": trade["company"],
-        "Date": trade["date"],
-        "Shares": float(trade["shares"]),
-        "Cost/Share": float(trade["cost_share"])
-    })
-df_trades = pd.DataFrame(rows)
+# Aggregate open lots by Ticker using the selected cost basis method (share-weighted, not a plain mean of lot prices)
+cost_basis_method = st.sidebar.selectbox(
+    "Cost basis method", list(COST_BASIS_METHODS), format_func=COST_BASIS_METHODS.get
+)
+# Record a new transaction in the log before positions are loaded, so it shows up in this run
+with st.sidebar.expander("Record a transaction"):
+    with st.form("record_transaction", clear_on_submit=True):
+        event_type = st.selectbox("Type", EVENT_TYPES, format_func=str.capitalize)
+        event_ticker = st.text_input("Ticker").strip().upper()
+        event_date = st.date_input("Date")
+        event_shares = st.number_input("Shares (buy or sell)", min_value=0.0, step=1.0)
+        event_price = st.number_input("Price per share (buy or sell)", min_value=0.0, step=0.01)
+        event_amount = st.number_input("Amount (dividend)", min_value=0.0, step=0.01)
+        event_ratio = st.number_input("New shares per old share (split)", min_value=0.0, step=1.0)
+        if st.form_submit_button("Record"):
+            fields = {
+                "buy": {"shares": event_shares, "price": event_price},
+                "sell": {"shares": event_shares, "price": event_price},
+                "dividend": {"amount": event_amount},
+                "split": {"ratio": event_ratio},
+            }[event_type]
+            if not event_ticker or not all(value > 0 for value in fields.values()):
+                st.error(f"A {event_type} needs a ticker and {' and '.join(fields)} greater than zero.")
+            else:
+                try:
+                    append_transaction(event_type, event_ticker, event_date, **fields)
+                    st.success(f"Recorded {event_type} of {event_ticker}.")
+                except ValueError as e:
+                    st.error(str(e))
 
-# Aggregate trades by Ticker
-aggregated = df_trades.groupby("Ticker").agg({
-    "Shares": "sum",
-    "Cost/Share": "mean"
-}).reset_index()
+# Positions come from the last snapshot of the transaction log plus the events recorded after it
+positions = load_positions(cost_basis_method)
+cash_balance = st.sidebar.number_input(
+    "Cash balance ($)", min_value=0.0, value=float(get_secret("CASH_BALANCE", 200)), step=50.0
+)
+# Requests made to each data provider by this server, and how often they were throttled
+show_rate_limit_usage()
+aggregated = positions.holdings().reset_index()
+aggregated = aggregated.loc[aggregated["Shares"] > 0, ["Ticker", "Shares", "Cost/Share", "Realized Gain"]].reset_index(drop=True)
 
 # --- Fetch Market Data ---
 tickers = list(aggregated["Ticker"])
-# Fetch data for all tickers at once, or handle empty tickers list if no trades exist
-if tickers:
-    data = yf.download(tickers, progress=False, group_by='ticker')
-else:
-    data = pd.DataFrame() # Empty DataFrame if no tickers
+# Bring the local price store up to date (only bars after the last stored date are downloaded)
+# Every ticker ever traded is kept up to date, so past positions can be revalued for the portfolio value history
+transactions = load_transactions()
+traded_tickers = list(dict.fromkeys(transactions.loc[transactions["Type"].isin(["buy", "sell"]), "Ticker"]))
+price_store = get_price_store()
+if traded_tickers:
+    price_store.refresh(traded_tickers + [BENCHMARK], start=transactions["Date"].min().strftime("%Y-%m-%d"))
 
-latest_prices = []
-earnings_dates = []
+# Latest prices come from the short-lived quote cache, falling back to the last stored close
+latest_prices = get_quotes(tickers).fillna(0.0).tolist() # Default if no data
 
-for ticker in tickers:
-    if ticker in data.columns: # Check if ticker data exists
-        price = data[ticker]['Close'][-1]
-        latest_prices.append(price)
-    else:
-        latest_prices.append(0.0) # Default if no data
-
-    t = yf.Ticker(ticker)
-    try:
-        cal = t.calendar
-        if isinstance(cal, dict):
-            ed = cal.get("Earnings Date", ["N/A"])
-            earnings_date = ed[0] if isinstance(ed, list) else ed
-        elif isinstance(cal, pd.DataFrame):
-            # Ensure index exists before accessing
-            earnings_date = cal.loc["Earnings Date"].values[0] if "Earnings Date" in cal.index else "N/A"
-        else:
-            earnings_date = "N/A"
-    except:
-        earnings_date = "N/A"
-
-    earnings_dates.append(str(earnings_date))
+# Look up all earnings calendars at once instead of one ticker after another
+earnings_dates = map_concurrently(
+    get_earnings_date, tickers,
+    max_workers=EARNINGS_MAX_WORKERS, timeout=EARNINGS_TIMEOUT, default="N/A"
+)
 
 aggregated["Market Price"] = latest_prices
 aggregated["Total Value"] = aggregated["Shares"] * aggregated["Market Price"]
@@ -69,6 +88,10 @@ aggregated["Gain $"] = aggregated["Total Value"] - aggregated["Total Cost"]
 aggregated["Gain %"] = (aggregated["Gain $"] / aggregated["Total Cost"]) * 100
 aggregated["Earnings Date"] = earnings_dates
 
+# Money-weighted return of every ticker (purchases, sales, dividends and the current value), solved in one batch
+ticker_irr = grouped_xirr(ticker_flows(transactions, aggregated.set_index("Ticker")["Total Value"]))
+aggregated["IRR %"] = aggregated["Ticker"].map(ticker_irr) * 100
+
 # --- Streamlit App Layout ---
 
 st.title("Tony's Portfolio Tracker") # As you shared with me your portfolio website is tonynguyen.info, this app name suits well with your current investment goals.
@@ -82,74 +105,197 @@ total_portfolio_cost = aggregated["Total Cost"].sum()
 total_portfolio_gain_loss = total_portfolio_value - total_portfolio_cost
 
 # Select and sort columns for display
-display_columns = ["Ticker", "Cost/Share", "Market Price", "Gain %", "Earnings Date"]
+display_columns = ["Ticker", "Cost/Share", "Market Price", "Gain %", "IRR %", "Earnings Date"]
 portfolio_display = aggregated[display_columns].sort_values(by="Gain %", ascending=False)
 
-styled = portfolio_display.round(2).style.applymap(highlight_gains, subset=["Gain %"])
+styled = portfolio_display.round(2).style.applymap(highlight_gains, subset=["Gain %", "IRR %"])
 st.dataframe(styled.format({
     "Cost/Share": "{:.2f}",
     "Market Price": "{:.2f}",
-    "Gain %": "{:.1f}%"
-}), hide_index=True)
+    "Gain %": "{:.1f}%",
+    "IRR %": "{:.1f}%"
+}, na_rep="N/A"), hide_index=True)
+
+# Daily portfolio value, extended from the cached series with the days since the last run
+nav = get_nav(transactions, price_store)
+
+if not nav.empty:
+    st.subheader("Portfolio Value")
+    # Figures are memoized on their data, so they are only rebuilt when a new day is added
+    st.plotly_chart(value_chart(nav[["NAV", "Cost Basis"]], drawdown(nav["NAV"])), use_container_width=True)
+
+    # Time-weighted return ignores the timing of deposits, money-weighted return (XIRR) includes it
+    returns = portfolio_returns(nav)
+    twr_col, annual_col, xirr_col = st.columns(3)
+    twr_col.metric("Time-Weighted Return", f"{returns['TWR'] * 100:.1f}%")
+    annual_col.metric("Annualized TWR", f"{returns['Annualized TWR'] * 100:.1f}%")
+    xirr_col.metric("Money-Weighted Return (XIRR)", f"{returns['XIRR'] * 100:.1f}%")
+
+# Risk statistics only change when the holdings or the day change, so reruns reuse them
+@st.cache_data(show_spinner=False)
+def risk_report(holdings, as_of):
+    shares = pd.Series(dict(holdings))
+    closes = price_store.close_matrix(shares.index).loc[:as_of]
+    return compute_risk(closes, shares, price_store.history(BENCHMARK)["Close"].loc[:as_of])
+
+st.subheader("Risk")
+try:
+    holdings = tuple(aggregated[["Ticker", "Shares"]].itertuples(index=False, name=None))
+    risk = risk_report(holdings, pd.Timestamp.today().strftime("%Y-%m-%d"))
+
+    confidence = f"{risk.confidence:.0%}"
+    vol_col, beta_col, var_col, cvar_col, dd_col = st.columns(5)
+    vol_col.metric("Volatility (ann.)", f"{risk.volatility['Portfolio']:.1%}")
+    beta_col.metric(f"Beta vs {BENCHMARK}", f"{risk.beta['Portfolio']:.2f}")
+    var_col.metric(f"1-Day VaR {confidence}", f"${risk.var.loc['Portfolio', 'Historical'] * risk.value:,.0f}",
+                   f"{risk.var.loc['Portfolio', 'Parametric']:.1%} parametric", delta_color="off")
+    cvar_col.metric(f"1-Day CVaR {confidence}", f"${risk.cvar.loc['Portfolio', 'Historical'] * risk.value:,.0f}",
+                    f"{risk.cvar.loc['Portfolio', 'Parametric']:.1%} parametric", delta_color="off")
+    dd_col.metric("Max Drawdown", f"{risk.max_drawdown['Portfolio']:.1%}")
+
+    with st.expander("Risk details"):
+        risk_table = pd.DataFrame({
+            "Weight": risk.weights,
+            "Volatility": risk.volatility,
+            "Beta": risk.beta,
+            "VaR (Historical)": risk.var["Historical"],
+            "CVaR (Historical)": risk.cvar["Historical"],
+            "Max Drawdown": risk.max_drawdown,
+        })
+        st.dataframe(risk_table.style.format({
+            "Weight": "{:.1%}", "Volatility": "{:.1%}", "Beta": "{:.2f}",
+            "VaR (Historical)": "{:.2%}", "CVaR (Historical)": "{:.2%}", "Max Drawdown": "{:.1%}"
+        }, na_rep="N/A"))
+
+        st.plotly_chart(line_chart(risk.rolling_volatility, "Rolling Volatility (annualized %)", scale=100),
+                        use_container_width=True)
+        st.plotly_chart(correlation_heatmap(risk.correlation), use_container_width=True)
+except ValueError as e:
+    st.info(f"Risk statistics are not available: {e}")
+
+# Simulated paths are reused until the holdings, the day or the settings change
+@st.cache_data(show_spinner=False, max_entries=4)
+def simulation(holdings, as_of, method, n_paths, horizon):
+    shares = pd.Series(dict(holdings))
+    closes = price_store.close_matrix(shares.index).loc[:as_of]
+    return simulate_portfolio(closes, shares, n_paths=n_paths, horizon=horizon, method=method,
+                              processes=SIMULATION_PROCESSES)
+
+with st.expander("Monte Carlo Simulation"):
+    with st.form("simulation"):
+        method_col, paths_col, horizon_col = st.columns(3)
+        simulation_method = method_col.selectbox("Method", list(SIMULATION_METHODS), format_func=SIMULATION_METHODS.get)
+        n_paths = paths_col.select_slider("Paths", options=[10_000, 25_000, 50_000, 100_000], value=100_000)
+        horizon = horizon_col.slider("Horizon (trading days)", min_value=21, max_value=756, value=252, step=21)
+        run_simulation = st.form_submit_button("Run simulation")
+
+    if run_simulation:
+        try:
+            holdings = tuple(aggregated[["Ticker", "Shares"]].itertuples(index=False, name=None))
+            with st.spinner("Simulating..."):
+                result = simulation(holdings, pd.Timestamp.today().strftime("%Y-%m-%d"), simulation_method, n_paths, horizon)
+
+            summary = result.summary()
+            median_col, low_col, loss_col, dd_col = st.columns(4)
+            median_col.metric("Median Terminal Value", f"${summary.loc['P50', 'Terminal Value']:,.0f}",
+                              f"{summary.loc['P50', 'Return']:.1%}")
+            low_col.metric("5th Percentile Value", f"${summary.loc['P5', 'Terminal Value']:,.0f}",
+                           f"{summary.loc['P5', 'Return']:.1%}")
+            loss_col.metric("Probability of Loss", f"{result.probability_of_loss():.1%}")
+            dd_col.metric("Median Max Drawdown", f"{summary.loc['P50', 'Max Drawdown']:.1%}")
+
+            st.plotly_chart(percentile_bands(result.bands()), use_container_width=True)
+
+            st.dataframe(summary.style.format({
+                "Terminal Value": "${:,.0f}", "Return": "{:.1%}", "Max Drawdown": "{:.1%}"
+            }))
+        except ValueError as e:
+            st.info(f"Simulation is not available: {e}")
 
 # 2. Sector Diversification Chart
-sector_map = {
-    "NU": "Financials",
-    "GOOG": "Communication Services",
-    "TSM": "Technology",
-    "CVS": "Healthcare",
-    "GXO": "Industrials",
-    "WMT": "Consumer Staples",
-    "CWAN": "Technology",
-}
-
-aggregated["Sector"] = aggregated["Ticker"].map(sector_map)
-# Filter out rows where sector is NaN (if a ticker is not mapped)
-sector_alloc = aggregated.dropna(subset=["Sector"]).groupby("Sector")["Total Cost"].sum()
-
-sector_alloc.loc["Cash"] = 200
+# Sector and industry come from the long-lived symbol metadata cache, fetched in one batch for every ticker traded
+@st.cache_data(ttl=60*60, show_spinner=False)
+def symbol_metadata(symbols):
+    return get_symbol_metadata(list(symbols))
 
+metadata = symbol_metadata(tuple(traded_tickers))
+aggregated["Sector"] = aggregated["Ticker"].map(metadata["Sector"]).fillna(UNCLASSIFIED)
+aggregated["Industry"] = aggregated["Ticker"].map(metadata["Industry"]).fillna(UNCLASSIFIED)
+sector_alloc = aggregated.groupby("Sector")["Total Cost"].sum()
+
+if cash_balance > 0:
+    sector_alloc.loc["Cash"] = cash_balance
+
+st.subheader("Sector Diversification")
 if not sector_alloc.empty:
-    fig, ax = plt.subplots()
-    ax.pie(sector_alloc, labels=sector_alloc.index, autopct="%1.1f%%")
-    ax.set_title("Sector Diversification")
-    st.subheader("Sector Diversification")
-    st.pyplot(fig)
+    st.plotly_chart(allocation_pie(sector_alloc), use_container_width=True)
 else:
-    st.subheader("Sector Diversification")
-    st.info("No mapped sectors to display diversification chart.")
+    st.info("No sectors to display diversification chart.")
+
+# Expected returns and covariance are estimated once per set of holdings and day, so moving a slider only re-solves
+@st.cache_data(show_spinner=False)
+def return_moments(tickers, as_of):
+    return estimate_moments(price_store.close_matrix(tickers).loc[:as_of])
+
+with st.expander("Rebalancing Optimizer"):
+    try:
+        mean_returns, covariance = return_moments(tuple(tickers), pd.Timestamp.today().strftime("%Y-%m-%d"))
+        objective_col, weight_col, sector_col, rf_col = st.columns(4)
+        objective = objective_col.selectbox("Objective", list(OBJECTIVES), format_func=OBJECTIVES.get)
+        max_weight = weight_col.slider("Max weight per holding", 0.05, 1.0, 0.4, 0.05)
+        sector_cap = sector_col.slider("Max weight per sector", 0.05, 1.0, 0.5, 0.05)
+        risk_free = rf_col.number_input("Risk-free rate (%)", 0.0, 20.0, 4.0, 0.25) / 100
+
+        sectors = aggregated.set_index("Ticker")["Sector"]
+        # Holdings without a known sector are not grouped together under the cap
+        sector_caps = {sector: sector_cap for sector in sectors.unique() if sector != UNCLASSIFIED}
+
+        # Start from the last solution for this objective, so a small change converges in a few iterations
+        previous_weights = st.session_state.setdefault("optimizer_weights", {})
+        target_weights = optimize_weights(
+            mean_returns, covariance, objective, sectors=sectors, sector_caps=sector_caps,
+            max_weight=max_weight, risk_free=risk_free, initial=previous_weights.get(objective)
+        )
+        previous_weights[objective] = target_weights
+
+        stats = portfolio_statistics(target_weights, mean_returns, covariance, risk_free)
+        return_col, vol_col, sharpe_col = st.columns(3)
+        return_col.metric("Expected Return (ann.)", f"{stats['Expected Return']:.1%}")
+        vol_col.metric("Volatility (ann.)", f"{stats['Volatility']:.1%}")
+        sharpe_col.metric("Sharpe Ratio", f"{stats['Sharpe Ratio']:.2f}")
+
+        trades = rebalance_trades(
+            aggregated.set_index("Ticker")["Shares"], aggregated.set_index("Ticker")["Market Price"],
+            target_weights, cash=cash_balance
+        )
+        trades["Risk Contribution"] = stats["Risk Contribution"]
+        st.dataframe(trades[["Current Weight", "Target Weight", "Risk Contribution", "Trade Shares", "Trade Value"]]
+                     .style.format({
+                         "Current Weight": "{:.1%}", "Target Weight": "{:.1%}", "Risk Contribution": "{:.1%}",
+                         "Trade Shares": "{:+.2f}", "Trade Value": "${:+,.2f}"
+                     }, na_rep="N/A"))
+    except ValueError as e:
+        st.info(f"Optimizer is not available: {e}")
 
 # --- 3. Past Performance Analysis Section (using pasttrades.json) ---
 st.subheader("Past Performance Analysis")
 
 try:
-    with open("data/pasttrades.json") as f:
-        past_trades_data = json.load(f)
-
-    past_trades_rows = []
-    for trade in past_trades_data:
-        entry_price = float(trade["entry_price"])
-        sell_price = float(trade["sell_price"])
-        share_number = float(trade["share_number"])
-
-        # Calculate Gain % for this specific trade
-        gain_percent = ((sell_price - entry_price) / entry_price) * 100 if entry_price > 0 else 0
-
-
-        # Calculate Holding Period
-        entry_date_dt = datetime.strptime(trade["entry_date"], "%Y-%m-%d")
-        sell_date_dt = datetime.strptime(trade["sell_date"], "%Y-%m-%d")
-        holding_period_days = (sell_date_dt - entry_date_dt).days
-
-        past_trades_rows.append({
-            "Ticker": trade["ticker"],
-            "Entry Date": trade["entry_date"],
-            "Sell Date": trade["sell_date"],
-            "Cost/Share": entry_price,
-            "Holding Periods": F"{holding_period_days} days",
-            "Gain %": gain_percent
-        })
-    df_past_trades = pd.DataFrame(past_trades_rows)
+    past_trades = load_past_trades()
+
+    # Calculate Gain % and Holding Period for every trade at once
+    entry_price = past_trades["Entry Price"]
+    gain_percent = ((past_trades["Sell Price"] - entry_price) / entry_price * 100).where(entry_price > 0, 0)
+    holding_period_days = (past_trades["Sell Date"] - past_trades["Entry Date"]).dt.days
+
+    df_past_trades = pd.DataFrame({
+        "Ticker": past_trades["Ticker"],
+        "Entry Date": past_trades["Entry Date"].dt.strftime("%Y-%m-%d"),
+        "Sell Date": past_trades["Sell Date"].dt.strftime("%Y-%m-%d"),
+        "Cost/Share": entry_price,
+        "Holding Periods": holding_period_days.astype(str) + " days",
+        "Gain %": gain_percent
+    })
 
     if not df_past_trades.empty:
         df_past_trades_display = df_past_trades.sort_values(by="Gain %", ascending=False)
@@ -173,7 +319,7 @@ try:
 
 except FileNotFoundError:
     st.error("Error: 'data/pasttrades.json' not found. Please create the file with the correct format.")
-except json.JSONDecodeError:
+except ValueError:
     st.error("Error: Could not read 'data/pasttrades.json'. Please check its JSON format.")
 except Exception as e:
     st.error(f"An unexpected error occurred while processing past trades: {e}")
@@ -19,37 +19,39 @@ from pages.helper.apiCall import (
     get_company_info, get_income_statement, get_balance_sheet,
     get_stock_price, get_financial_ratios, get_key_metrics, get_cash_flow
 )
+from pages.helper.concurrency import run_concurrently
+from pages.helper.rateLimit import show_rate_limit_usage
 
 
 
-# Define caching functions for each API call
-@st.cache_data(ttl=60*60*24*30) # cache output for 30 days
+# Define in-memory caching functions for each API call (the API helpers also keep a shared cache on disk)
+@st.cache_data(ttl=60*60) # cache output for 1 hour
 def company_info(symbol):
     return get_company_info(symbol)
 
-@st.cache_data(ttl=60*60*24*30) # cache output for 30 days
-def income_statement(symbol):
-    return get_income_statement(symbol)
+@st.cache_data(ttl=60*60) # cache output for 1 hour
+def income_statement(symbol, period, limit):
+    return get_income_statement(symbol, period, limit)
 
-@st.cache_data(ttl=60*60*24*30) # cache output for 30 days
-def balance_sheet(symbol):
-    return get_balance_sheet(symbol)
+@st.cache_data(ttl=60*60) # cache output for 1 hour
+def balance_sheet(symbol, period, limit):
+    return get_balance_sheet(symbol, period, limit)
 
-@st.cache_data(ttl=60*60*24*30) # cache output for 30 days
+@st.cache_data(ttl=60*60) # cache output for 1 hour
 def stock_price(symbol):
     return get_stock_price(symbol)
 
-@st.cache_data(ttl=60*60*24*30) # cache output for 30 days
-def financial_ratios(symbol):
-    return get_financial_ratios(symbol)
+@st.cache_data(ttl=60*60) # cache output for 1 hour
+def financial_ratios(symbol, period, limit):
+    return get_financial_ratios(symbol, period, limit)
 
-@st.cache_data(ttl=60*60*24*30) # cache output for 30 days
-def key_metrics(symbol):
-    return get_key_metrics(symbol)
+@st.cache_data(ttl=60*60) # cache output for 1 hour
+def key_metrics(symbol, period, limit):
+    return get_key_metrics(symbol, period, limit)
 
-@st.cache_data(ttl=60*60*24*30) # cache output for 30 days
-def cash_flow(symbol):
-    return get_cash_flow(symbol)
+@st.cache_data(ttl=60*60) # cache output for 1 hour
+def cash_flow(symbol, period, limit):
+    return get_cash_flow(symbol, period, limit)
 
 # Configure the app page
 st.set_page_config(
@@ -66,6 +68,9 @@ def delta(df,key):
 # Configure the menu and footer with the user's information
 config_menu_footer()
 
+# Show the requests made to each data provider by this server
+show_rate_limit_usage()
+
 # Display the app title
 st.title("Company Analysis 📈")
 
@@ -81,6 +86,14 @@ def callback():
 # Create a text input field for the user to enter a stock ticker
 symbol_input = st.text_input("Enter a stock ticker").upper()
 
+# Choose the reporting period and how many of the most recent reports to show
+period_col, limit_col = st.columns(2)
+with period_col:
+    period_input = st.radio('Reporting period', ['annual', 'quarter'], format_func=str.title, horizontal=True)
+with limit_col:
+    limit_input = st.number_input('Number of reports', min_value=2, max_value=20, value=5, step=1)
+axis_title = 'Year' if period_input == 'annual' else 'Quarter'
+
 # Check if the "Go" button has been clicked
 if st.button('Go',on_click=callback) or st.session_state['btn_clicked']:
 
@@ -89,22 +102,32 @@ if st.button('Go',on_click=callback) or st.session_state['btn_clicked']:
         st.warning('Please input a ticker.')
         st.stop()
 
-    try:
-        # Call the API functions to get the necessary data for the dashboard
-        company_data = get_company_info(symbol_input)
-        metrics_data = key_metrics(symbol_input)
-        income_data = income_statement(symbol_input)
-        income_data = income_data.sort_index(ascending=True)
-        performance_data = stock_price(symbol_input)
-        ratios_data = financial_ratios(symbol_input)
-        balance_sheet_data = balance_sheet(symbol_input)
-        balance_sheet_data = balance_sheet_data.sort_index(ascending=True)
-        cashflow_data = cash_flow(symbol_input)
-
-    except Exception as e: # Modified to capture and display exception
+    # Call the API functions at the same time to get the necessary data for the dashboard
+    with st.spinner('Loading financial data...'):
+        bundle = run_concurrently({
+            'Company Info': lambda: company_info(symbol_input),
+            'Key Metrics': lambda: key_metrics(symbol_input, period_input, limit_input),
+            'Income Statement': lambda: income_statement(symbol_input, period_input, limit_input),
+            'Market Performance': lambda: stock_price(symbol_input),
+            'Financial Ratios': lambda: financial_ratios(symbol_input, period_input, limit_input),
+            'Balance Sheet': lambda: balance_sheet(symbol_input, period_input, limit_input),
+            'Cash Flow': lambda: cash_flow(symbol_input, period_input, limit_input),
+        }, timeout=30)
+
+    # Every dataset is needed by the dashboard, so report each one that could not be loaded
+    if bundle.errors:
         st.error('Not possible to retrieve data for that ticker. Please check if its valid and try again.')
-        st.exception(e) # Display the full exception traceback in Streamlit
-        st.stop() # Use st.stop() instead of sys.exit() for Streamlit apps
+        for name, error in bundle.errors.items():
+            st.caption(f"{name}: {error}")
+        st.stop()
+
+    company_data = bundle.get('Company Info')
+    metrics_data = bundle.get('Key Metrics')
+    income_data = bundle.get('Income Statement').sort_index(ascending=True)
+    performance_data = bundle.get('Market Performance')
+    ratios_data = bundle.get('Financial Ratios')
+    balance_sheet_data = bundle.get('Balance Sheet').sort_index(ascending=True)
+    cashflow_data = bundle.get('Cash Flow')
 
     # Display dashboard
     empty_lines(2)
@@ -408,7 +431,7 @@ if st.button('Go',on_click=callback) or st.session_state['btn_clicked']:
         fig.update_layout(
             dragmode='pan',
             xaxis=dict( # Configure X-axis for Years
-                title="Year", # Title for the X-axis
+                title=axis_title, # Title for the X-axis
                 fixedrange=True,
                 tickmode='array',
                 tickvals=income_data.index # Ensures all years in the index are displayed as ticks
@@ -467,7 +490,7 @@ if st.button('Go',on_click=callback) or st.session_state['btn_clicked']:
         fig_expenses.update_layout(
             barmode='stack', # This is key for a stacked bar chart
             xaxis=dict(
-                title="Year",
+                title=axis_title,
                 tickmode='array',
                 tickvals=income_data.index,
                 fixedrange=True
@@ -520,7 +543,7 @@ if st.button('Go',on_click=callback) or st.session_state['btn_clicked']:
         fig_eps.update_layout(
             dragmode='pan',
             xaxis=dict(
-                title="Year",
+                title=axis_title,
                 tickmode='array',
                 tickvals=income_data.index,
                 fixedrange=True
@@ -579,7 +602,7 @@ if st.button('Go',on_click=callback) or st.session_state['btn_clicked']:
         fig_current_assets.update_layout(
             barmode='stack',
             xaxis=dict(
-                title='Year',
+                title=axis_title,
                 tickmode='array',
                 tickvals=balance_sheet_data.index,
                 fixedrange=True,
@@ -630,7 +653,7 @@ if st.button('Go',on_click=callback) or st.session_state['btn_clicked']:
         fig_non_current_assets.update_layout(
             barmode='stack',
             xaxis=dict(
-                title='Year',
+                title=axis_title,
                 tickmode='array',
                 tickvals=balance_sheet_data.index,
                 fixedrange=True
@@ -676,7 +699,7 @@ if st.button('Go',on_click=callback) or st.session_state['btn_clicked']:
         fig_current_liabilities.update_layout(
             barmode='stack',
             xaxis=dict(
-                title='Year',
+                title=axis_title,
                 tickmode='array',
                 tickvals=balance_sheet_data.index,
                 fixedrange=True
@@ -721,7 +744,7 @@ if st.button('Go',on_click=callback) or st.session_state['btn_clicked']:
         fig_long_term_liabilities.update_layout(
             barmode='stack',
             xaxis=dict(
-                title='Year',
+                title=axis_title,
                 tickmode='array',
                 tickvals=balance_sheet_data.index,
                 fixedrange=True
@@ -766,7 +789,7 @@ if st.button('Go',on_click=callback) or st.session_state['btn_clicked']:
         fig_equity.update_layout(
             barmode='stack',
             xaxis=dict(
-                title='Year',
+                title=axis_title,
                 tickmode='array',
                 tickvals=balance_sheet_data.index,
                 fixedrange=True
@@ -804,7 +827,7 @@ if st.button('Go',on_click=callback) or st.session_state['btn_clicked']:
         fig_total_liabilities_equity.update_layout(
             barmode='group',  # Grouped bar chart
             xaxis=dict(
-                title='Year',
+                title=axis_title,
                 tickmode='array',
                 tickvals=balance_sheet_data.index,
                 fixedrange=True
@@ -841,7 +864,7 @@ if st.button('Go',on_click=callback) or st.session_state['btn_clicked']:
         fig.update_layout(
             dragmode='pan',
             xaxis=dict(
-                title='Year',
+                title=axis_title,
                 tickmode='array',
                 tickvals=balance_sheet_data.index,
                 fixedrange=True
@@ -942,7 +965,7 @@ if st.button('Go',on_click=callback) or st.session_state['btn_clicked']:
         fig_ratios.update_layout(
             dragmode='pan',
             xaxis=dict(
-                title='Year',
+                title=axis_title,
                 tickmode='array',
                 tickvals=balance_sheet_data.index,
                 fixedrange=True
@@ -993,7 +1016,7 @@ if st.button('Go',on_click=callback) or st.session_state['btn_clicked']:
         fig_cash_conversion.update_layout(
             dragmode='pan',
             xaxis=dict(
-                title='Year',
+                title=axis_title,
                 tickmode='array',
                 tickvals=balance_sheet_data.index,
                 fixedrange=True
@@ -1030,7 +1053,7 @@ if st.button('Go',on_click=callback) or st.session_state['btn_clicked']:
         fig_debt_equity.update_layout(
             dragmode='pan',
             xaxis=dict(
-                title='Year',
+                title=axis_title,
                 tickmode='array',
                 tickvals=balance_sheet_data.index,
                 fixedrange=True
@@ -1081,7 +1104,7 @@ if st.button('Go',on_click=callback) or st.session_state['btn_clicked']:
         fig_valuation.update_layout(
             dragmode='pan',
             xaxis=dict(
-                title='Year',
+                title=axis_title,
                 tickmode='array',
                 tickvals=balance_sheet_data.index,
                 fixedrange=True
@@ -4,44 +4,96 @@ import finnhub
 import datetime
 import time
 import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from pages.helper.apiCall import UNCLASSIFIED, get_symbol_metadata
+from pages.helper.cache import disk_cached
+from pages.helper.charts import line_chart
+from pages.helper.concurrency import iter_concurrently
+from pages.helper.peerMetrics import DEFAULT_METRICS, get_peer_metrics_store, metric_label
+from pages.helper.ranking import rank_metrics, symbol_ranking
+from pages.helper.rateLimit import get_limiter, show_rate_limit_usage
+from pages.helper.valuationHistory import DEFAULT_WINDOW, VALUATION_SERIES, latest_statistics, rolling_statistics, series_history
+
+PEER_MAX_WORKERS = 4 # peer payloads fetched at the same time (each request still waits for the Finnhub rate limit)
+PEER_TIMEOUT = 30 # seconds allowed for each peer payload, including time spent waiting for the rate limit
+DEFAULT_PEER_COUNT = 10
+FINANCIALS_TTL = 3600 # seconds a basic financials payload is shared before it is requested again
 
 # Cache client initialization to prevent re-creation
 @st.cache_resource
 def get_finnhub_client(api_key):
-    return finnhub.Client(api_key=api_key)
+    client = finnhub.Client(api_key=api_key)
+    # Keep a keep-alive connection open for every concurrent peer request instead of requests' default pool
+    session = getattr(client, "_session", None)
+    if session is not None:
+        session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=PEER_MAX_WORKERS * 2))
+    return client
 
 FINN_API_KEY = st.secrets["FINHUB_API_KEY"]
 finnhub_client = get_finnhub_client(FINN_API_KEY)
 
 st.title("📊 Comparable Analysis")
 
+# Show the requests made to each data provider by this server
+show_rate_limit_usage()
+
 ticker = st.text_input("Enter Ticker Symbol:").upper()
+peer_count = st.number_input("Number of peers", min_value=1, value=DEFAULT_PEER_COUNT, step=1)
 run_analysis = st.button("Go")
 
 # Cached function to fetch company peers
 @st.cache_data(ttl=3600) # Cache for 1 hour (3600 seconds)
 def fetch_company_peers(symbol):
     try:
+        get_limiter('finnhub').acquire()
         return finnhub_client.company_peers(symbol)
     except Exception as e:
         st.error(f"Error fetching peer data from Finnhub: {e}")
         return []
 
-# Cached function to fetch basic financial metrics
-@st.cache_data(ttl=3600) # Cache for 1 hour
+# Cached function to fetch basic financial metrics. It runs on worker threads, so errors are raised and
+# reported by the caller instead of writing to the page here (failed calls are not cached). The disk cache is
+# shared by every session and worker process, and concurrent requests for the same symbol wait for one fetch.
+@disk_cached('basic-financials', FINANCIALS_TTL)
 def fetch_basic_financials(symbol):
-    try:
-        return finnhub_client.company_basic_financials(symbol, 'all')
-    except finnhub.FinnhubAPIException as e:
-        if e.status_code == 403:
-            st.error(f"Access Denied (403) for {symbol}. {symbol} will not be included.")
-            return None
-        else:
-            st.warning(f"Could not fetch financial data for {symbol} from Finnhub: {e}")
-            return None
-    except Exception as e:
-        st.warning(f"An unexpected error occurred fetching data for {symbol}: {e}")
-        return None
+    get_limiter('finnhub').acquire()
+    return finnhub_client.company_basic_financials(symbol, 'all')
+
+def report_fetch_error(symbol, error):
+    if isinstance(error, finnhub.FinnhubAPIException) and error.status_code == 403:
+        st.error(f"Access Denied (403) for {symbol}. {symbol} will not be included.")
+    elif isinstance(error, finnhub.FinnhubAPIException):
+        st.warning(f"Could not fetch financial data for {symbol} from Finnhub: {error}")
+    else:
+        st.warning(f"An unexpected error occurred fetching data for {symbol}: {error}")
+
+def comparison_table(symbols, metrics):
+    # Metrics of the symbols from the local peer metrics table, in the order of symbols
+    table = peer_metrics.lookup(symbols, metrics)
+    table.index.name = "Symbol"
+    return table.rename(columns=metric_label)
+
+# Rankings are cached per peer set and per version of the metrics table
+@st.cache_data(max_entries=32, ttl=3600, show_spinner=False)
+def peer_ranking(table):
+    return rank_metrics(table)
+
+@st.cache_data(max_entries=4, ttl=3600, show_spinner=False)
+def sector_ranking(table, sectors):
+    return rank_metrics(table, sectors)
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def symbol_sectors(symbols):
+    # Sector of every symbol, with unknown sectors left out of the sector rankings
+    return get_symbol_metadata(list(symbols))['Sector'].replace(UNCLASSIFIED, np.nan)
+
+@st.cache_data(max_entries=64, ttl=3600, show_spinner=False)
+def valuation_statistics(symbol, window):
+    # Rolling statistics of every valuation series of the symbol, cached per symbol and window
+    return rolling_statistics(series_history(fetch_basic_financials(symbol)), window)
+
+peer_metrics = get_peer_metrics_store()
 
 if run_analysis and ticker:
     # 1. Fetch peer data from Finnhub
@@ -53,36 +105,50 @@ if run_analysis and ticker:
     else:
         unique_peers = [sym for sym in peers_data if sym != ticker]
         # Ensure the main ticker is always the first in all_symbols for structured display later
-        all_symbols = [ticker] + unique_peers[:10] # Limit to 10 peers + main ticker for max 11 symbols
+        all_symbols = [ticker] + unique_peers[:int(peer_count)]
 
+    # Remember the peer set, so choosing other metrics is answered from the local table without fetching again
+    st.session_state["comparable_analysis"] = {"ticker": ticker, "symbols": all_symbols}
+
+analysis = st.session_state.get("comparable_analysis")
+if analysis and analysis["ticker"] == ticker:
+    all_symbols = analysis["symbols"]
     st.write(f"✅ Symbols for analysis: {', '.join(all_symbols)}")
 
-    peer_ratios = []
-    # Collect data for all symbols including the main ticker for the overall table
-    for sym in all_symbols:
-        data = fetch_basic_financials(sym)
-        if data and 'metric' in data:
-            record = data['metric']
-            peer_ratios.append({
-                "Symbol": sym,
-                "P/E (TTM)": record.get("peTTM"),
-                "P/B (TTM)": record.get("pbQuarterly"),
-                "ROE (TTM)": record.get("roeTTM"),
-                "ROA (TTM)": record.get("roaTTM"),
-            })
-        else:
-            if data is not None:
+    st.subheader("Peer Valuation Comparison")
+    metric_options = sorted(set(peer_metrics.metric_names()) | set(DEFAULT_METRICS), key=str.lower)
+    metrics = st.multiselect("Metrics", metric_options, default=DEFAULT_METRICS, format_func=metric_label)
+    peer_table = st.empty()
+    failed_symbols = set() # symbols whose fetch error was already reported in this run
+
+    if run_analysis:
+        # Only fetch symbols that are missing from the table or older than its refresh interval, at the same time,
+        # adding each one to the table as soon as it arrives. The main ticker is always fetched for its history.
+        to_fetch = peer_metrics.stale(all_symbols)
+        if ticker not in to_fetch:
+            to_fetch.insert(0, ticker)
+        for sym, data, error in iter_concurrently(fetch_basic_financials, to_fetch,
+                                                  max_workers=PEER_MAX_WORKERS, timeout=PEER_TIMEOUT):
+            if error is not None:
+                report_fetch_error(sym, error)
+                failed_symbols.add(sym)
+                continue
+            if data and data.get('metric'):
+                peer_metrics.add(sym, data['metric'])
+                peer_table.dataframe(comparison_table(all_symbols, metrics).round(1))
+            else:
                 st.warning(f"No metric data found for {sym}.")
+        peer_metrics.flush()
 
-    if not peer_ratios:
+    selected_peers_df = comparison_table(all_symbols, metrics)
+    if selected_peers_df.empty or not metrics:
+        peer_table.empty()
         st.error("No comparable ratio data found for any symbol.")
     else:
-        selected_peers_df = pd.DataFrame(peer_ratios)
-        st.subheader("Peer Valuation Comparison (Current TTM Ratios)")
-        st.dataframe(selected_peers_df.set_index("Symbol").round(1))
+        peer_table.dataframe(selected_peers_df.round(1))
 
         # Filter out the main ticker for mean and median calculations
-        peers_only_df = selected_peers_df[selected_peers_df["Symbol"] != ticker]
+        peers_only_df = selected_peers_df.drop(index=ticker, errors="ignore")
 
         if not peers_only_df.empty:
             peer_means = peers_only_df.mean(numeric_only=True).to_dict()
@@ -101,28 +167,55 @@ if run_analysis and ticker:
         else:
             st.warning("No peer data available to calculate mean and median ratios (after excluding the main ticker).")
 
-    # 2. Find historical P/E for the input stock
-    st.subheader(f"Historical P/E Analysis for {ticker}")
-    historical_data = fetch_basic_financials(ticker) # Use the cached function
-
-    if historical_data and 'series' in historical_data and 'quarterly' in historical_data['series'] and 'peTTM' in historical_data['series']['quarterly']:
-        pe_history_raw = historical_data['series']['quarterly']['peTTM']
-
-        # Extract 'v' values and take the first 20 elements
-        pe_values = [item['v'] for item in pe_history_raw if 'v' in item]
-
-        if len(pe_values) >= 20:
-            pe_values_for_average = pe_values[0:20]
-            average_pe = np.mean(pe_values_for_average)
-
-            st.metric(label=f"Current P/E (TTM) for {ticker}", value=f"{historical_data['metric']['peTTM']:.1f}")
-            st.metric(label=f"Average P/E (most recent 20 periods) for {ticker}", value=f"{average_pe:.1f}", delta=f"{historical_data['metric']['peTTM'] - average_pe:.1f}")
-
-            # Display the periods and values used for the average
-            df_display = pd.DataFrame(pe_history_raw[0:20])
-            st.write("Historical P/E (TTM) Values used for average:")
-            st.dataframe(df_display.rename(columns={'period': 'Period', 'v': 'P/E (TTM)'}))
-        else:
-            st.warning(f"Not enough P/E history (less than 20 periods) to calculate the average for {ticker}.")
+        # Percentile and robust z-score of the ticker against its peers, and against every stored symbol of its sector
+        if ticker in selected_peers_df.index:
+            universe = peer_metrics.lookup(peer_metrics.table().index)
+            sectors = symbol_sectors(tuple(universe.index))
+            peer_rank = symbol_ranking(peer_ranking(universe.loc[[s for s in all_symbols if s in universe.index]]), ticker)
+            sector_rank = symbol_ranking(sector_ranking(universe, sectors), ticker)
+            ranking_df = pd.concat([peer_rank.add_prefix("Peer "), sector_rank.add_prefix("Sector ")], axis=1)
+            ranking_df = ranking_df.reindex([m for m in metrics if m in ranking_df.index])
+            ranking_df[["Peer Percentile", "Sector Percentile"]] *= 100
+
+            sector = sectors.get(ticker)
+            st.subheader(f"{ticker} Ranking against Peers and the {sector if pd.notna(sector) else 'Unknown'} Sector")
+            st.dataframe(ranking_df.rename(index=metric_label).round(1))
+
+    # 2. Valuation history of the input stock
+    st.subheader(f"Historical Valuation Analysis for {ticker}")
+    window = st.slider("Rolling window (quarters)", min_value=2, max_value=40, value=DEFAULT_WINDOW)
+    try:
+        valuation_stats = valuation_statistics(ticker, window) # Payload already fetched with the peers
+    except (finnhub.FinnhubAPIException, requests.RequestException) as error:
+        if ticker not in failed_symbols:
+            report_fetch_error(ticker, error)
+        valuation_stats = None
+
+    if valuation_stats is None or valuation_stats.columns.empty:
+        st.warning(f"No historical valuation data found for {ticker}.")
     else:
-        st.warning(f"No historical P/E data found for {ticker}.")
\ No newline at end of file
+        summary = latest_statistics(valuation_stats)
+        if "peTTM" in summary.index:
+            pe = summary.loc["peTTM"]
+            current_pe = peer_metrics.lookup([ticker], ["peTTM"]).reindex([ticker])["peTTM"].iloc[0]
+            current_pe = current_pe if pd.notna(current_pe) else pe["Value"]
+            periods = int(min(window, valuation_stats[("peTTM", "Value")].count()))
+
+            col1, col2, col3 = st.columns(3)
+            col1.metric(label=f"Current P/E (TTM) for {ticker}", value=f"{current_pe:.1f}")
+            col2.metric(label=f"Average P/E (most recent {periods} periods)", value=f"{pe['Mean']:.1f}", delta=f"{current_pe - pe['Mean']:.1f}")
+            col3.metric(label="P/E Z-Score", value=f"{pe['Z-Score']:.2f}" if pd.notna(pe["Z-Score"]) else "N/A",
+                        help=f"Percentile within the window: {pe['Percentile']:.0%}" if pd.notna(pe["Percentile"]) else None)
+
+            pe_chart = valuation_stats["peTTM"][["Value", "Mean", "Upper Band", "Lower Band"]].rename(columns={"Value": "P/E (TTM)"})
+            st.plotly_chart(line_chart(pe_chart, f"P/E (TTM) with {window}-Quarter Mean and ±1 Std Bands"), use_container_width=True)
+        else:
+            st.warning(f"No historical P/E data found for {ticker}.")
+
+        # Latest value of every valuation series against its own history
+        if not summary.empty:
+            summary = summary.rename(index=VALUATION_SERIES)
+            summary["Percentile"] *= 100
+            summary["Period"] = summary["Period"].dt.date
+            st.write(f"Latest valuation against the most recent {window} quarters:")
+            st.dataframe(summary.round(2))
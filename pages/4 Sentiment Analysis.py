@@ -1,10 +1,10 @@
 import streamlit as st
 import pandas as pd
+from pages.helper.httpClient import http_get
 
 @st.cache_data(ttl=3600)
 def fetch_api(url):
-    import requests
-    return requests.get(url).json()
+    return http_get(url, provider='polygon').json()
 
 def extract_sentiment(insights):
     if isinstance(insights, list) and len(insights) > 0:
@@ -3,16 +3,345 @@ This module provides functions for retrieving financial data from the Financial
 """
 
 # Import necessary libraries
+import time
 import requests
 import pandas as pd
 import numpy as np
 import streamlit as st
+from pages.helper.cache import disk_cached, get_cache
+from pages.helper.concurrency import map_concurrently
+from pages.helper.httpClient import http_get
 
 
 FMP_API_KEY = st.secrets["FMP_API_KEY"] # replace with your Financial Modeling Prep API key
 ALPHA_API_KEY = st.secrets["ALPHA_API_KEY"] # replace with your Alpha Vantage API key
 
+DAY = 60*60*24
 
+# Seconds each endpoint stays fresh in the disk cache, and how much longer a stale copy may be served while it refreshes
+CACHE_TTL = {
+    'profile': (DAY, 7*DAY),
+    'stock-price': (DAY, 7*DAY),
+    'symbol-metadata': (90*DAY, 365*DAY),
+}
+
+PROFILE_BATCH_SIZE = 50 # symbols requested per call to the FMP profile endpoint
+METADATA_FIELDS = ['Name', 'Sector', 'Industry', 'Exchange', 'Country'] # profile fields kept as symbol metadata
+UNCLASSIFIED = 'Unclassified' # sector and industry of symbols without a profile
+
+# Months between two reports of each statement period
+PERIOD_MONTHS = {
+    'annual': 12,
+    'quarter': 3,
+}
+REPORTS_CHECK_INTERVAL = 7*DAY # seconds a stored report history is served before checking for newly published reports
+REPORTS_REFRESH_INTERVAL = 30*DAY # seconds before a stored report history is downloaded again in full, to pick up restated filings
+
+
+def _parse_company_profile(data: dict) -> dict:
+    """
+    Extracts the company information used by the dashboard from one FMP profile record.
+
+    Parameters:
+        data (dict): Company record returned by the FMP profile endpoint
+
+    Returns:
+        dict: Dictionary containing information about the company
+    """
+    return {
+        'Name': data['companyName'],
+        'Exchange': data['exchangeShortName'],
+        'Currency': data['currency'],
+        'Country': data['country'],
+        'Sector': data['sector'],
+        'Industry': data['industry'],
+        'Market Cap':  data['mktCap'],
+        'Price': data['price'],
+        'Beta': data['beta'],
+        'Price change': data['changes'],
+        'Website': data['website'],
+        'Image': data['image'],
+        'Average Volume': data['volAvg'],
+        "Description": data['description'],
+        "CEO": data['ceo'],
+        "Range": data['range'],
+        "Location": data['city'] + ', ' + data['state'] + ', ' + data['country'] if data['city'] and data['state'] else data['country'],
+        "Founded": data['ipoDate'],
+        "Employees": data['fullTimeEmployees'],
+    }
+
+
+# Mapping of FMP income statement fields to DataFrame columns
+INCOME_STATEMENT_FIELDS = {
+    'revenue': 'Revenue',
+    'costOfRevenue': 'Cost of Revenue',
+    'grossProfit': 'Gross Profit',
+    'grossProfitRatio': 'Gross Profit Margin',
+    'researchAndDevelopmentExpenses': 'Research & Development Expenses',
+    'sellingGeneralAndAdministrativeExpenses': 'Selling, General & Administrative Expenses',
+    'operatingExpenses': 'Operating Expense',
+    'operatingIncome': 'Operating Income',
+    'operatingIncomeRatio': 'Operating Income Ratio',
+    'interestIncome': 'Interest Income',
+    'interestExpense': 'Interest Expense',
+    'depreciationAndAmortization': 'Depreciation & Amortization',
+    'ebitda': 'EBITDA',
+    'ebitdaratio': 'EBITDA Ratio',
+    'totalOtherIncomeExpensesNet': 'Other Income/Expenses',
+    'incomeBeforeTax': 'Income Before Tax',
+    'incomeBeforeTaxRatio': 'Income Before Tax Ratio',
+    'incomeTaxExpense': 'Tax Income/Expense',
+    'netIncome': 'Net Income',
+    'netIncomeRatio': 'Net Income Ratio',
+    'eps': 'EPS',
+    'epsdiluted': 'EPS Diluted',
+}
+
+# Mapping of FMP balance sheet fields to DataFrame columns
+BALANCE_SHEET_FIELDS = {
+    'cashAndCashEquivalents': 'Cash And Cash Equivalents',
+    'shortTermInvestments': 'Short Term Investments',
+    'cashAndShortTermInvestments': 'Cash And Short Term Investments',
+    'netReceivables': 'Net Receivables',
+    'inventory': 'Inventory',
+    'otherCurrentAssets': 'Other Current Assets',
+    'totalCurrentAssets': 'Total Current Assets',
+    'propertyPlantEquipmentNet': 'Property Plant Equipment Net',
+    'goodwill': 'Goodwill',
+    'intangibleAssets': 'Intangible Assets',
+    'goodwillAndIntangibleAssets': 'Goodwill And Intangible Assets',
+    'longTermInvestments': 'Long Term Investments',
+    'taxAssets': 'Tax Assets',
+    'otherNonCurrentAssets': 'Other Non Current Assets',
+    'totalNonCurrentAssets': 'Total Non Current Assets',
+    'otherAssets': 'Other Assets',
+    'totalAssets': 'Total Assets',
+    'accountPayables': 'Account Payables',
+    'shortTermDebt': 'Short Term Debt',
+    'taxPayables': 'Tax Payables',
+    'deferredRevenue': 'Deferred Revenue',
+    'otherCurrentLiabilities': 'Other Current Liabilities',
+    'totalCurrentLiabilities': 'Total Current Liabilities',
+    'longTermDebt': 'Long Term Debt',
+    'deferredRevenueNonCurrent': 'Deferred Revenue Non Current',
+    'deferredTaxLiabilitiesNonCurrent': 'Deferred Tax Liabilities Non Current',
+    'otherNonCurrentLiabilities': 'Other Non Current Liabilities',
+    'totalNonCurrentLiabilities': 'Total Non Current Liabilities',
+    'otherLiabilities': 'Other Liabilities',
+    'capitalLeaseObligations': 'Capital Lease Obligations',
+    'totalLiabilities': 'Total Liabilities',
+    'preferredStock': 'Preferred Stock',
+    'commonStock': 'Common Stock',
+    'retainedEarnings': 'Retained Earnings',
+    'accumulatedOtherComprehensiveIncomeLoss': 'Accumulated Other Comprehensive Income Loss',
+    'othertotalStockholdersEquity': 'Other Total Stockholders Equity',
+    'totalStockholdersEquity': 'Total Stockholders Equity',
+    'totalEquity': 'Total Equity',
+    'totalLiabilitiesAndStockholdersEquity': 'Total Liabilities And Stockholders Equity',
+    'minorityInterest': 'Minority Interest',
+    'totalLiabilitiesAndTotalEquity': 'Total Liabilities And Total Equity',
+    'totalInvestments': 'Total Investments',
+    'totalDebt': 'Total Debt',
+    'netDebt': 'Net Debt',
+}
+
+# Mapping of FMP cash flow statement fields to DataFrame columns
+CASH_FLOW_FIELDS = {
+    'netCashProvidedByOperatingActivities': 'Cash flows from operating activities',
+    'netCashUsedForInvestingActivites': 'Cash flows from investing activities',
+    'netCashUsedProvidedByFinancingActivities': 'Cash flows from financing activities',
+    'freeCashFlow': 'Free cash flow',
+}
+
+# Mapping of FMP key metrics fields to DataFrame columns
+KEY_METRICS_FIELDS = {
+    'marketCap': 'Market Cap',
+    'workingCapital': 'Working Capital',
+    'debtToEquity': 'D/E ratio',
+    'peRatio': 'P/E Ratio',
+    'roe': 'ROE',
+    'dividendYield': 'Dividend Yield',
+}
+
+# Mapping of FMP financial ratios fields to DataFrame columns
+FINANCIAL_RATIOS_FIELDS = {
+    'currentRatio': 'Current Ratio',
+    'quickRatio': 'Quick Ratio',
+    'cashRatio': 'Cash Ratio',
+    'daysOfSalesOutstanding': 'Days of Sales Outstanding',
+    'daysOfInventoryOutstanding': 'Days of Inventory Outstanding',
+    'operatingCycle': 'Operating Cycle',
+    'daysOfPayablesOutstanding': 'Days of Payables Outstanding',
+    'cashConversionCycle': 'Cash Conversion Cycle',
+    'grossProfitMargin': 'Gross Profit Margin',
+    'operatingProfitMargin': 'Operating Profit Margin',
+    'pretaxProfitMargin': 'Pretax Profit Margin',
+    'netProfitMargin': 'Net Profit Margin',
+    'effectiveTaxRate': 'Effective Tax Rate',
+    'returnOnAssets': 'Return on Assets',
+    'returnOnEquity': 'Return on Equity',
+    'returnOnCapitalEmployed': 'Return on Capital Employed',
+    'netIncomePerEBT': 'Net Income per EBT',
+    'ebtPerEbit': 'EBT per EBIT',
+    'ebitPerRevenue': 'EBIT per Revenue',
+    'debtRatio': 'Debt Ratio',
+    'debtEquityRatio': 'Debt Equity Ratio',
+    'longTermDebtToCapitalization': 'Long-term Debt to Capitalization',
+    'totalDebtToCapitalization': 'Total Debt to Capitalization',
+    'interestCoverage': 'Interest Coverage',
+    'cashFlowToDebtRatio': 'Cash Flow to Debt Ratio',
+    'companyEquityMultiplier': 'Company Equity Multiplier',
+    'receivablesTurnover': 'Receivables Turnover',
+    'payablesTurnover': 'Payables Turnover',
+    'inventoryTurnover': 'Inventory Turnover',
+    'fixedAssetTurnover': 'Fixed Asset Turnover',
+    'assetTurnover': 'Asset Turnover',
+    'operatingCashFlowPerShare': 'Operating Cash Flow per Share',
+    'freeCashFlowPerShare': 'Free Cash Flow per Share',
+    'cashPerShare': 'Cash per Share',
+    'payoutRatio': 'Payout Ratio',
+    'operatingCashFlowSalesRatio': 'Operating Cash Flow Sales Ratio',
+    'freeCashFlowOperatingCashFlowRatio': 'Free Cash Flow Operating Cash Flow Ratio',
+    'cashFlowCoverageRatios': 'Cash Flow Coverage Ratios',
+    'priceToBookRatio': 'Price to Book Value Ratio',
+    'priceEarningsRatio': 'Price to Earnings Ratio',
+    'priceToSalesRatio': 'Price to Sales Ratio',
+    'dividendYield': 'Dividend Yield',
+    'enterpriseValueMultiple': 'Enterprise Value to EBITDA',
+    'priceFairValue': 'Price to Fair Value',
+}
+
+
+def _request_reports(endpoint: str, symbol: str, period: str, limit: int) -> list:
+    """
+    Requests the most recent reports of an FMP statement endpoint.
+
+    Parameters:
+        endpoint (str): FMP endpoint name, e.g. 'income-statement'
+        symbol (str): Stock symbol
+        period (str): 'annual' or 'quarter'
+        limit (int): Number of most recent reports to request
+
+    Returns:
+        list: Reports returned by the API, newest first
+    """
+    api_endpoint = f'https://financialmodelingprep.com/api/v3/{endpoint}/{symbol}'
+    params = {
+        'period': period,
+        'limit': limit,
+        'apikey': FMP_API_KEY,
+    }
+
+    # Make an HTTP GET request to the API
+    response = http_get(api_endpoint, params=params, provider='fmp')
+    response.raise_for_status()  # Raise exception for any bad HTTP status code
+
+    return response.json()
+
+
+def _fetch_reports(endpoint: str, symbol: str, period: str = 'annual', limit: int = 5) -> list:
+    """
+    Returns the `limit` most recent reports of an FMP statement endpoint. The full report history of every
+    symbol is kept in the disk cache and served as is for REPORTS_CHECK_INTERVAL. After that, calls only request
+    the periods published since the newest stored report (plus that report itself, to pick up restatements) and
+    merge them into the history. Every REPORTS_REFRESH_INTERVAL the whole stored range is downloaded again, so
+    restated older reports are replaced.
+
+    Parameters:
+        endpoint (str): FMP endpoint name, e.g. 'income-statement'
+        symbol (str): Stock symbol
+        period (str): 'annual' or 'quarter'
+        limit (int): Number of most recent reports to return
+
+    Returns:
+        list: Reports newest first
+    """
+    if period not in PERIOD_MONTHS:
+        raise ValueError(f"Unknown period '{period}', expected one of {list(PERIOD_MONTHS)}")
+
+    cache = get_cache()
+    key = f"reports:{endpoint}:{symbol}:{period}"
+    cached = cache.get(key)
+    stored = cached[0]['reports'] if cached is not None else []
+    stored_limit = cached[0]['limit'] if cached is not None else 0
+    refreshed_at = cached[0].get('refreshed_at', 0) if cached is not None else 0
+    full_refresh = time.time() - refreshed_at >= REPORTS_REFRESH_INTERVAL
+
+    # The history is rewritten on every check, so the age of the entry is the time since the last check
+    if stored and stored_limit >= limit and not full_refresh and cached[1] < REPORTS_CHECK_INTERVAL:
+        return stored[:limit]
+
+    fetch_limit = max(limit, stored_limit)
+    if stored and not full_refresh:
+        # Count the periods published since the newest stored report, plus that report itself
+        months = (pd.Timestamp.today() - pd.Timestamp(stored[0]['date'])).days / 30.44
+        new_periods = int(months // PERIOD_MONTHS[period]) + 1
+        # Only the new periods are needed if the stored history is deep enough, otherwise download the full range
+        fetch_limit = new_periods if stored_limit >= limit else max(limit, new_periods)
+
+    try:
+        new_reports = _request_reports(endpoint, symbol, period, fetch_limit)
+    except requests.exceptions.RequestException as e:
+        if not stored:
+            raise
+        # Serve the stored history while the API cannot be reached
+        print(f"Error occurred while updating stored reports: {e}")
+        return stored[:limit]
+    if not isinstance(new_reports, list) or not new_reports:
+        # Fall back to the stored history if the API returned nothing usable
+        return stored[:limit] if stored else new_reports
+
+    # Merge the new reports into the history, newer copies of a report replace the stored ones
+    merged = {report['date']: report for report in stored}
+    merged.update({report['date']: report for report in new_reports})
+    reports = sorted(merged.values(), key=lambda report: report['date'], reverse=True)
+
+    if full_refresh:
+        refreshed_at = time.time()
+    cache.set(key, {'limit': max(stored_limit, limit), 'reports': reports, 'refreshed_at': refreshed_at}, 'reports')
+    return reports[:limit]
+
+
+def _parse_statement(response_data: list, fields: dict, year_field: str = 'calendarYear', period: str = 'annual') -> pd.DataFrame:
+    """
+    Converts a list of FMP reports into a DataFrame indexed by year (or by year and quarter), keeping only the
+    mapped fields.
+
+    Parameters:
+        response_data (list): Reports returned by an FMP statement endpoint
+        fields (dict): Mapping of FMP field names to column names
+        year_field (str): Field holding the report year. The year of the report date is used when it is 'date' or missing
+        period (str): 'annual' or 'quarter'. Quarterly reports are labelled by the calendar quarter of their date,
+            like '2023 Q1', whatever year_field is, so the statements of one symbol share their labels
+
+    Returns:
+        pd.DataFrame: One float64 column per mapped field. Fields missing from the response are NaN.
+
+    Raises:
+        ValueError: If the response does not contain any reports.
+    """
+    if not isinstance(response_data, list) or not response_data:
+        raise ValueError(f"No reports in response: {response_data}")
+
+    reports = pd.DataFrame.from_records(response_data)
+    if year_field in reports and year_field != 'date':
+        years = reports[year_field].astype(str)
+    else:
+        years = reports['date'].str[:4]
+
+    # Select and rename the mapped fields, adding missing ones as NaN
+    statement = reports.reindex(columns=list(fields)).rename(columns=fields)
+    statement = statement.apply(pd.to_numeric, errors='coerce').astype('float64')
+    if period == 'quarter':
+        dates = pd.to_datetime(reports['date'])
+        statement.index = pd.Index(dates.dt.year.astype(str) + ' Q' + dates.dt.quarter.astype(str), name='Period')
+    else:
+        statement.index = pd.Index(years, name='Year')
+
+    return statement
+
+
+@disk_cached('profile', *CACHE_TTL['profile'])
 def get_company_info(symbol: str) -> dict:
     """
     Returns a dictionary containing information about a company with the given stock symbol.
@@ -31,7 +360,7 @@ def get_company_info(symbol: str) -> dict:
 
     try:
         # Make an HTTP GET request to the API with the specified parameters
-        response = requests.get(api_endpoint, params=params)
+        response = http_get(api_endpoint, params=params, provider='fmp')
 
         # Check for any errors in the HTTP response status code
         response.raise_for_status()
@@ -43,27 +372,7 @@ def get_company_info(symbol: str) -> dict:
         data = data[0]
 
         # Extract the desired company information from the dictionary
-        company_info = {
-            'Name': data['companyName'],
-            'Exchange': data['exchangeShortName'],
-            'Currency': data['currency'],
-            'Country': data['country'],    
-            'Sector': data['sector'],
-            'Industry': data['industry'],         
-            'Market Cap':  data['mktCap'],
-            'Price': data['price'],
-            'Beta': data['beta'],
-            'Price change': data['changes'],
-            'Website': data['website'],
-            'Image': data['image'],
-            'Average Volume': data['volAvg'],
-            "Description": data['description'],
-            "CEO": data['ceo'],
-            "Range": data['range'],
-            "Location": data['city'] + ', ' + data['state'] + ', ' + data['country'] if data['city'] and data['state'] else data['country'],
-            "Founded": data['ipoDate'],
-            "Employees": data['fullTimeEmployees'],
-        }
+        company_info = _parse_company_profile(data)
 
         # Return the company information dictionary
         return company_info
@@ -79,13 +388,162 @@ def get_company_info(symbol: str) -> dict:
         return None
 
 
-def get_stock_price(symbol: str) -> pd.DataFrame:
+def _get_company_profiles(symbols: list) -> list:
+    """
+    Returns the raw FMP profile records for a batch of stock symbols in a single request.
+
+    Parameters:
+        symbols (list): Stock symbols, at most PROFILE_BATCH_SIZE of them
+
+    Returns:
+        list: List of profile records, or None if the request failed. Symbols without a profile are left out.
+    """
+    api_endpoint = f"https://financialmodelingprep.com/api/v3/profile/{','.join(symbols)}"
+    params = {
+        'apikey': FMP_API_KEY,
+    }
+
+    try:
+        response = http_get(api_endpoint, params=params, provider='fmp')
+        response.raise_for_status()
+        data = response.json()
+
+        # Errors such as an exhausted quota come back as a message instead of a list of profiles
+        if not isinstance(data, list):
+            print(f"Error occurred while fetching data from API: {data}")
+            return None
+        return data
+
+    except requests.exceptions.RequestException as e:
+        print(f"Error occurred while fetching data from API: {e}")
+        return None
+
+    except ValueError as e:
+        print(f"Error occurred while parsing JSON response: {e}")
+        return None
+
+
+def _fetch_company_info_many(symbols: list, chunk_size: int, max_workers: int) -> tuple:
+    """
+    Reads the company information of many stock symbols from the disk cache and requests the rest in concurrent
+    batches, writing every fetched profile back to the cache used by get_company_info.
+
+    Returns:
+        tuple: Company information per symbol found, and the set of symbols whose batch request failed.
+    """
+    cache = get_cache()
+    ttl, stale_ttl = CACHE_TTL['profile']
+
+    # Read the symbols that are already cached
+    company_info = {}
+    for symbol in symbols:
+        cached = cache.get(get_company_info.cache_key(symbol))
+        if cached is not None and cached[1] < ttl + stale_ttl:
+            company_info[symbol] = cached[0]
+
+    # Request the missing symbols in batches
+    missing = [symbol for symbol in symbols if symbol not in company_info]
+    chunks = [missing[i:i + chunk_size] for i in range(0, len(missing), chunk_size)]
+    failed = set()
+    results = map_concurrently(_get_company_profiles, chunks, max_workers=max_workers, timeout=30, default=None)
+    for chunk, profiles in zip(chunks, results):
+        if profiles is None:
+            failed.update(chunk)
+            continue
+        for data in profiles:
+            try:
+                symbol, info = data['symbol'], _parse_company_profile(data)
+            except (KeyError, TypeError):
+                continue
+            company_info[symbol] = info
+            cache.set(get_company_info.cache_key(symbol), info, 'profile')
+
+    return company_info, failed
+
+
+def get_company_info_many(symbols: list, chunk_size: int = PROFILE_BATCH_SIZE, max_workers: int = 4) -> pd.DataFrame:
+    """
+    Returns the company information of many stock symbols at once. Symbols already in the disk cache are read
+    from it, the rest are requested in comma-separated batches that run concurrently, and every fetched profile
+    is written back to the cache used by get_company_info.
+
+    Parameters:
+        symbols (list): Stock symbols
+        chunk_size (int): Number of symbols requested per API call
+        max_workers (int): Number of batches requested at the same time
+
+    Returns:
+        pd.DataFrame: One row of company information per symbol, indexed by symbol. Symbols without data have empty rows.
+    """
+    symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+    company_info, _ = _fetch_company_info_many(symbols, chunk_size, max_workers)
+
+    company_info_df = pd.DataFrame.from_dict(company_info, orient='index').reindex(symbols)
+    company_info_df.index.name = 'Symbol'
+    return company_info_df
+
+
+def get_symbol_metadata(symbols: list) -> pd.DataFrame:
+    """
+    Returns the name, sector, industry, exchange and country of many stock symbols. Metadata rarely changes, so it
+    is kept in the disk cache for months; symbols that are missing or expired are requested together through
+    get_company_info_many. Symbols without a profile are remembered for a day before they are requested again.
+
+    Parameters:
+        symbols (list): Stock symbols
+
+    Returns:
+        pd.DataFrame: One row per symbol, indexed by symbol. Sector and Industry are 'Unclassified' when unknown.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    cache = get_cache()
+    ttl, stale_ttl = CACHE_TTL['symbol-metadata']
+
+    metadata, expired, no_profile = {}, set(), set()
+    for symbol in symbols:
+        cached = cache.get(f"symbol-metadata:{symbol.upper()}")
+        if cached is None:
+            continue
+        record, age = cached
+        if record is None:
+            # Symbol without a profile, only requested again after a day
+            if age < DAY:
+                no_profile.add(symbol)
+            continue
+        if age < ttl + stale_ttl:
+            metadata[symbol] = record
+        if age >= ttl:
+            expired.add(symbol)
+
+    # Request every missing or expired symbol at once; expired records are kept if the request fails, and only
+    # symbols left out of a successful response are remembered as having no profile
+    missing = [symbol for symbol in symbols if symbol in expired or (symbol not in metadata and symbol not in no_profile)]
+    if missing:
+        profiles, failed = _fetch_company_info_many(list(dict.fromkeys(symbol.upper() for symbol in missing)),
+                                                    PROFILE_BATCH_SIZE, 4)
+        for symbol in missing:
+            info = profiles.get(symbol.upper())
+            if info:
+                metadata[symbol] = {field: info.get(field) for field in METADATA_FIELDS}
+                cache.set(f"symbol-metadata:{symbol.upper()}", metadata[symbol], 'symbol-metadata')
+            elif symbol.upper() not in failed and symbol not in metadata:
+                cache.set(f"symbol-metadata:{symbol.upper()}", None, 'symbol-metadata')
+
+    metadata_df = pd.DataFrame.from_dict(metadata, orient='index', columns=METADATA_FIELDS).reindex(symbols)
+    metadata_df[['Sector', 'Industry']] = metadata_df[['Sector', 'Industry']].replace('', None).fillna(UNCLASSIFIED)
+    metadata_df.index.name = 'Symbol'
+    return metadata_df
+
+
+@disk_cached('stock-price', *CACHE_TTL['stock-price'])
+def get_stock_price(symbol: str, years: int = 5) -> pd.DataFrame:
     """
     Returns a Pandas DataFrame containing the monthly adjusted closing prices of a given stock symbol
-    for the last 5 years.
+    for the last `years` years.
     
     Parameters:
         symbol (str): Stock symbol
+        years (int): Number of years of monthly prices to return
         
     Returns:
         pd.DataFrame: Pandas DataFrame containing the monthly adjusted closing prices of the stock
@@ -99,14 +557,21 @@ def get_stock_price(symbol: str) -> pd.DataFrame:
 
     try:
         # Make an HTTP GET request to the API
-        response = requests.get(api_endpoint, params=params)
+        response = http_get(api_endpoint, params=params, provider='alpha_vantage')
         response.raise_for_status()  # raise exception for any bad HTTP status code
 
+        # Alpha Vantage answers throttled requests with a 'Note' or 'Information' message instead of data
+        payload = response.json()
+        if 'Monthly Adjusted Time Series' not in payload:
+            message = payload.get('Note') or payload.get('Information') or payload.get('Error Message')
+            print(f"Alpha Vantage returned no price data: {message}")
+            return None
+
         # Parse the response JSON data into a Pandas DataFrame
-        data = response.json()['Monthly Adjusted Time Series']
+        data = payload['Monthly Adjusted Time Series']
         df = pd.DataFrame.from_dict(data, orient='index')
         df.index = pd.to_datetime(df.index)
-        df = df[:12*5] # get data for the last 5 years
+        df = df[:12*years] # get data for the last `years` years
         df = df[['4. close']].astype(float)
         df = df.rename(columns={'4. close': 'Price'})
 
@@ -121,64 +586,24 @@ def get_stock_price(symbol: str) -> pd.DataFrame:
         return None
 
 
-def get_income_statement(symbol: str) -> pd.DataFrame:
+def get_income_statement(symbol: str, period: str = 'annual', limit: int = 5) -> pd.DataFrame:
     """
     Retrieves the income statement data for a given stock symbol from the Financial Modeling Prep API.
 
     Args:
         symbol (str): The stock symbol to retrieve the income statement data for.
+        period (str): 'annual' or 'quarter'.
+        limit (int): Number of most recent reports to return.
 
     Returns:
         pd.DataFrame: A Pandas DataFrame containing the income statement data.
     """
-    # define the API endpoint and parameters
-    api_endpoint = f'https://financialmodelingprep.com/api/v3/income-statement/{symbol}/'
-    params = {
-        'limit': 5,
-        'apikey': FMP_API_KEY,  
-    }
     try:
-        # create an empty list to store the income statement data
-        income_statement_data = []
+        # Get the most recent reports, requesting only the periods newer than the stored history
+        reports = _fetch_reports('income-statement', symbol, period, limit)
 
-        # make an HTTP GET request to the API
-        response = requests.get(api_endpoint, params=params)
-        response.raise_for_status()  # raise exception for any bad HTTP status code
-
-        # parse the response JSON data into a list of dictionaries
-        response_data = response.json()
-
-        # extract the income statement data from the list of dictionaries
-        for report in response_data:
-            year = report['calendarYear'] 
-            income_statement_data.append({
-                'Year': year,
-                'Revenue': (report['revenue']),
-                'Cost of Revenue': (report['costOfRevenue']),
-                'Gross Profit': (report['grossProfit']),
-                'Gross Profit Margin': (report['grossProfitRatio']), 
-                'Research & Development Expenses': report['researchAndDevelopmentExpenses'],
-                'Selling, General & Administrative Expenses': (report['sellingGeneralAndAdministrativeExpenses']),
-                'Operating Expense': (report['operatingExpenses']),
-                'Operating Income': (report['operatingIncome']),
-                'Operating Income Ratio': (report['operatingIncomeRatio']), 
-                'Interest Income': report['interestIncome'], 
-                'Interest Expense': report['interestExpense'], 
-                'Depreciation & Amortization': report['depreciationAndAmortization'], 
-                'EBITDA': report['ebitda'], 
-                'EBITDA Ratio': (report['ebitdaratio']), 
-                'Other Income/Expenses': (report['totalOtherIncomeExpensesNet']),
-                'Income Before Tax': (report['incomeBeforeTax']),
-                'Income Before Tax Ratio': (report['incomeBeforeTaxRatio']), 
-                'Tax Income/Expense': (report['incomeTaxExpense']),
-                'Net Income': (report['netIncome']),
-                'Net Income Ratio': (report['netIncomeRatio']), 
-                'EPS': (report['eps']), 
-                'EPS Diluted': (report['epsdiluted']),
-            })
-
-        # create a Pandas DataFrame from the list of dictionaries and return it
-        income_statement = pd.DataFrame(income_statement_data).set_index('Year')
+        # Map the income statement fields of every report to columns in a single pass
+        income_statement = _parse_statement(reports, INCOME_STATEMENT_FIELDS, period=period)
 
         return income_statement
         
@@ -191,87 +616,24 @@ def get_income_statement(symbol: str) -> pd.DataFrame:
         return None
 
 
-def get_balance_sheet(symbol: str) -> pd.DataFrame:
+def get_balance_sheet(symbol: str, period: str = 'annual', limit: int = 5) -> pd.DataFrame:
     """
     Retrieves the balance sheet data for a given stock symbol.
 
     Args:
         symbol (str): Stock symbol to retrieve balance sheet data for.
+        period (str): 'annual' or 'quarter'.
+        limit (int): Number of most recent reports to return.
 
     Returns:
         pd.DataFrame: Pandas DataFrame containing the balance sheet data.
     """
-    # Define the API endpoint and parameters
-    api_endpoint = f'https://financialmodelingprep.com/api/v3/balance-sheet-statement/{symbol}'
-    params = {
-        'limit': 5,
-        'apikey': FMP_API_KEY,  
-    }
-
     try:
-        # Create an empty list to store the balance sheet data
-        balance_sheet_data = []
+        # Get the most recent reports, requesting only the periods newer than the stored history
+        reports = _fetch_reports('balance-sheet-statement', symbol, period, limit)
 
-        # Make an HTTP GET request to the API
-        response = requests.get(api_endpoint, params=params)
-        response.raise_for_status()  # Raise exception for any bad HTTP status code
-
-        # Parse the response JSON data into a list of dictionaries
-        response_data = response.json()
-
-        # Extract the balance sheet data from the list of dictionaries
-        for report in response_data:
-            year = report['calendarYear']
-            balance_sheet_data.append({
-                'Year': year,
-                'Cash And Cash Equivalents': report['cashAndCashEquivalents'],
-                'Short Term Investments': report['shortTermInvestments'],
-                'Cash And Short Term Investments': report['cashAndShortTermInvestments'],
-                'Net Receivables': report['netReceivables'],
-                'Inventory': report['inventory'],
-                'Other Current Assets': report['otherCurrentAssets'],
-                'Total Current Assets': report['totalCurrentAssets'],
-                'Property Plant Equipment Net': report['propertyPlantEquipmentNet'],
-                'Goodwill': report['goodwill'],
-                'Intangible Assets': report['intangibleAssets'],
-                'Goodwill And Intangible Assets': report['goodwillAndIntangibleAssets'],
-                'Long Term Investments': report['longTermInvestments'],
-                'Tax Assets': report['taxAssets'],
-                'Other Non Current Assets': report['otherNonCurrentAssets'],
-                'Total Non Current Assets': report['totalNonCurrentAssets'],
-                'Other Assets': report['otherAssets'],
-                'Total Assets': report['totalAssets'],
-                'Account Payables': report['accountPayables'],
-                'Short Term Debt': report['shortTermDebt'],
-                'Tax Payables': report['taxPayables'],
-                'Deferred Revenue': report['deferredRevenue'],
-                'Other Current Liabilities': report['otherCurrentLiabilities'],
-                'Total Current Liabilities': report['totalCurrentLiabilities'],
-                'Long Term Debt': report['longTermDebt'],
-                'Deferred Revenue Non Current': report['deferredRevenueNonCurrent'],
-                'Deferred Tax Liabilities Non Current': report['deferredTaxLiabilitiesNonCurrent'],
-                'Other Non Current Liabilities': report['otherNonCurrentLiabilities'],
-                'Total Non Current Liabilities': report['totalNonCurrentLiabilities'],
-                'Other Liabilities': report['otherLiabilities'],
-                'Capital Lease Obligations': report['capitalLeaseObligations'],
-                'Total Liabilities': report['totalLiabilities'],
-                'Preferred Stock': report['preferredStock'],
-                'Common Stock': report['commonStock'],
-                'Retained Earnings': report['retainedEarnings'],
-                'Accumulated Other Comprehensive Income Loss': report['accumulatedOtherComprehensiveIncomeLoss'],
-                'Other Total Stockholders Equity': report['othertotalStockholdersEquity'],
-                'Total Stockholders Equity': report['totalStockholdersEquity'],
-                'Total Equity': report['totalEquity'],
-                'Total Liabilities And Stockholders Equity': report['totalLiabilitiesAndStockholdersEquity'],
-                'Minority Interest': report['minorityInterest'],
-                'Total Liabilities And Total Equity': report['totalLiabilitiesAndTotalEquity'],
-                'Total Investments': report['totalInvestments'],
-                'Total Debt': report['totalDebt'],
-                'Net Debt': report['netDebt']
-            })
-
-        # Create a Pandas DataFrame from the list of dictionaries and return it
-        balance_sheet_df = pd.DataFrame(balance_sheet_data).set_index('Year')
+        # Map the balance sheet fields of every report to columns in a single pass
+        balance_sheet_df = _parse_statement(reports, BALANCE_SHEET_FIELDS, period=period)
 
         return balance_sheet_df
     
@@ -280,48 +642,29 @@ def get_balance_sheet(symbol: str) -> pd.DataFrame:
         print('Error getting balance sheet data:', e)
         return None
 
+    except ValueError as e:
+        print(f"Error occurred while parsing JSON response: {e}")
+        return None
+
 
-def get_cash_flow(symbol: str) -> pd.DataFrame:
+def get_cash_flow(symbol: str, period: str = 'annual', limit: int = 5) -> pd.DataFrame:
     """
     Retrieve cash flow data for a given stock symbol from the Financial Modeling Prep API.
     
     Args:
         symbol (str): The stock symbol for the company.
+        period (str): 'annual' or 'quarter'.
+        limit (int): Number of most recent reports to return.
     
     Returns:
         pd.DataFrame: A Pandas DataFrame containing cash flow data for the company.
     """
-    # Define the API endpoint and parameters
-    api_endpoint = f'https://financialmodelingprep.com/api/v3/cash-flow-statement/{symbol}'
-    params = {
-        'limit': 5,
-        'apikey': FMP_API_KEY,  
-    }
-    
     try:
-        # Create an empty list to store the cash flow data
-        cashflow_data = []
+        # Get the most recent reports, requesting only the periods newer than the stored history
+        reports = _fetch_reports('cash-flow-statement', symbol, period, limit)
 
-        # Make an HTTP GET request to the API
-        response = requests.get(api_endpoint, params=params)
-        response.raise_for_status()  # Raise an exception for any bad HTTP status code
-
-        # Parse the response JSON data into a list of dictionaries
-        response_data = response.json()
-
-        # Extract the cash flow data from the list of dictionaries
-        for report in response_data:
-            year = report['date'].split('-')[0]
-            cashflow_data.append({
-                'Year': year,
-                "Cash flows from operating activities": report['netCashProvidedByOperatingActivities'],
-                'Cash flows from investing activities': report['netCashUsedForInvestingActivites'],
-                'Cash flows from financing activities': report['netCashUsedProvidedByFinancingActivities'],
-                'Free cash flow': report['freeCashFlow']
-            })
-
-        # Create a Pandas DataFrame from the list of dictionaries and set the 'Year' column as the index
-        cashflow_df = pd.DataFrame(cashflow_data).set_index('Year')
+        # Map the cash flow fields of every report to columns in a single pass
+        cashflow_df = _parse_statement(reports, CASH_FLOW_FIELDS, year_field='date', period=period)
 
         return cashflow_df
     
@@ -330,50 +673,29 @@ def get_cash_flow(symbol: str) -> pd.DataFrame:
         print('Error getting cash flow data:', e)
         return None
 
+    except ValueError as e:
+        print(f"Error occurred while parsing JSON response: {e}")
+        return None
+
 
-def get_key_metrics(symbol: str) -> pd.DataFrame:
+def get_key_metrics(symbol: str, period: str = 'annual', limit: int = 5) -> pd.DataFrame:
     """
-    Returns a Pandas DataFrame containing the key financial metrics of a given company symbol for the last 10 years.
+    Returns a Pandas DataFrame containing the key financial metrics of a given company symbol for the most recent periods.
 
     Parameters:
         symbol (str): Company symbol.
+        period (str): 'annual' or 'quarter'.
+        limit (int): Number of most recent reports to return.
 
     Returns:
         pd.DataFrame: Pandas DataFrame containing the key financial metrics.
     """
-    # Define the API endpoint and parameters.
-    api_endpoint = f'https://financialmodelingprep.com/api/v3/key-metrics/{symbol}'
-    params = {
-        'limit': 5,  # Get data for the last 10 years.
-        'apikey': FMP_API_KEY, 
-    }
-
     try:
-        # Create an empty list to store the ratios data.
-        metrics_data = []
-
-        # Make an HTTP GET request to the API.
-        response = requests.get(api_endpoint, params=params)
-        response.raise_for_status()  # Raise exception for any bad HTTP status code.
-
-        # Parse the response JSON data into a list of dictionaries.
-        response_data = response.json()
-
-        # Extract the ratios data from the list of dictionaries.
-        for report in response_data:
-            year = report['date'].split('-')[0]  # Extract the year from the date string.
-            metrics_data.append({
-                'Year': year,
-                "Market Cap": report['marketCap'],
-                'Working Capital': report['workingCapital'],
-                'D/E ratio': report['debtToEquity'],
-                'P/E Ratio': report['peRatio'],
-                'ROE': report['roe'], 
-                'Dividend Yield': report['dividendYield']
-            })
-
-        # Create a Pandas DataFrame from the list of dictionaries and return it.
-        metrics_df = pd.DataFrame(metrics_data).set_index('Year')
+        # Get the most recent reports, requesting only the periods newer than the stored history
+        reports = _fetch_reports('key-metrics', symbol, period, limit)
+
+        # Map the key metrics fields of every report to columns in a single pass
+        metrics_df = _parse_statement(reports, KEY_METRICS_FIELDS, year_field='date', period=period)
         return metrics_df
     
     except requests.exceptions.RequestException as e:
@@ -381,93 +703,38 @@ def get_key_metrics(symbol: str) -> pd.DataFrame:
         print(f"Error occurred while fetching data from API: {e}")
         return None
 
+    except ValueError as e:
+        print(f"Error occurred while parsing JSON response: {e}")
+        return None
+
 
-def get_financial_ratios(symbol: str) -> pd.DataFrame:
+def get_financial_ratios(symbol: str, period: str = 'annual', limit: int = 5) -> pd.DataFrame:
     """
     Fetches financial ratios for a given stock symbol using the Financial Modeling Prep API.
 
     Parameters:
     symbol (str): The stock symbol to fetch the ratios for.
+    period (str): 'annual' or 'quarter'.
+    limit (int): Number of most recent reports to return.
 
     Returns:
     pandas.DataFrame: A DataFrame containing the financial ratios data.
     """
 
-    # Define the API endpoint and parameters
-    api_endpoint = f'https://financialmodelingprep.com/api/v3/ratios/{symbol}'
-    params = {
-        'limit': 5,
-        'apikey': FMP_API_KEY, 
-    }
-
     try:
-        # Create an empty list to store the ratios data
-        ratios_data = []
+        # Get the most recent reports, requesting only the periods newer than the stored history
+        reports = _fetch_reports('ratios', symbol, period, limit)
 
-        # Make an HTTP GET request to the API
-        response = requests.get(api_endpoint, params=params)
-        response.raise_for_status()  # Raise exception for any bad HTTP status code
-
-        # Parse the response JSON data into a list of dictionaries
-        response_data = response.json()
-
-        # Extract the ratios data from the list of dictionaries
-        for report in response_data:
-            year = report['calendarYear']
-            ratios_data.append({
-                'Year': year,
-                'Current Ratio': report['currentRatio'],
-                'Quick Ratio': report['quickRatio'],
-                'Cash Ratio': report['cashRatio'],
-                'Days of Sales Outstanding': report['daysOfSalesOutstanding'],
-                'Days of Inventory Outstanding': report['daysOfInventoryOutstanding'],
-                'Operating Cycle': report['operatingCycle'],
-                'Days of Payables Outstanding': report['daysOfPayablesOutstanding'],
-                'Cash Conversion Cycle': report['cashConversionCycle'],
-                'Gross Profit Margin': report['grossProfitMargin'], 
-                'Operating Profit Margin': report['operatingProfitMargin'],
-                'Pretax Profit Margin': report['pretaxProfitMargin'],
-                'Net Profit Margin': report['netProfitMargin'],
-                'Effective Tax Rate': report['effectiveTaxRate'],
-                'Return on Assets': report['returnOnAssets'],
-                'Return on Equity': report['returnOnEquity'],
-                'Return on Capital Employed': report['returnOnCapitalEmployed'],
-                'Net Income per EBT': report['netIncomePerEBT'],
-                'EBT per EBIT': report['ebtPerEbit'],
-                'EBIT per Revenue': report['ebitPerRevenue'],
-                'Debt Ratio': report['debtRatio'],
-                'Debt Equity Ratio': report['debtEquityRatio'],
-                'Long-term Debt to Capitalization': report['longTermDebtToCapitalization'],
-                'Total Debt to Capitalization': report['totalDebtToCapitalization'],
-                'Interest Coverage': report['interestCoverage'],
-                'Cash Flow to Debt Ratio': report['cashFlowToDebtRatio'],
-                'Company Equity Multiplier': report['companyEquityMultiplier'],
-                'Receivables Turnover': report['receivablesTurnover'],
-                'Payables Turnover': report['payablesTurnover'],
-                'Inventory Turnover': report['inventoryTurnover'],
-                'Fixed Asset Turnover': report['fixedAssetTurnover'],
-                'Asset Turnover': report['assetTurnover'],
-                'Operating Cash Flow per Share': report['operatingCashFlowPerShare'],
-                'Free Cash Flow per Share': report['freeCashFlowPerShare'],
-                'Cash per Share': report['cashPerShare'],
-                'Payout Ratio': report['payoutRatio'],
-                'Operating Cash Flow Sales Ratio': report['operatingCashFlowSalesRatio'],
-                'Free Cash Flow Operating Cash Flow Ratio': report['freeCashFlowOperatingCashFlowRatio'],
-                'Cash Flow Coverage Ratios': report['cashFlowCoverageRatios'],
-                'Price to Book Value Ratio': report['priceToBookRatio'],
-                'Price to Earnings Ratio': report['priceEarningsRatio'],
-                'Price to Sales Ratio': report['priceToSalesRatio'],
-                'Dividend Yield': report['dividendYield'],
-                'Enterprise Value to EBITDA': report['enterpriseValueMultiple'],
-                'Price to Fair Value': report['priceFairValue']
-            })
-
-        # Create a Pandas DataFrame from the list of dictionaries and return it
-        ratios_df = pd.DataFrame(ratios_data).set_index('Year')
+        # Map the ratios fields of every report to columns in a single pass
+        ratios_df = _parse_statement(reports, FINANCIAL_RATIOS_FIELDS, period=period)
 
         return ratios_df
 
     except requests.exceptions.RequestException as e:
         # If an error occurs, print the error message and return None
         print('Error getting ratios data:', e)
-        return None
\ No newline at end of file
+        return None
+
+    except ValueError as e:
+        print(f"Error occurred while parsing JSON response: {e}")
+        return None
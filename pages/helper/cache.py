@@ -0,0 +1,345 @@
+"""
+This module provides a persistent SQLite cache for API responses that is shared by every Streamlit worker
+process and survives restarts and deploys.
+"""
+
+# Import necessary libraries
+import contextlib
+import functools
+import inspect
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Optional, Tuple
+
+from pages.helper.concurrency import SingleFlight
+
+
+CACHE_PATH = os.environ.get('FINANCE_CACHE_PATH', os.path.join('data', 'cache', 'api_cache.sqlite'))
+MAX_CACHE_BYTES = int(os.environ.get('FINANCE_CACHE_MAX_BYTES', 256 * 1024 * 1024)) # 256 MB
+LEASE_TTL = 30 # seconds a lease lasts unless its holder renews it, so others take over from a crashed process
+LEASE_POLL_INTERVAL = 0.1 # seconds between checks while another process fetches a key
+LEASE_RENEW_INTERVAL = 10 # seconds between extensions of a lease while its fetch is still running
+
+
+class DiskCache:
+    """
+    Key/value store backed by a single SQLite file. Values are pickled, entries remember when they were
+    written and last read, and the least recently used entries are evicted once the file grows past
+    `max_bytes`.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, max_bytes: int = MAX_CACHE_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+        # Create the cache directory and table on first use
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, endpoint TEXT, value BLOB, size INTEGER, '
+                'created_at REAL, accessed_at REAL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)')
+            conn.execute('CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, owner TEXT, expires_at REAL)')
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Returns the SQLite connection of the calling thread, opening it on first use.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            # WAL lets readers in other processes continue while one process writes
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """
+        Returns the cached value for a key together with its age in seconds.
+
+        Parameters:
+            key (str): Cache key.
+
+        Returns:
+            tuple: (value, age in seconds), or None if the key is missing or unreadable.
+        """
+        try:
+            conn = self._connect()
+            row = conn.execute('SELECT value, created_at FROM cache WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            with conn:
+                conn.execute('UPDATE cache SET accessed_at = ? WHERE key = ?', (time.time(), key))
+            return pickle.loads(row[0]), time.time() - row[1]
+        except Exception as e:
+            # A corrupt or incompatible entry is treated as a cache miss
+            print(f"Error occurred while reading from cache: {e}")
+            return None
+
+    def set(self, key: str, value: Any, endpoint: str = '') -> None:
+        """
+        Stores a value under a key and evicts old entries if the cache is over its size limit.
+
+        Parameters:
+            key (str): Cache key.
+            value (Any): Picklable value to store.
+            endpoint (str): Name of the API endpoint the value came from.
+        """
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            now = time.time()
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO cache (key, endpoint, value, size, created_at, accessed_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (key, endpoint, blob, len(blob), now, now)
+                )
+            self._evict()
+        except Exception as e:
+            print(f"Error occurred while writing to cache: {e}")
+
+    def delete(self, key: str) -> None:
+        """
+        Removes a key from the cache.
+
+        Parameters:
+            key (str): Cache key.
+        """
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def acquire_lease(self, key: str, ttl: float = LEASE_TTL) -> bool:
+        """
+        Claims the right to fetch a key, so other processes wait for the result instead of fetching it too. A lease
+        that is not released expires after `ttl` seconds.
+
+        Parameters:
+            key (str): Cache key.
+            ttl (float): Seconds until the lease expires.
+
+        Returns:
+            bool: True if the lease was acquired, False if another fetch holds it.
+        """
+        now = time.time()
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute('DELETE FROM leases WHERE key = ? AND expires_at < ?', (key, now))
+                cursor = conn.execute(
+                    'INSERT OR IGNORE INTO leases (key, owner, expires_at) VALUES (?, ?, ?)',
+                    (key, self.lease_owner(), now + ttl)
+                )
+            return cursor.rowcount == 1
+        except Exception as e:
+            # Without a working lease table every process simply fetches for itself
+            print(f"Error occurred while acquiring cache lease: {e}")
+            return True
+
+    def renew_lease(self, key: str, owner: str, ttl: float = LEASE_TTL) -> bool:
+        """
+        Extends a lease, so it does not expire while its holder is still fetching, e.g. while it waits for the rate
+        limiter.
+
+        Parameters:
+            key (str): Cache key.
+            owner (str): Holder of the lease, as returned by lease_owner() on the thread that acquired it.
+            ttl (float): Seconds from now until the lease expires.
+
+        Returns:
+            bool: True if the lease was extended, False if the owner no longer holds it.
+        """
+        try:
+            conn = self._connect()
+            with conn:
+                cursor = conn.execute('UPDATE leases SET expires_at = ? WHERE key = ? AND owner = ?',
+                                      (time.time() + ttl, key, owner))
+            return cursor.rowcount == 1
+        except Exception as e:
+            print(f"Error occurred while renewing cache lease: {e}")
+            return False
+
+    def release_lease(self, key: str) -> None:
+        """
+        Releases a lease acquired by this thread.
+
+        Parameters:
+            key (str): Cache key.
+        """
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute('DELETE FROM leases WHERE key = ? AND owner = ?', (key, self.lease_owner()))
+        except Exception as e:
+            print(f"Error occurred while releasing cache lease: {e}")
+
+    @staticmethod
+    def lease_owner() -> str:
+        """
+        Returns the lease holder name of the calling thread.
+        """
+        return f"{os.getpid()}:{threading.get_ident()}"
+
+    def _evict(self) -> None:
+        """
+        Deletes the least recently read entries until the cache is back under 90% of its size limit.
+        """
+        conn = self._connect()
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM cache').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        target = total - int(self.max_bytes * 0.9)
+        freed = 0
+        stale_keys = []
+        for key, size in conn.execute('SELECT key, size FROM cache ORDER BY accessed_at'):
+            stale_keys.append((key,))
+            freed += size
+            if freed >= target:
+                break
+        with conn:
+            conn.executemany('DELETE FROM cache WHERE key = ?', stale_keys)
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+_flights = SingleFlight() # shared by every decorated function, so functions redefined on a page rerun still coalesce
+
+
+def get_cache() -> DiskCache:
+    """
+    Returns the process-wide cache instance, creating it on first use.
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = DiskCache()
+        return _default_cache
+
+
+@contextlib.contextmanager
+def _renewing_lease(cache: DiskCache, key: str):
+    """
+    Keeps renewing a lease held by the calling thread until the block exits, then releases it.
+    """
+    owner = cache.lease_owner()
+    done = threading.Event()
+
+    def renew():
+        while not done.wait(LEASE_RENEW_INTERVAL):
+            cache.renew_lease(key, owner)
+
+    threading.Thread(target=renew, daemon=True).start()
+    try:
+        yield
+    finally:
+        done.set()
+        cache.release_lease(key)
+
+
+def disk_cached(endpoint: str, ttl: float, stale_ttl: float = 0) -> Callable:
+    """
+    Decorator that caches a function's result on disk, keyed by the endpoint name and the call arguments.
+
+    Fresh entries (younger than `ttl`) are returned directly. Stale entries younger than `ttl + stale_ttl`
+    are returned immediately while a background thread refreshes them. Older entries are refetched before
+    returning, and the stale value is still served if the refetch fails. `None` results are never cached,
+    so failed requests are retried on the next call.
+
+    Concurrent misses for the same key are coalesced: threads of one process share a single call, and a lease in
+    the cache file makes other processes wait for that call's result instead of requesting it again.
+
+    Parameters:
+        endpoint (str): Name of the API endpoint, used as the key prefix.
+        ttl (float): Seconds an entry is considered fresh.
+        stale_ttl (float): Extra seconds a stale entry may be served while it is refreshed.
+
+    Returns:
+        Callable: The decorator.
+    """
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+        refreshing = set()
+        refreshing_lock = threading.Lock()
+
+        def cache_key(*args, **kwargs) -> str:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return f"{endpoint}:{json.dumps(bound.arguments, sort_keys=True, default=str)}"
+
+        def refresh(key, args, kwargs):
+            try:
+                value = func(*args, **kwargs)
+                if value is not None:
+                    get_cache().set(key, value, endpoint)
+                return value
+            finally:
+                with refreshing_lock:
+                    refreshing.discard(key)
+
+        def background_refresh(key, args, kwargs):
+            # Another process already refreshing the entry is enough
+            cache = get_cache()
+            if not cache.acquire_lease(key):
+                with refreshing_lock:
+                    refreshing.discard(key)
+                return
+            with _renewing_lease(cache, key):
+                refresh(key, args, kwargs)
+
+        def fetch(key, args, kwargs):
+            cache = get_cache()
+            while True:
+                if cache.acquire_lease(key):
+                    # The lease is renewed while the call waits for its rate limiter and the response
+                    with _renewing_lease(cache, key):
+                        # The process that held the lease before may have just stored the value
+                        cached = cache.get(key)
+                        if cached is not None and cached[1] < ttl:
+                            return cached[0]
+                        with refreshing_lock:
+                            refreshing.add(key)
+                        return refresh(key, args, kwargs)
+
+                # Another process is fetching the key; use its result once it is stored
+                time.sleep(LEASE_POLL_INTERVAL)
+                cached = cache.get(key)
+                if cached is not None and cached[1] < ttl:
+                    return cached[0]
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = cache_key(*args, **kwargs)
+            cached = get_cache().get(key)
+
+            if cached is not None:
+                value, age = cached
+                if age < ttl:
+                    return value
+                if age < ttl + stale_ttl:
+                    # Serve the stale value and refresh it once in the background
+                    with refreshing_lock:
+                        start = key not in refreshing
+                        refreshing.add(key)
+                    if start:
+                        threading.Thread(target=background_refresh, args=(key, args, kwargs), daemon=True).start()
+                    return value
+
+            value = _flights.do(key, fetch, key, args, kwargs)
+            if value is None and cached is not None:
+                return cached[0]
+            return value
+
+        wrapper.cache_key = cache_key
+        return wrapper
+
+    return decorator
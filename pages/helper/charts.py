@@ -0,0 +1,115 @@
+"""
+This module builds the Plotly figures of the Portfolio Tracker. Each builder is memoized on the data it is given,
+so a rerun with unchanged data reuses the figure instead of building it again, and the number of cached figures
+is bounded so memory stays flat in a long-running deployment.
+"""
+
+# Import necessary libraries
+import pandas as pd
+import plotly.graph_objs as go
+import streamlit as st
+from plotly.subplots import make_subplots
+
+
+CHART_CACHE_ENTRIES = 16 # figures kept per builder
+CHART_CACHE_TTL = 24*60*60 # seconds a cached figure is kept
+
+
+@st.cache_data(max_entries=CHART_CACHE_ENTRIES, ttl=CHART_CACHE_TTL, show_spinner=False)
+def allocation_pie(allocation: pd.Series, title: str = "Sector Diversification") -> go.Figure:
+    """
+    Returns a pie chart of an allocation.
+
+    Parameters:
+        allocation (pd.Series): Amount per slice, indexed by label.
+        title (str): Chart title.
+
+    Returns:
+        go.Figure: Pie chart with percentage labels.
+    """
+    fig = go.Figure(go.Pie(labels=allocation.index, values=allocation.values, textinfo="label+percent", sort=False))
+    fig.update_layout(title=title, height=450, margin=dict(t=40), showlegend=False)
+    return fig
+
+
+@st.cache_data(max_entries=CHART_CACHE_ENTRIES, ttl=CHART_CACHE_TTL, show_spinner=False)
+def value_chart(nav: pd.DataFrame, drawdown: pd.Series) -> go.Figure:
+    """
+    Returns the portfolio value and net amount invested over time, with the drawdown in a panel below.
+
+    Parameters:
+        nav (pd.DataFrame): NAV and Cost Basis indexed by date.
+        drawdown (pd.Series): Drawdown per date as a fraction.
+
+    Returns:
+        go.Figure: Two-panel line chart.
+    """
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.7, 0.3], vertical_spacing=0.05)
+    fig.add_trace(go.Scatter(x=nav.index, y=nav["NAV"], name="Market Value"), row=1, col=1)
+    fig.add_trace(go.Scatter(x=nav.index, y=nav["Cost Basis"], name="Net Invested", line=dict(dash="dot")), row=1, col=1)
+    fig.add_trace(go.Scatter(x=drawdown.index, y=drawdown * 100, name="Drawdown %", fill="tozeroy"), row=2, col=1)
+    fig.update_yaxes(title_text="Value ($)", row=1, col=1)
+    fig.update_yaxes(title_text="Drawdown (%)", row=2, col=1)
+    fig.update_layout(height=500, margin=dict(t=20), legend=dict(orientation="h"))
+    return fig
+
+
+@st.cache_data(max_entries=CHART_CACHE_ENTRIES, ttl=CHART_CACHE_TTL, show_spinner=False)
+def line_chart(data: pd.DataFrame, title: str, scale: float = 1.0, height: int = 350) -> go.Figure:
+    """
+    Returns a line chart with one line per column.
+
+    Parameters:
+        data (pd.DataFrame): Values indexed by the x axis.
+        title (str): Chart title.
+        scale (float): Factor applied to the values, e.g. 100 to show fractions as percentages.
+        height (int): Chart height in pixels.
+
+    Returns:
+        go.Figure: Line chart.
+    """
+    fig = go.Figure([go.Scatter(x=data.index, y=data[column] * scale, name=str(column)) for column in data.columns])
+    fig.update_layout(title=title, height=height, margin=dict(t=40))
+    return fig
+
+
+@st.cache_data(max_entries=CHART_CACHE_ENTRIES, ttl=CHART_CACHE_TTL, show_spinner=False)
+def correlation_heatmap(correlation: pd.DataFrame, title: str = "Correlation of Daily Returns") -> go.Figure:
+    """
+    Returns a heatmap of a correlation matrix.
+
+    Parameters:
+        correlation (pd.DataFrame): Square correlation matrix.
+        title (str): Chart title.
+
+    Returns:
+        go.Figure: Heatmap annotated with the correlations.
+    """
+    fig = go.Figure(go.Heatmap(
+        z=correlation.values, x=correlation.columns, y=correlation.index,
+        zmin=-1, zmax=1, colorscale="RdBu", text=correlation.round(2).values, texttemplate="%{text}"
+    ))
+    fig.update_layout(title=title, height=400, margin=dict(t=40))
+    return fig
+
+
+@st.cache_data(max_entries=CHART_CACHE_ENTRIES, ttl=CHART_CACHE_TTL, show_spinner=False)
+def percentile_bands(bands: pd.DataFrame, title: str = "Simulated Portfolio Value") -> go.Figure:
+    """
+    Returns a fan chart of simulated values.
+
+    Parameters:
+        bands (pd.DataFrame): P5, P25, P50, P75 and P95 values per simulated day.
+        title (str): Chart title.
+
+    Returns:
+        go.Figure: Median line with shaded 5th-95th and 25th-75th percentile bands.
+    """
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=bands.index, y=bands["P95"], line=dict(width=0), showlegend=False))
+    fig.add_trace(go.Scatter(x=bands.index, y=bands["P5"], fill="tonexty", line=dict(width=0), name="5th-95th percentile"))
+    fig.add_trace(go.Scatter(x=bands.index, y=bands["P75"], line=dict(width=0), showlegend=False))
+    fig.add_trace(go.Scatter(x=bands.index, y=bands["P25"], fill="tonexty", line=dict(width=0), name="25th-75th percentile"))
+    fig.add_trace(go.Scatter(x=bands.index, y=bands["P50"], name="Median"))
+    fig.update_layout(title=title, xaxis_title="Trading days", yaxis_title="Value ($)", height=400, margin=dict(t=40))
+    return fig
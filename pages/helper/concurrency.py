@@ -0,0 +1,259 @@
+"""
+This module provides helpers for running independent data requests concurrently.
+"""
+
+# Import necessary libraries
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+except ImportError: # older Streamlit releases do not expose the script context helpers
+    add_script_run_ctx = get_script_run_ctx = None
+
+
+MAX_WORKERS = 8 # default number of concurrent requests
+REQUEST_TIMEOUT = 10 # default seconds allowed for each request
+
+
+def _make_executor(max_workers: int) -> ThreadPoolExecutor:
+    """
+    Creates a thread pool whose workers share the current Streamlit script context, so cached
+    functions and session state keep working inside them.
+
+    Parameters:
+        max_workers (int): Maximum number of worker threads.
+
+    Returns:
+        ThreadPoolExecutor: The configured thread pool.
+    """
+    ctx = get_script_run_ctx() if get_script_run_ctx else None
+
+    def attach_ctx():
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+
+    return ThreadPoolExecutor(max_workers=max_workers, initializer=attach_ctx)
+
+
+def _completed_in_time(executor: ThreadPoolExecutor, calls: Iterable[Tuple[Hashable, Callable[[], Any]]],
+                       max_workers: int, timeout: float) -> Iterator[Tuple[Hashable, Optional[Future]]]:
+    """
+    Submits calls to a thread pool and yields each one as soon as it finishes or overruns. Every call is allowed
+    `timeout` seconds from the moment a worker starts it, so calls queued behind others are not charged for the wait.
+
+    Parameters:
+        executor (ThreadPoolExecutor): Thread pool to run the calls on.
+        calls (Iterable): (key, callable without arguments) pairs.
+        max_workers (int): Number of worker threads of the pool.
+        timeout (float): Seconds allowed for each call once it has started.
+
+    Yields:
+        tuple: (key, future) in completion order. The future is None for calls that ran for longer than `timeout`,
+        and for queued calls that can no longer start because every worker is held by an overrunning call.
+    """
+    started = {}
+
+    def timed(key, call):
+        started[key] = time.monotonic()
+        return call()
+
+    futures = {executor.submit(timed, key, call): key for key, call in calls}
+    pending = set(futures)
+    overrunning = []
+    while pending:
+        # A call that has not started yet cannot overrun before `timeout` seconds from now
+        now = time.monotonic()
+        deadlines = [started[futures[f]] + timeout for f in pending if futures[f] in started]
+        done, _ = wait(pending, timeout=max(0.0, min(deadlines, default=now + timeout) - now),
+                       return_when=FIRST_COMPLETED)
+        for future in done:
+            pending.discard(future)
+            yield futures[future], future
+
+        now = time.monotonic()
+        for future in list(pending):
+            key = futures[future]
+            if key in started and now - started[key] >= timeout:
+                pending.discard(future)
+                overrunning.append(future)
+                yield key, None
+
+        # Overrunning calls cannot be interrupted, so give up on the queue once they hold every worker
+        if sum(not future.done() for future in overrunning) >= max_workers:
+            for future in list(pending):
+                if futures[future] not in started:
+                    pending.discard(future)
+                    yield futures[future], None
+
+
+def map_concurrently(func: Callable[[Any], Any], items: Iterable[Any], max_workers: int = MAX_WORKERS,
+                     timeout: float = REQUEST_TIMEOUT, default: Any = None) -> List[Any]:
+    """
+    Calls a function for every item on a bounded thread pool and returns the results in input order.
+
+    Each item is allowed `timeout` seconds from the moment a worker starts it. Items that raise an exception or
+    run for longer are returned as `default`.
+
+    Parameters:
+        func (Callable): Function to call with each item.
+        items (Iterable): Items to process.
+        max_workers (int): Maximum number of concurrent calls.
+        timeout (float): Seconds allowed for each call.
+        default (Any): Value returned for failed or timed out items.
+
+    Returns:
+        list: One result per item, in the same order as the input.
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    max_workers = max(1, min(max_workers, len(items)))
+    calls = ((i, lambda item=item: func(item)) for i, item in enumerate(items))
+
+    executor = _make_executor(max_workers)
+    try:
+        results = [default] * len(items)
+        for i, future in _completed_in_time(executor, calls, max_workers, timeout):
+            if future is not None and future.exception() is None:
+                results[i] = future.result()
+        return results
+    finally:
+        # Do not block the page on calls that overran their timeout
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_concurrently(func: Callable[[Any], Any], items: Iterable[Any], max_workers: int = MAX_WORKERS,
+                      timeout: float = REQUEST_TIMEOUT) -> Iterator[Tuple[Any, Any, Optional[BaseException]]]:
+    """
+    Calls a function for every item on a bounded thread pool and yields each outcome as soon as it is ready,
+    so the caller can show partial results while the rest are still running. The caller's loop runs in the
+    calling thread, which is where Streamlit elements should be written.
+
+    Parameters:
+        func (Callable): Function to call with each item.
+        items (Iterable): Items to process.
+        max_workers (int): Maximum number of concurrent calls.
+        timeout (float): Seconds allowed for each call.
+
+    Yields:
+        tuple: (item, result, exception) in completion order. `exception` is None on success; items that run for
+        longer than `timeout` seconds from the moment a worker starts them are yielded with a TimeoutError.
+    """
+    items = list(items)
+    if not items:
+        return
+
+    max_workers = max(1, min(max_workers, len(items)))
+    calls = ((i, lambda item=item: func(item)) for i, item in enumerate(items))
+
+    executor = _make_executor(max_workers)
+    try:
+        for i, future in _completed_in_time(executor, calls, max_workers, timeout):
+            if future is None:
+                yield items[i], None, TimeoutError('Request timed out.')
+            else:
+                yield items[i], future.result() if future.exception() is None else None, future.exception()
+    finally:
+        # Do not block the page on calls that overran their timeout
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+@dataclass
+class TaskResults:
+    """
+    Results of a batch of named tasks. `data` holds the value of every task that succeeded and `errors`
+    holds a message for every task that failed, timed out or returned nothing.
+    """
+    data: Dict[str, Any] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self.data.get(name, default)
+
+    def ok(self, name: str) -> bool:
+        return name in self.data
+
+
+def run_concurrently(tasks: Dict[str, Callable[[], Any]], max_workers: int = MAX_WORKERS,
+                     timeout: float = REQUEST_TIMEOUT) -> TaskResults:
+    """
+    Runs independent named tasks at the same time and collects every outcome instead of stopping at the
+    first failure.
+
+    Parameters:
+        tasks (dict): Mapping of task name to a callable without arguments.
+        max_workers (int): Maximum number of concurrent tasks.
+        timeout (float): Seconds allowed for each task.
+
+    Returns:
+        TaskResults: Values of the successful tasks and error messages of the failed ones.
+    """
+    results = TaskResults()
+    if not tasks:
+        return results
+
+    max_workers = max(1, min(max_workers, len(tasks)))
+
+    executor = _make_executor(max_workers)
+    try:
+        for name, future in _completed_in_time(executor, tasks.items(), max_workers, timeout):
+            if future is None:
+                results.errors[name] = 'Request timed out.'
+            elif future.exception() is not None:
+                results.errors[name] = str(future.exception()) or type(future.exception()).__name__
+            elif future.result() is None:
+                results.errors[name] = 'No data returned.'
+            else:
+                results.data[name] = future.result()
+        # Report the failures in the order the tasks were given rather than the order they finished
+        results.errors = {name: results.errors[name] for name in tasks if name in results.errors}
+        return results
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key. The first caller runs the function; callers that arrive while it
+    is running wait for it and receive the same result, or the same exception, instead of repeating the request.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Calls `func(*args, **kwargs)` unless a call with the same key is already running, in which case its
+        outcome is shared.
+
+        Parameters:
+            key (Hashable): Identifies calls that may share one result.
+            func (Callable): Function to call.
+
+        Returns:
+            Any: Result of the call.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result()
+
+        try:
+            result = func(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
@@ -0,0 +1,142 @@
+"""
+This module computes the cost basis and profit and loss of holdings from a list of buy and sell transactions.
+"""
+
+# Import necessary libraries
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+COST_BASIS_METHODS = {
+    'average': 'Weighted Average',
+    'fifo': 'FIFO',
+    'lifo': 'LIFO',
+}
+
+
+def match_lots(transactions: pd.DataFrame, method: str = 'average') -> Tuple[pd.DataFrame, pd.Series]:
+    """
+    Matches the sold shares of every ticker against the lots bought before each sale.
+
+    Sold shares are taken from the oldest lots first (FIFO), the newest lots first (LIFO), or from every lot in
+    proportion to its size at the running average cost (average). Transactions are ordered by date, keeping the
+    ledger order for transactions of the same day. A sale of more shares than are held only consumes the shares
+    held. All tickers are matched at once from cumulative sums of the shares held, without walking the lots.
+
+    Parameters:
+        transactions (pd.DataFrame): One row per transaction with Ticker, Date, Shares (negative for sells) and Price.
+        method (str): 'average', 'fifo' or 'lifo'.
+
+    Returns:
+        tuple: The buy lots with the shares still held (Ticker, Date, Shares, Price), and the realized gain per ticker.
+
+    Raises:
+        ValueError: If the method is unknown.
+    """
+    if method not in COST_BASIS_METHODS:
+        raise ValueError(f"Unknown cost basis method '{method}', expected one of {list(COST_BASIS_METHODS)}")
+
+    ordered = transactions.sort_values(['Ticker', 'Date'], kind='stable')
+    tickers = ordered['Ticker']
+    shares = ordered['Shares'].astype('float64')
+    is_buy = (shares > 0).to_numpy()
+    sells = ordered[(shares < 0).to_numpy()]
+
+    # Sale proceeds per ticker
+    proceeds = (-sells['Shares'] * sells['Price']).groupby(sells['Ticker']).sum()
+
+    # Shares held after each transaction. An oversold sale empties the position instead of going negative, which
+    # is the running total minus its lowest negative value so far
+    total = shares.groupby(tickers).cumsum()
+    held = total - total.groupby(tickers).cummin().clip(upper=0)
+    held_before = held.groupby(tickers).shift(fill_value=0.0)
+    sold = (held_before - held).clip(lower=0) # shares actually taken from the lots by each sale
+
+    buys = ordered[is_buy]
+    lot_shares = buys['Shares'].to_numpy(dtype='float64')
+    if method == 'fifo':
+        # The oldest lots give up the shares sold, as far as the lots bought before them do not cover the sales
+        bought_before = buys.groupby('Ticker')['Shares'].cumsum().to_numpy() - lot_shares
+        to_sell = buys['Ticker'].map(sold.groupby(tickers).sum()).to_numpy()
+        remaining = lot_shares - np.clip(to_sell - bought_before, 0, lot_shares)
+    elif method == 'lifo':
+        # Each lot holds the shares between the position before it and the position after it; they are only sold
+        # when the position later drops below that level
+        lowest_after = held[::-1].groupby(tickers[::-1]).cummin()[::-1]
+        remaining = np.clip((lowest_after - held_before).to_numpy()[is_buy], 0, lot_shares)
+    elif method == 'average':
+        # Every sale keeps the same fraction of each lot held, so a lot keeps the product of the fractions kept by
+        # the sales after it; a sale of every share held keeps nothing
+        kept = (1 - sold / held_before).where(sold > 0, 1.0).clip(lower=0)
+        emptied = (kept <= 1e-12).astype('float64')
+        log_kept = np.log(kept.where(kept > 1e-12, 1.0))
+        log_after = log_kept.groupby(tickers).transform('sum') - log_kept.groupby(tickers).cumsum()
+        emptied_after = emptied.groupby(tickers).transform('sum') - emptied.groupby(tickers).cumsum()
+        remaining = lot_shares * np.where(emptied_after.to_numpy() > 0, 0.0, np.exp(log_after.to_numpy()))[is_buy]
+    else:
+        raise ValueError(f"Unknown cost basis method '{method}', expected one of {list(COST_BASIS_METHODS)}")
+
+    sold_cost = pd.Series((lot_shares - remaining) * buys['Price'].to_numpy(), index=buys.index).groupby(buys['Ticker']).sum()
+    open_lots = buys[['Ticker', 'Date', 'Price']].assign(Shares=remaining)
+    open_lots = open_lots.loc[open_lots['Shares'] > 1e-9, ['Ticker', 'Date', 'Shares', 'Price']]
+    realized = proceeds.sub(sold_cost, fill_value=0)
+
+    return open_lots, realized
+
+
+def compute_cost_basis(transactions: pd.DataFrame, method: str = 'average',
+                       market_prices: Optional[pd.Series] = None) -> pd.DataFrame:
+    """
+    Computes the remaining shares, cost basis and realized profit of every ticker.
+
+    Parameters:
+        transactions (pd.DataFrame): One row per transaction with Ticker, Date, Shares (negative for sells) and Price.
+        method (str): 'average', 'fifo' or 'lifo'. See match_lots for how sold shares are matched.
+        market_prices (pd.Series): Optional latest price per ticker, used for the unrealized profit.
+
+    Returns:
+        pd.DataFrame: Per ticker: Shares, Cost/Share, Total Cost and Realized Gain, plus Market Price, Total Value
+        and Unrealized Gain when market prices are given.
+    """
+    open_lots, realized = match_lots(transactions, method)
+    return summarize_lots(open_lots, realized, market_prices)
+
+
+def summarize_lots(open_lots: pd.DataFrame, realized: Optional[pd.Series] = None,
+                   market_prices: Optional[pd.Series] = None) -> pd.DataFrame:
+    """
+    Aggregates open lots into one row per ticker.
+
+    Parameters:
+        open_lots (pd.DataFrame): Lots still held with Ticker, Shares and Price.
+        realized (pd.Series): Optional realized gain per ticker.
+        market_prices (pd.Series): Optional latest price per ticker, used for the unrealized profit.
+
+    Returns:
+        pd.DataFrame: Per ticker: Shares, Cost/Share, Total Cost and Realized Gain, plus Market Price, Total Value
+        and Unrealized Gain when market prices are given.
+    """
+    shares = open_lots.groupby('Ticker')['Shares'].sum()
+    total_cost = (open_lots['Shares'] * open_lots['Price']).groupby(open_lots['Ticker']).sum()
+    realized = realized if realized is not None else pd.Series(dtype='float64')
+    tickers = shares.index.union(realized.index)
+
+    shares = shares.reindex(tickers, fill_value=0.0)
+    total_cost = total_cost.reindex(tickers, fill_value=0.0)
+
+    holdings = pd.DataFrame({
+        'Shares': shares,
+        'Cost/Share': (total_cost / shares).where(shares > 0),
+        'Total Cost': total_cost,
+        'Realized Gain': realized.reindex(tickers, fill_value=0.0),
+    })
+    holdings.index.name = 'Ticker'
+
+    if market_prices is not None:
+        holdings['Market Price'] = market_prices.reindex(holdings.index)
+        holdings['Total Value'] = holdings['Shares'] * holdings['Market Price']
+        holdings['Unrealized Gain'] = holdings['Total Value'] - holdings['Total Cost']
+
+    return holdings
@@ -0,0 +1,123 @@
+"""
+This module provides the shared HTTP client used by every API helper. It keeps a pooled keep-alive session and
+retries throttled or failed requests with exponential backoff.
+"""
+
+# Import necessary libraries
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from pages.helper.rateLimit import get_limiter
+
+
+DEFAULT_TIMEOUT = 15 # seconds to wait for the server before giving up on an attempt
+MAX_RETRIES = 4 # number of retries after the first attempt
+BACKOFF_BASE = 0.5 # seconds, doubled after every failed attempt
+BACKOFF_MAX = 30 # upper bound in seconds for a single wait
+POOL_MAXSIZE = 32 # keep-alive connections kept open per host
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    Returns the process-wide HTTP session, creating it on first use.
+
+    Returns:
+        requests.Session: Session with a connection pool large enough for concurrent requests.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            # Retries are handled in http_get so they can honour Retry-After
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=POOL_MAXSIZE, max_retries=0)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
+
+def _retry_after(response: requests.Response) -> Optional[float]:
+    """
+    Parses the Retry-After header of a response.
+
+    Parameters:
+        response (requests.Response): The throttled response.
+
+    Returns:
+        float: Seconds to wait, or None if the header is missing or invalid.
+    """
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        # The header may also be an HTTP date
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff(attempt: int) -> float:
+    """
+    Returns the wait before the next attempt using exponential backoff with full jitter.
+
+    Parameters:
+        attempt (int): Number of attempts made so far, starting at 0.
+
+    Returns:
+        float: Seconds to wait.
+    """
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def http_get(url: str, params: Optional[dict] = None, timeout: float = DEFAULT_TIMEOUT,
+             max_retries: int = MAX_RETRIES, provider: Optional[str] = None) -> requests.Response:
+    """
+    Makes an HTTP GET request through the shared session, retrying connection errors, timeouts and
+    429/5xx responses.
+
+    Parameters:
+        url (str): URL to request.
+        params (dict): Query string parameters.
+        timeout (float): Seconds to wait for the server on each attempt.
+        max_retries (int): Number of retries after the first attempt.
+        provider (str): Data provider whose rate limiter every attempt waits on, e.g. 'fmp'.
+
+    Returns:
+        requests.Response: The last response received. Callers should still call raise_for_status().
+
+    Raises:
+        requests.exceptions.RequestException: If the last attempt failed without a response.
+    """
+    session = get_session()
+    limiter = get_limiter(provider) if provider else None
+
+    for attempt in range(max_retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            response = session.get(url, params=params, timeout=timeout)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if attempt == max_retries:
+                raise
+            time.sleep(_backoff(attempt))
+            continue
+
+        if response.status_code not in RETRY_STATUSES or attempt == max_retries:
+            return response
+
+        # Prefer the wait the server asked for, but never sleep longer than the backoff cap
+        wait = _retry_after(response)
+        time.sleep(min(BACKOFF_MAX, wait) if wait is not None else _backoff(attempt))
@@ -0,0 +1,146 @@
+"""
+This module loads the trade ledgers used by the Portfolio Tracker into typed DataFrames.
+"""
+
+# Import necessary libraries
+import glob
+import os
+
+import pandas as pd
+
+
+LEDGER_CACHE_PATH = os.environ.get('FINANCE_LEDGER_CACHE_PATH', os.path.join('data', 'cache', 'ledger'))
+TRADES_PATH = os.path.join('data', 'trades.json')
+PAST_TRADES_PATH = os.path.join('data', 'pasttrades.json')
+
+# Mapping of the open trades file fields to DataFrame columns and their types
+TRADES_COLUMNS = {
+    'ticker': ('Ticker', 'object'),
+    'company': ('Company', 'object'),
+    'date': ('Date', 'datetime64[ns]'),
+    'shares': ('Shares', 'float64'),
+    'cost_share': ('Cost/Share', 'float64'),
+}
+
+# Mapping of the past trades file fields to DataFrame columns and their types
+PAST_TRADES_COLUMNS = {
+    'ticker': ('Ticker', 'object'),
+    'entry_date': ('Entry Date', 'datetime64[ns]'),
+    'entry_price': ('Entry Price', 'float64'),
+    'share_number': ('Shares', 'float64'),
+    'sell_date': ('Sell Date', 'datetime64[ns]'),
+    'sell_price': ('Sell Price', 'float64'),
+}
+
+
+def _read_ledger(path: str, columns: dict) -> pd.DataFrame:
+    """
+    Reads a JSON list of trades straight into a DataFrame with the mapped column names and types.
+
+    Parameters:
+        path (str): Path of the JSON file.
+        columns (dict): Mapping of JSON field to (column name, dtype).
+
+    Returns:
+        pd.DataFrame: One row per trade.
+    """
+    raw = pd.read_json(path, orient='records', dtype=False, convert_dates=False)
+    return coerce_columns(raw, columns)
+
+
+def coerce_columns(raw: pd.DataFrame, columns: dict) -> pd.DataFrame:
+    """
+    Selects, renames and types the fields of raw JSON records.
+
+    Parameters:
+        raw (pd.DataFrame): Records as read from JSON, without type conversion.
+        columns (dict): Mapping of JSON field to (column name, dtype). Missing fields become empty columns.
+
+    Returns:
+        pd.DataFrame: The mapped columns with their types.
+    """
+    ledger = raw.reindex(columns=list(columns)).rename(columns={field: name for field, (name, _) in columns.items()})
+
+    for name, dtype in columns.values():
+        if dtype == 'datetime64[ns]':
+            ledger[name] = pd.to_datetime(ledger[name], format='%Y-%m-%d')
+        elif dtype == 'float64':
+            ledger[name] = pd.to_numeric(ledger[name], errors='coerce').astype('float64')
+        else:
+            ledger[name] = ledger[name].astype(dtype)
+    return ledger
+
+
+def load_ledger(path: str, columns: dict, use_cache: bool = True) -> pd.DataFrame:
+    """
+    Loads a trade ledger, reusing a Parquet copy of the parsed ledger while the JSON file is unchanged.
+
+    Parameters:
+        path (str): Path of the JSON file.
+        columns (dict): Mapping of JSON field to (column name, dtype).
+        use_cache (bool): Read and write the Parquet copy.
+
+    Returns:
+        pd.DataFrame: One row per trade.
+
+    Raises:
+        FileNotFoundError: If the JSON file does not exist.
+        ValueError: If the JSON file cannot be parsed.
+    """
+    if not use_cache:
+        return _read_ledger(path, columns)
+
+    # The Parquet copy is named after the size and modification time of the JSON file it was parsed from
+    stat = os.stat(path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    cache_file = os.path.join(LEDGER_CACHE_PATH, f"{stem}-{stat.st_mtime_ns}-{stat.st_size}.parquet")
+
+    if os.path.exists(cache_file):
+        try:
+            return pd.read_parquet(cache_file)
+        except Exception as e:
+            print(f"Error occurred while reading cached ledger: {e}")
+
+    ledger = _read_ledger(path, columns)
+
+    try:
+        os.makedirs(LEDGER_CACHE_PATH, exist_ok=True)
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        ledger.to_parquet(tmp_file)
+        os.replace(tmp_file, cache_file)
+        # Remove copies of older versions of the file
+        for old_file in glob.glob(os.path.join(LEDGER_CACHE_PATH, f"{glob.escape(stem)}-*.parquet")):
+            if old_file != cache_file:
+                os.remove(old_file)
+    except Exception as e:
+        print(f"Error occurred while caching ledger: {e}")
+
+    return ledger
+
+
+def load_trades(path: str = TRADES_PATH, use_cache: bool = True) -> pd.DataFrame:
+    """
+    Loads the open trades ledger.
+
+    Parameters:
+        path (str): Path of the trades file.
+        use_cache (bool): Reuse the Parquet copy of the parsed ledger.
+
+    Returns:
+        pd.DataFrame: Ticker, Company, Date, Shares and Cost/Share of every trade.
+    """
+    return load_ledger(path, TRADES_COLUMNS, use_cache)
+
+
+def load_past_trades(path: str = PAST_TRADES_PATH, use_cache: bool = True) -> pd.DataFrame:
+    """
+    Loads the closed trades ledger.
+
+    Parameters:
+        path (str): Path of the past trades file.
+        use_cache (bool): Reuse the Parquet copy of the parsed ledger.
+
+    Returns:
+        pd.DataFrame: Ticker, Entry Date, Entry Price, Shares, Sell Date and Sell Price of every trade.
+    """
+    return load_ledger(path, PAST_TRADES_COLUMNS, use_cache)
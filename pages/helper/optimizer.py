@@ -0,0 +1,299 @@
+"""
+This module computes target portfolio weights for the current holdings (minimum variance, maximum Sharpe ratio or
+risk parity) under long-only, per-holding and per-sector limits, and the trades needed to reach them. The solvers
+work on a precomputed covariance matrix and accept the previous solution as a starting point, so changing a limit
+only takes a few iterations.
+"""
+
+# Import necessary libraries
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+OBJECTIVES = {
+    'min_variance': 'Minimum Variance',
+    'max_sharpe': 'Maximum Sharpe Ratio',
+    'risk_parity': 'Risk Parity',
+}
+TRADING_DAYS = 252
+LOOKBACK_DAYS = 3*252 # daily returns used to estimate expected returns and covariance
+MAX_ITERATIONS = 500
+TOLERANCE = 1e-9
+BISECTION_ITERATIONS = 60
+
+
+def estimate_moments(closes: pd.DataFrame, lookback: int = LOOKBACK_DAYS) -> Tuple[pd.Series, pd.DataFrame]:
+    """
+    Estimates annualized expected returns and the annualized covariance matrix from daily closes.
+
+    Parameters:
+        closes (pd.DataFrame): Daily closes, one column per ticker.
+        lookback (int): Number of most recent daily returns to use.
+
+    Returns:
+        tuple: Expected return per ticker, and the covariance matrix.
+
+    Raises:
+        ValueError: If there is not enough price history.
+    """
+    closes = closes.loc[:, closes.notna().any()].sort_index().ffill().dropna()
+    returns = closes.pct_change().iloc[1:].iloc[-lookback:]
+    if len(returns) < 2:
+        raise ValueError("Not enough price history to estimate returns and covariance")
+    return returns.mean() * TRADING_DAYS, returns.cov() * TRADING_DAYS
+
+
+def project_weights(v: np.ndarray, groups: Optional[np.ndarray] = None, group_caps: Optional[np.ndarray] = None,
+                    max_weight: float = 1.0) -> np.ndarray:
+    """
+    Returns the closest long-only weights (summing to 1) to a vector, with every weight at most `max_weight` and
+    the total weight of each group at most its cap.
+
+    The weights have the form clip(v - λ - μ[group], 0, max_weight). For a given λ, each group holds the smaller of
+    its cap and its unconstrained total, so λ is found by bisection on that total, and the μ of the capped groups are
+    then found together by one more bisection.
+
+    Parameters:
+        v (np.ndarray): Vector to project.
+        groups (np.ndarray): Group number (0 to n_groups - 1) of each weight.
+        group_caps (np.ndarray): Maximum total weight per group.
+        max_weight (float): Maximum weight of a single holding.
+
+    Returns:
+        np.ndarray: Projected weights.
+
+    Raises:
+        ValueError: If the limits do not allow the weights to sum to 1.
+    """
+    n = len(v)
+    if groups is None:
+        groups, group_caps = np.zeros(n, dtype=int), np.array([1.0])
+    upper = np.minimum(max_weight, group_caps[groups])
+    n_groups = len(group_caps)
+    reachable = np.minimum(group_caps, np.bincount(groups, weights=upper, minlength=n_groups)).sum()
+    if reachable < 1 - 1e-12:
+        raise ValueError("The weight limits add up to less than 100%")
+
+    def group_totals(lam):
+        return np.bincount(groups, weights=np.clip(v - lam, 0, upper), minlength=n_groups)
+
+    # Bisection on λ: the total weight falls as λ rises
+    low, high = v.min() - 1.0, v.max()
+    for _ in range(BISECTION_ITERATIONS):
+        lam = (low + high) / 2
+        if np.minimum(group_caps, group_totals(lam)).sum() > 1:
+            low = lam
+        else:
+            high = lam
+    lam = (low + high) / 2
+
+    # Bisection on μ for all capped groups at once, so each of them holds exactly its cap
+    capped = group_totals(lam) > group_caps
+    mu = np.zeros(n_groups)
+    if capped.any():
+        mu_low, mu_high = np.zeros(n_groups), np.full(n_groups, max(v.max() - v.min(), 0) + 1.0)
+        for _ in range(BISECTION_ITERATIONS):
+            mid = (mu_low + mu_high) / 2
+            over = np.bincount(groups, weights=np.clip(v - lam - mid[groups], 0, upper), minlength=n_groups) > group_caps
+            mu_low = np.where(over, mid, mu_low)
+            mu_high = np.where(over, mu_high, mid)
+        mu = np.where(capped, (mu_low + mu_high) / 2, 0.0)
+
+    return np.clip(v - lam - mu[groups], 0, upper)
+
+
+def _objective(objective: str, mean: np.ndarray, cov: np.ndarray, risk_free: float):
+    """
+    Returns the function to minimize and its gradient.
+    """
+    if objective == 'min_variance':
+        return lambda w: w @ cov @ w, lambda w: 2 * cov @ w
+
+    if objective == 'risk_parity':
+        # Squared distance of every share of the variance w_i (Σw)_i / w'Σw from 1/n. The deviations e sum to
+        # zero, which leaves the gradient 2 ((Σw) ∘ e + Σ (w ∘ e) - 2 f Σw) / w'Σw
+        def deviations(w):
+            contributions = w * (cov @ w)
+            return contributions / contributions.sum() - 1 / len(w)
+
+        def parity(w):
+            e = deviations(w)
+            return e @ e
+
+        def parity_gradient(w):
+            e, marginal = deviations(w), cov @ w
+            return 2 * (marginal * e + cov @ (w * e) - 2 * (e @ e) * marginal) / (w @ marginal)
+
+        return parity, parity_gradient
+
+    def negative_sharpe(w):
+        return -(mean @ w - risk_free) / np.sqrt(w @ cov @ w)
+
+    def gradient(w):
+        variance = w @ cov @ w
+        volatility = np.sqrt(variance)
+        return -(mean * volatility - (mean @ w - risk_free) * (cov @ w) / volatility) / variance
+
+    return negative_sharpe, gradient
+
+
+def _risk_parity(cov: np.ndarray, initial: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Returns the weights that give every holding the same contribution to portfolio variance, by Newton's method on
+    ½ y'Σy - Σ log(y) / n (the minimum is the risk parity portfolio up to scale).
+    """
+    n = len(cov)
+    budget = np.full(n, 1 / n)
+    y = initial.copy() if initial is not None else 1 / np.sqrt(np.diag(cov))
+    y = np.maximum(y, 1e-6)
+    for _ in range(50):
+        gradient = cov @ y - budget / y
+        hessian = cov + np.diag(budget / y ** 2)
+        step = np.linalg.solve(hessian, gradient)
+        # Keep y positive
+        scale = 1.0
+        while np.any(y - scale * step <= 0):
+            scale /= 2
+        y = y - scale * step
+        if np.max(np.abs(scale * step)) < TOLERANCE:
+            break
+    return y / y.sum()
+
+
+def optimize_weights(mean: pd.Series, cov: pd.DataFrame, objective: str = 'min_variance',
+                     sectors: Optional[pd.Series] = None, sector_caps: Optional[Dict[str, float]] = None,
+                     max_weight: float = 1.0, risk_free: float = 0.0,
+                     initial: Optional[pd.Series] = None) -> pd.Series:
+    """
+    Computes long-only target weights.
+
+    Minimum variance and maximum Sharpe ratio are solved by accelerated projected gradient descent with a
+    backtracking step.
+    Risk parity is solved without limits by Newton's method. When a limit binds, the same projected gradient
+    descent then minimizes the squared differences between the shares of risk within the limits, so every
+    holding carries as equal a share of the risk as the limits allow.
+
+    Parameters:
+        mean (pd.Series): Annualized expected return per ticker.
+        cov (pd.DataFrame): Annualized covariance matrix.
+        objective (str): 'min_variance', 'max_sharpe' or 'risk_parity'.
+        sectors (pd.Series): Sector of every ticker, used with sector_caps.
+        sector_caps (dict): Maximum total weight per sector. Sectors not listed are not limited.
+        max_weight (float): Maximum weight of a single holding.
+        risk_free (float): Annual risk-free rate used by the Sharpe ratio.
+        initial (pd.Series): Previous weights to start from.
+
+    Returns:
+        pd.Series: Target weight per ticker.
+
+    Raises:
+        ValueError: If the objective is unknown or the limits do not allow the weights to sum to 1.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective '{objective}', expected one of {list(OBJECTIVES)}")
+
+    tickers = list(cov.index)
+    sigma = cov.to_numpy()
+    mu = mean.reindex(tickers).to_numpy()
+
+    groups, group_caps = None, None
+    if sectors is not None and sector_caps:
+        labels, groups = np.unique(sectors.reindex(tickers).fillna('').to_numpy(dtype=str), return_inverse=True)
+        group_caps = np.array([sector_caps.get(label, 1.0) for label in labels], dtype='float64')
+
+    def project(v):
+        return project_weights(v, groups, group_caps, max_weight)
+
+    start = initial.reindex(tickers).fillna(0.0).to_numpy() if initial is not None else np.full(len(tickers), 1 / len(tickers))
+    w = project(start)
+
+    if objective == 'risk_parity':
+        # The unconstrained solution is exact when no limit binds; otherwise it is the starting point for
+        # minimizing the spread of the risk contributions within the limits
+        initial_y = start if initial is not None and np.all(start > 0) else None
+        unconstrained = _risk_parity(sigma, initial_y)
+        w = project(unconstrained)
+        if np.allclose(w, unconstrained, atol=1e-10):
+            return pd.Series(w, index=tickers)
+
+    # Accelerated projected gradient (FISTA) with a backtracking step
+    f, gradient = _objective(objective, mu, sigma, risk_free)
+    step = 1 / (2 * np.linalg.norm(sigma, 2) + 1e-12) if objective != 'risk_parity' else 1.0
+    y, previous, momentum = w, w, 1.0
+    for _ in range(MAX_ITERATIONS):
+        g = gradient(y)
+        value = f(y)
+        while True:
+            candidate = project(y - step * g)
+            difference = candidate - y
+            if f(candidate) <= value + g @ difference + difference @ difference / (2 * step) or step < 1e-12:
+                break
+            step /= 2
+
+        # Restart the momentum when it stops helping, and stop when even a plain step does not improve
+        if f(candidate) > f(previous):
+            if momentum == 1.0:
+                break
+            y, momentum = previous, 1.0
+            continue
+        next_momentum = (1 + np.sqrt(1 + 4 * momentum ** 2)) / 2
+        y = candidate + (momentum - 1) / next_momentum * (candidate - previous)
+        moved = np.max(np.abs(candidate - previous))
+        previous, momentum = candidate, next_momentum
+        if moved < TOLERANCE:
+            break
+
+    w = previous
+    return pd.Series(w, index=tickers)
+
+
+def portfolio_statistics(weights: pd.Series, mean: pd.Series, cov: pd.DataFrame, risk_free: float = 0.0) -> dict:
+    """
+    Returns the expected return, volatility, Sharpe ratio and risk contribution of each holding for a set of weights.
+    """
+    w = weights.reindex(cov.index).fillna(0.0).to_numpy()
+    sigma = cov.to_numpy()
+    variance = w @ sigma @ w
+    expected = float(mean.reindex(cov.index).to_numpy() @ w)
+    return {
+        'Expected Return': expected,
+        'Volatility': float(np.sqrt(variance)),
+        'Sharpe Ratio': (expected - risk_free) / np.sqrt(variance) if variance > 0 else np.nan,
+        'Risk Contribution': pd.Series(w * (sigma @ w) / variance if variance > 0 else np.nan, index=cov.index),
+    }
+
+
+def rebalance_trades(shares: pd.Series, prices: pd.Series, target_weights: pd.Series, cash: float = 0.0) -> pd.DataFrame:
+    """
+    Returns the trades that move the current holdings to the target weights, investing any cash as well.
+
+    Parameters:
+        shares (pd.Series): Shares held per ticker.
+        prices (pd.Series): Latest price per ticker.
+        target_weights (pd.Series): Target weight per ticker.
+        cash (float): Uninvested cash available to the portfolio.
+
+    Returns:
+        pd.DataFrame: Per ticker: Shares, Price, Current Weight, Target Weight, Target Value, Trade Shares and Trade
+        Value (positive to buy, negative to sell).
+    """
+    tickers = target_weights.index.union(shares.index)
+    shares = shares.reindex(tickers, fill_value=0.0)
+    prices = prices.reindex(tickers)
+    values = shares * prices
+    total = values.sum() + cash
+
+    target_value = target_weights.reindex(tickers, fill_value=0.0) * total
+    trades = pd.DataFrame({
+        'Shares': shares,
+        'Price': prices,
+        'Current Weight': values / total,
+        'Target Weight': target_weights.reindex(tickers, fill_value=0.0),
+        'Target Value': target_value,
+        'Trade Shares': (target_value - values) / prices,
+        'Trade Value': target_value - values,
+    })
+    trades.index.name = 'Ticker'
+    return trades
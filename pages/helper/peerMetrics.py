@@ -0,0 +1,181 @@
+"""
+This module keeps a local table of the Finnhub basic financial metrics of every symbol ever fetched. The full
+`metric` payload is flattened into one row per symbol and stored as Parquet, so peer comparisons of any size and
+any set of metrics are answered from the table, and only rows older than the refresh interval are requested again.
+"""
+
+# Import necessary libraries
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+
+PEER_METRICS_PATH = os.environ.get('FINANCE_PEER_METRICS_PATH', os.path.join('data', 'cache', 'peers', 'metrics.parquet'))
+REFRESH_INTERVAL = 24*60*60 # seconds before a symbol's metrics are requested again
+FETCHED_AT = 'fetchedAt' # column holding the time a row was fetched (seconds since the epoch)
+
+# Display names of common Finnhub metrics
+METRIC_LABELS = {
+    'peTTM': 'P/E (TTM)',
+    'pbQuarterly': 'P/B (TTM)',
+    'roeTTM': 'ROE (TTM)',
+    'roaTTM': 'ROA (TTM)',
+    'psTTM': 'P/S (TTM)',
+    'evEbitdaTTM': 'EV/EBITDA (TTM)',
+    'netProfitMarginTTM': 'Net Margin (TTM)',
+    'grossMarginTTM': 'Gross Margin (TTM)',
+    'currentRatioQuarterly': 'Current Ratio',
+    'totalDebt/totalEquityQuarterly': 'Debt/Equity',
+    'revenueGrowthTTMYoy': 'Revenue Growth (TTM YoY)',
+    'epsGrowthTTMYoy': 'EPS Growth (TTM YoY)',
+    'dividendYieldIndicatedAnnual': 'Dividend Yield',
+    'marketCapitalization': 'Market Cap',
+    'beta': 'Beta',
+}
+DEFAULT_METRICS = ['peTTM', 'pbQuarterly', 'roeTTM', 'roaTTM']
+
+
+def metric_label(metric: str) -> str:
+    """
+    Returns the display name of a Finnhub metric, or the metric name itself if it has none.
+    """
+    return METRIC_LABELS.get(metric, metric)
+
+
+def _normalize(table: pd.DataFrame) -> pd.DataFrame:
+    """
+    Stores every column that only holds numbers as float64 and every other column as strings, so the table can be
+    written to Parquet whatever mix of values the API returned.
+    """
+    numeric = table.apply(pd.to_numeric, errors='coerce')
+    is_numeric = numeric.notna().sum() >= table.notna().sum()
+    normalized = pd.concat([numeric.loc[:, is_numeric].astype('float64'), table.loc[:, ~is_numeric].astype('string')], axis=1)
+    return normalized[table.columns]
+
+
+def _merge_rows(table: pd.DataFrame, rows: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds or replaces normalized rows in a normalized table. Only columns whose types differ between the two are
+    normalized again.
+    """
+    merged = pd.concat([table[~table.index.isin(rows.index)], rows])
+    mixed = [column for column, dtype in merged.dtypes.items() if dtype not in ('float64', 'string')]
+    if mixed:
+        merged[mixed] = _normalize(merged[mixed])
+    return merged
+
+
+class PeerMetricsStore:
+    """
+    Flattened Finnhub metrics indexed by symbol. The file is replaced atomically, so several worker processes can
+    share it, and it is reloaded when another process updates it.
+    """
+
+    def __init__(self, path: str = PEER_METRICS_PATH, refresh_interval: float = REFRESH_INTERVAL):
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self._table = pd.DataFrame(index=pd.Index([], name='symbol'))
+        self._mtime = None
+        self._pending: Dict[str, dict] = {} # symbol -> metrics added since the last flush
+        self._unmerged: Dict[str, dict] = {} # symbol -> metrics not yet merged into self._table
+        self._lock = threading.RLock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def table(self) -> pd.DataFrame:
+        """
+        Returns the whole table, including metrics added since the last flush, reloading it if another process has
+        updated the file.
+        """
+        with self._lock:
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                mtime = None
+            if mtime is not None and mtime != self._mtime:
+                self._table = pd.read_parquet(self.path)
+                self._mtime = mtime
+                self._unmerged = dict(self._pending)
+            if self._unmerged:
+                # Only the rows added since the last merge are normalized
+                new_rows = pd.json_normalize(list(self._unmerged.values()))
+                new_rows.index = pd.Index(list(self._unmerged), name='symbol')
+                self._table = _merge_rows(self._table, _normalize(new_rows))
+                self._unmerged = {}
+            return self._table
+
+    def add(self, symbol: str, metrics: dict, fetched_at: Optional[float] = None) -> None:
+        """
+        Adds or replaces the metrics of a symbol. Call flush() to write them to disk.
+
+        Parameters:
+            symbol (str): Stock symbol.
+            metrics (dict): The `metric` payload returned by Finnhub.
+            fetched_at (float): Time the metrics were fetched. Defaults to now.
+        """
+        with self._lock:
+            self._pending[symbol] = {**metrics, FETCHED_AT: fetched_at if fetched_at is not None else time.time()}
+            self._unmerged[symbol] = self._pending[symbol]
+
+    def flush(self) -> None:
+        """
+        Writes the table to disk, merged with any rows another process wrote in the meantime.
+        """
+        with self._lock:
+            if not self._pending:
+                return
+            table = self.table()
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            table.to_parquet(tmp_path)
+            os.replace(tmp_path, self.path)
+            self._mtime = os.path.getmtime(self.path)
+            self._pending.clear()
+
+    def stale(self, symbols: Iterable[str]) -> List[str]:
+        """
+        Returns the symbols that have no metrics or whose metrics are older than the refresh interval.
+        """
+        table = self.table()
+        fetched_at = table[FETCHED_AT] if FETCHED_AT in table else pd.Series(dtype='float64')
+        cutoff = time.time() - self.refresh_interval
+        return [symbol for symbol in dict.fromkeys(symbols) if not fetched_at.get(symbol, 0) >= cutoff]
+
+    def lookup(self, symbols: Iterable[str], metrics: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Returns the metrics of several symbols.
+
+        Parameters:
+            symbols (Iterable[str]): Stock symbols, in the order of the returned rows.
+            metrics (list): Metrics to return. Defaults to every stored metric.
+
+        Returns:
+            pd.DataFrame: One row per symbol that has metrics, one column per metric.
+        """
+        table = self.table()
+        symbols = [symbol for symbol in dict.fromkeys(symbols) if symbol in table.index]
+        columns = metrics if metrics is not None else [column for column in table.columns if column != FETCHED_AT]
+        return table.reindex(index=symbols, columns=columns)
+
+    def metric_names(self) -> List[str]:
+        """
+        Returns the names of every stored numeric metric.
+        """
+        table = self.table()
+        return [column for column in table.columns if column != FETCHED_AT and pd.api.types.is_float_dtype(table[column])]
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_peer_metrics_store() -> PeerMetricsStore:
+    """
+    Returns the process-wide peer metrics store, creating it on first use.
+    """
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = PeerMetricsStore()
+        return _default_store
@@ -0,0 +1,231 @@
+"""
+This module builds the daily value (NAV) of the portfolio from the transaction log and the local price store. The
+shares held on every day form a date × ticker matrix that is multiplied by the aligned close prices in one step, and
+the resulting series is cached together with the prices it used. Later runs only revalue the days added since then
+and the days whose prices changed in the store.
+"""
+
+# Import necessary libraries
+import glob
+import os
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from pages.helper.priceStore import PriceStore, get_price_store
+
+
+NAV_CACHE_PATH = os.environ.get('FINANCE_NAV_CACHE_PATH', os.path.join('data', 'cache', 'portfolio'))
+NAV_COLUMNS = ['NAV', 'Net Flow', 'Cost Basis']
+
+
+def split_adjusted_trades(transactions: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns the buys and sells of the transaction log with signed shares, restated in post-split shares so they
+    line up with split-adjusted close prices.
+
+    Parameters:
+        transactions (pd.DataFrame): Events as returned by transactionLog.load_transactions.
+
+    Returns:
+        pd.DataFrame: Ticker, Date, Shares (negative for sells) and Price of every trade.
+    """
+    trades = transactions[transactions['Type'].isin(['buy', 'sell'])]
+    trades = pd.DataFrame({
+        'Ticker': trades['Ticker'],
+        'Date': trades['Date'],
+        'Shares': trades['Shares'].where(trades['Type'] == 'buy', -trades['Shares']),
+        'Price': trades['Price'],
+    })
+
+    for split in transactions[transactions['Type'] == 'split'].itertuples():
+        before = (trades['Ticker'] == split.Ticker) & (trades['Date'] < split.Date)
+        trades.loc[before, 'Shares'] *= split.Ratio
+        trades.loc[before, 'Price'] /= split.Ratio
+    return trades
+
+
+def position_matrix(trades: pd.DataFrame, dates: pd.DatetimeIndex) -> pd.DataFrame:
+    """
+    Returns the shares of every ticker held at the close of each date.
+
+    Parameters:
+        trades (pd.DataFrame): Ticker, Date and signed Shares of every trade.
+        dates (pd.DatetimeIndex): Dates to evaluate.
+
+    Returns:
+        pd.DataFrame: Shares held, one column per ticker, indexed by date.
+    """
+    changes = trades.pivot_table(index='Date', columns='Ticker', values='Shares', aggfunc='sum', fill_value=0.0)
+    positions = changes.cumsum()
+    # Carry the holdings of the last trade on or before each date
+    return positions.reindex(positions.index.union(dates)).ffill().reindex(dates).fillna(0.0)
+
+
+def cash_flows(transactions: pd.DataFrame) -> pd.Series:
+    """
+    Returns the net cash put into the portfolio on each trade date: purchases count as inflows, and sale proceeds
+    and dividends as outflows.
+
+    Parameters:
+        transactions (pd.DataFrame): Events as returned by transactionLog.load_transactions.
+
+    Returns:
+        pd.Series: Net flow per date.
+    """
+    signed = transactions['Shares'] * transactions['Price']
+    flows = signed.where(transactions['Type'] == 'buy', 0.0) \
+        - signed.where(transactions['Type'] == 'sell', 0.0) \
+        - transactions['Amount'].where(transactions['Type'] == 'dividend', 0.0)
+    return flows.fillna(0.0).groupby(transactions['Date']).sum()
+
+
+def _price_matrix(trades: pd.DataFrame, store: PriceStore, dates: pd.DatetimeIndex) -> pd.DataFrame:
+    """
+    Returns the close of every traded ticker on each date. Tickers without stored closes are valued at their last
+    trade price.
+    """
+    tickers = list(dict.fromkeys(trades['Ticker']))
+    closes = store.close_matrix(tickers).astype('float64')
+    trade_prices = trades.pivot_table(index='Date', columns='Ticker', values='Price', aggfunc='last')
+    prices = closes.reindex(columns=tickers).combine_first(trade_prices)
+    return prices.reindex(prices.index.union(dates)).ffill().reindex(dates)
+
+
+def compute_nav(transactions: pd.DataFrame, store: Optional[PriceStore] = None,
+                dates: Optional[pd.DatetimeIndex] = None) -> pd.DataFrame:
+    """
+    Revalues the portfolio on every date as one positions × prices matrix product.
+
+    Parameters:
+        transactions (pd.DataFrame): Events as returned by transactionLog.load_transactions.
+        store (PriceStore): Price store to read closes from. Defaults to the process-wide store.
+        dates (pd.DatetimeIndex): Dates to evaluate. Defaults to every business day from the first trade to today.
+
+    Returns:
+        pd.DataFrame: NAV, Net Flow and Cost Basis (cumulative net flow) indexed by date.
+    """
+    store = store or get_price_store()
+    trades = split_adjusted_trades(transactions)
+    if trades.empty:
+        return pd.DataFrame(columns=NAV_COLUMNS, index=pd.DatetimeIndex([], name='Date'), dtype='float64')
+
+    if dates is None:
+        dates = pd.bdate_range(trades['Date'].min(), pd.Timestamp.today().normalize(), name='Date')
+
+    positions = position_matrix(trades, dates)
+    prices = _price_matrix(trades, store, dates).reindex(columns=positions.columns)
+
+    # Flows on non-business days are booked on the next evaluated date
+    flows = cash_flows(transactions)
+    flows = flows[flows.index > dates[0] - pd.offsets.BDay(1)]
+    flows = flows.groupby(dates[dates.searchsorted(flows.index).clip(max=len(dates) - 1)]).sum()
+
+    nav = pd.DataFrame({
+        'NAV': (positions.to_numpy() * prices.fillna(0.0).to_numpy()).sum(axis=1),
+        'Net Flow': flows.reindex(dates, fill_value=0.0).to_numpy(),
+    }, index=dates)
+    nav['Cost Basis'] = nav['Net Flow'].cumsum()
+    nav.index.name = 'Date'
+    return nav
+
+
+def _fingerprint(transactions: pd.DataFrame) -> str:
+    return format(int(pd.util.hash_pandas_object(transactions, index=False).sum()) & (2**64 - 1), 'x')
+
+
+def _read_cached(cache_file: str) -> Optional[pd.DataFrame]:
+    if not os.path.exists(cache_file):
+        return None
+    try:
+        return pd.read_parquet(cache_file)
+    except Exception as e:
+        print(f"Error occurred while reading cached NAV: {e}")
+        return None
+
+
+def _first_changed_date(cached: pd.DataFrame, current: pd.DataFrame) -> Optional[pd.Timestamp]:
+    """
+    Returns the first date on which any price differs between two price matrices, or None if they agree.
+    """
+    columns = cached.columns.union(current.columns)
+    old = cached.reindex(index=current.index, columns=columns).to_numpy(dtype='float64')
+    new = current.reindex(columns=columns).to_numpy(dtype='float64')
+    same = np.isclose(old, new, rtol=1e-9, atol=0.0) | (np.isnan(old) & np.isnan(new))
+    changed = ~same.all(axis=1)
+    return current.index[changed.argmax()] if changed.any() else None
+
+
+def get_nav(transactions: pd.DataFrame, store: Optional[PriceStore] = None, use_cache: bool = True) -> pd.DataFrame:
+    """
+    Returns the daily NAV series, reusing the cached series for the transactions. Days are revalued from the
+    earliest of the last cached date (which may have been cached mid-session) and the first date whose prices
+    changed in the store since they were cached, e.g. after a backfill or a correction.
+
+    Parameters:
+        transactions (pd.DataFrame): Events as returned by transactionLog.load_transactions.
+        store (PriceStore): Price store to read closes from. Defaults to the process-wide store.
+        use_cache (bool): Read and write the cached series.
+
+    Returns:
+        pd.DataFrame: NAV, Net Flow and Cost Basis indexed by date.
+    """
+    if not use_cache:
+        return compute_nav(transactions, store)
+
+    store = store or get_price_store()
+    trades = split_adjusted_trades(transactions)
+    if trades.empty:
+        return compute_nav(transactions, store)
+
+    # The cached series and the prices it was valued at are named after the transactions they were computed from
+    fingerprint = _fingerprint(transactions)
+    cache_file = os.path.join(NAV_CACHE_PATH, f"nav-{fingerprint}.parquet")
+    prices_file = os.path.join(NAV_CACHE_PATH, f"nav-{fingerprint}-prices.parquet")
+
+    cached = _read_cached(cache_file)
+    cached_prices = _read_cached(prices_file)
+    dates = pd.bdate_range(trades['Date'].min(), pd.Timestamp.today().normalize(), name='Date')
+    prices = _price_matrix(trades, store, dates)
+
+    if cached is None or cached.empty or cached_prices is None:
+        nav = compute_nav(transactions, store, dates)
+    else:
+        start = cached.index[-1]
+        changed = _first_changed_date(cached_prices, prices.loc[:start])
+        if changed is not None:
+            start = min(start, changed)
+        kept = cached[cached.index < start]
+        tail = compute_nav(transactions, store, dates[dates >= start])
+        # Cost Basis continues from the kept total
+        tail['Cost Basis'] = (kept['Cost Basis'].iloc[-1] if not kept.empty else 0.0) + tail['Net Flow'].cumsum()
+        nav = pd.concat([kept, tail])
+
+    try:
+        os.makedirs(NAV_CACHE_PATH, exist_ok=True)
+        for path, frame in ((cache_file, nav), (prices_file, prices)):
+            tmp_file = f"{path}.{os.getpid()}.tmp"
+            frame.to_parquet(tmp_file)
+            os.replace(tmp_file, path)
+        # Remove series computed from older versions of the log
+        for old_file in glob.glob(os.path.join(NAV_CACHE_PATH, 'nav-*.parquet')):
+            if old_file not in (cache_file, prices_file):
+                os.remove(old_file)
+    except Exception as e:
+        print(f"Error occurred while caching NAV: {e}")
+
+    return nav
+
+
+def drawdown(nav: pd.Series) -> pd.Series:
+    """
+    Returns the fractional decline of a value series from its running peak.
+
+    Parameters:
+        nav (pd.Series): Value series.
+
+    Returns:
+        pd.Series: Drawdown per date, 0 at a new peak and negative below it.
+    """
+    return nav / nav.cummax() - 1
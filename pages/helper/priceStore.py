@@ -0,0 +1,331 @@
+"""
+This module provides a local Parquet store of daily price history. Each refresh only downloads the bars after the
+last stored date, and latest prices are served from an in-memory index. It also provides a lightweight quote path
+that fetches only the latest price of each ticker.
+"""
+
+# Import necessary libraries
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+
+PRICE_STORE_PATH = os.environ.get('FINANCE_PRICE_STORE_PATH', os.path.join('data', 'cache', 'prices'))
+INITIAL_PERIOD = '5y' # history downloaded for a ticker the first time it is seen
+REFRESH_INTERVAL = 15*60 # seconds before the same ticker is refreshed again
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+
+
+class PriceStore:
+    """
+    Daily OHLCV history stored as one Parquet file per ticker. Files are replaced atomically, so several worker
+    processes can share the same directory.
+    """
+
+    def __init__(self, path: str = PRICE_STORE_PATH, refresh_interval: float = REFRESH_INTERVAL):
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self._history = {} # ticker -> (file mtime, DataFrame)
+        self._latest = {} # ticker -> (date, close)
+        self._refreshed_at = {} # ticker -> time of the last refresh that returned bars
+        self._in_flight = set() # tickers being downloaded, so other sessions do not download them at the same time
+        self._starts = None # ticker -> earliest start date downloaded, loaded on first use
+        self._lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, ticker: str) -> str:
+        return os.path.join(self.path, f"{ticker.replace('/', '_')}.parquet")
+
+    def history(self, ticker: str) -> pd.DataFrame:
+        """
+        Returns the stored daily history of a ticker, reloading it if another process has updated the file.
+
+        Parameters:
+            ticker (str): Stock ticker.
+
+        Returns:
+            pd.DataFrame: Daily OHLCV bars indexed by date. Empty if nothing is stored.
+        """
+        path = self._file(ticker)
+        with self._lock:
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                return pd.DataFrame(columns=PRICE_COLUMNS, index=pd.DatetimeIndex([], name='Date'))
+
+            cached = self._history.get(ticker)
+            if cached is None or cached[0] != mtime:
+                df = pd.read_parquet(path)
+                self._history[ticker] = (mtime, df)
+                self._index_latest(ticker, df)
+            return self._history[ticker][1]
+
+    def _index_latest(self, ticker: str, df: pd.DataFrame) -> None:
+        closes = df['Close'].dropna() if 'Close' in df else pd.Series(dtype='float64')
+        if not closes.empty:
+            self._latest[ticker] = (closes.index[-1], float(closes.iloc[-1]))
+
+    def _starts_file(self) -> str:
+        return os.path.join(self.path, 'requested-starts.json')
+
+    def _requested_starts(self) -> Dict[str, str]:
+        """
+        Returns the earliest start date already downloaded for every ticker. The first stored bar can be later than
+        the requested start (a later listing, or a start on a weekend or holiday), so it cannot tell on its own
+        whether the history goes back far enough.
+        """
+        if self._starts is None:
+            try:
+                with open(self._starts_file()) as f:
+                    self._starts = json.load(f)
+            except (OSError, ValueError):
+                self._starts = {}
+        return self._starts
+
+    def _record_starts(self, tickers: List[str], start: str) -> None:
+        """
+        Records that the history of the tickers was downloaded from `start`.
+        """
+        starts = self._requested_starts()
+        # Merge with the dates recorded by other processes before writing
+        try:
+            with open(self._starts_file()) as f:
+                starts.update({t: min(d, starts.get(t, d)) for t, d in json.load(f).items()})
+        except (OSError, ValueError):
+            pass
+        for ticker in tickers:
+            starts[ticker] = min(start, starts.get(ticker, start))
+        tmp_path = f"{self._starts_file()}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(starts, f)
+        os.replace(tmp_path, self._starts_file())
+
+    def _save(self, ticker: str, df: pd.DataFrame) -> None:
+        path = self._file(ticker)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+        self._history[ticker] = (os.path.getmtime(path), df)
+        self._index_latest(ticker, df)
+
+    def refresh(self, tickers: Iterable[str], start: Optional[str] = None, force: bool = False) -> None:
+        """
+        Downloads the bars missing from the store. Tickers with history only request bars from their last stored
+        date onwards (the last bar is re-downloaded because it may have been stored mid-session); new tickers
+        download from `start`, or INITIAL_PERIOD if no start is given.
+
+        Parameters:
+            tickers (Iterable[str]): Stock tickers.
+            start (str): First date of history wanted, e.g. '2020-01-01'. Tickers without history, or whose history
+                was never downloaded from that date, download from it.
+            force (bool): Refresh tickers even if they were refreshed less than `refresh_interval` seconds ago.
+        """
+        now = time.monotonic()
+        with self._lock:
+            due = [
+                ticker for ticker in dict.fromkeys(tickers)
+                if ticker not in self._in_flight
+                and (force or now - self._refreshed_at.get(ticker, -np.inf) >= self.refresh_interval)
+            ]
+            if not due:
+                return
+
+            # Group tickers by the first date they need, so each group is a single download
+            start = pd.Timestamp(start).strftime('%Y-%m-%d') if start is not None else None
+            requested = self._requested_starts()
+            groups: Dict[Optional[str], List[str]] = {}
+            for ticker in due:
+                stored = self.history(ticker)
+                if stored.empty:
+                    first_date = start
+                elif start is not None and pd.Timestamp(start) < stored.index[0] and \
+                        not requested.get(ticker, '9999-12-31') <= start:
+                    # The stored history does not go back far enough, and it was never requested from that date
+                    first_date = start
+                else:
+                    first_date = stored.index[-1].strftime('%Y-%m-%d')
+                groups.setdefault(first_date, []).append(ticker)
+            self._in_flight.update(due)
+
+        # Download without holding the lock, so reads of stored prices are not blocked by the network
+        try:
+            for first_date, group in groups.items():
+                downloaded = self._download(group, first_date)
+                with self._lock:
+                    fetched = []
+                    for ticker in group:
+                        new_bars = downloaded.get(ticker)
+                        if new_bars is None or new_bars.empty:
+                            continue
+                        stored = self.history(ticker)
+                        merged = pd.concat([stored, new_bars]) if not stored.empty else new_bars
+                        # Newer copies of a bar replace the stored ones
+                        merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+                        self._save(ticker, merged)
+                        fetched.append(ticker)
+                    # Tickers whose download failed or returned nothing are tried again on the next refresh
+                    for ticker in fetched:
+                        self._refreshed_at[ticker] = now
+                    if first_date is not None and first_date == start and fetched:
+                        try:
+                            self._record_starts(fetched, first_date)
+                        except OSError as e:
+                            print(f"Error occurred while recording downloaded start dates: {e}")
+        finally:
+            with self._lock:
+                self._in_flight.difference_update(due)
+
+    def _download(self, tickers: List[str], start: Optional[str]) -> Dict[str, pd.DataFrame]:
+        """
+        Downloads daily bars for several tickers in one request.
+
+        Parameters:
+            tickers (list): Stock tickers.
+            start (str): First date to download, or None to download INITIAL_PERIOD.
+
+        Returns:
+            dict: DataFrame of bars per ticker.
+        """
+        kwargs = {'start': start} if start is not None else {'period': INITIAL_PERIOD}
+        try:
+            data = yf.download(tickers, progress=False, group_by='ticker', auto_adjust=False, **kwargs)
+        except Exception as e:
+            print(f"Error occurred while downloading prices: {e}")
+            return {}
+
+        bars = {}
+        for ticker in tickers:
+            if isinstance(data.columns, pd.MultiIndex):
+                if ticker not in data.columns.get_level_values(0):
+                    continue
+                df = data[ticker]
+            else:
+                df = data
+            df = df.reindex(columns=PRICE_COLUMNS).dropna(how='all').astype('float64')
+            df.index = pd.DatetimeIndex(df.index).tz_localize(None).normalize()
+            df.index.name = 'Date'
+            bars[ticker] = df
+        return bars
+
+    def latest_close(self, ticker: str) -> float:
+        """
+        Returns the most recent stored close of a ticker from the in-memory index.
+
+        Parameters:
+            ticker (str): Stock ticker.
+
+        Returns:
+            float: Latest close, or NaN if no history is stored.
+        """
+        with self._lock:
+            # Only stats the file unless another process has rewritten it
+            self.history(ticker)
+            return self._latest.get(ticker, (None, np.nan))[1]
+
+    def close_matrix(self, tickers: Iterable[str], start: Optional[str] = None) -> pd.DataFrame:
+        """
+        Returns the stored closes of several tickers aligned on a common date index.
+
+        Parameters:
+            tickers (Iterable[str]): Stock tickers.
+            start (str): First date to include.
+
+        Returns:
+            pd.DataFrame: One column of closes per ticker, indexed by date.
+        """
+        closes = {ticker: self.history(ticker)['Close'] for ticker in dict.fromkeys(tickers)}
+        matrix = pd.DataFrame(closes).sort_index()
+        if start is not None:
+            matrix = matrix.loc[pd.Timestamp(start):]
+        return matrix
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_price_store() -> PriceStore:
+    """
+    Returns the process-wide price store, creating it on first use.
+    """
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = PriceStore()
+        return _default_store
+
+
+QUOTE_TTL = 30 # seconds a latest price is reused before it is requested again
+
+_quotes = {} # ticker -> (time fetched, price)
+_quotes_lock = threading.Lock()
+
+
+def _download_quotes(tickers: List[str]) -> Dict[str, float]:
+    """
+    Downloads the latest traded price of several tickers in one request, using today's one-minute bars.
+
+    Parameters:
+        tickers (list): Stock tickers.
+
+    Returns:
+        dict: Latest price per ticker. Tickers without bars today are left out.
+    """
+    try:
+        data = yf.download(tickers, period='1d', interval='1m', progress=False, group_by='ticker', auto_adjust=False)
+    except Exception as e:
+        print(f"Error occurred while downloading quotes: {e}")
+        return {}
+
+    quotes = {}
+    for ticker in tickers:
+        if isinstance(data.columns, pd.MultiIndex):
+            if ticker not in data.columns.get_level_values(0):
+                continue
+            closes = data[ticker]['Close'].dropna()
+        else:
+            closes = data['Close'].dropna() if 'Close' in data else pd.Series(dtype='float64')
+        if not closes.empty:
+            quotes[ticker] = float(closes.iloc[-1])
+    return quotes
+
+
+def get_quotes(tickers: Iterable[str], ttl: float = QUOTE_TTL) -> pd.Series:
+    """
+    Returns the latest price of every ticker. Prices younger than `ttl` seconds are reused, the rest are requested
+    in a single batched download, and tickers without a quote fall back to their last stored close.
+
+    Parameters:
+        tickers (Iterable[str]): Stock tickers.
+        ttl (float): Seconds a price is reused before it is requested again.
+
+    Returns:
+        pd.Series: Latest price per ticker, NaN if neither a quote nor a stored close is available.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    now = time.monotonic()
+
+    with _quotes_lock:
+        prices = {ticker: _quotes[ticker][1] for ticker in tickers if ticker in _quotes and now - _quotes[ticker][0] < ttl}
+
+    missing = [ticker for ticker in tickers if ticker not in prices]
+    if missing:
+        fetched = _download_quotes(missing)
+        with _quotes_lock:
+            for ticker, price in fetched.items():
+                _quotes[ticker] = (now, price)
+        prices.update(fetched)
+
+    # Fall back to the last stored close, e.g. before the market opens
+    store = get_price_store()
+    for ticker in tickers:
+        if ticker not in prices:
+            prices[ticker] = store.latest_close(ticker)
+
+    return pd.Series(prices, dtype='float64').reindex(tickers)
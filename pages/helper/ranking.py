@@ -0,0 +1,96 @@
+"""
+This module ranks symbols against each other on many metrics at once. For every symbol and metric it computes the
+percentile within a group (the peer set, or every stored symbol of the same sector) and a robust z-score based on
+the group median and median absolute deviation, so a few extreme values do not distort the rest. Missing values are
+left out of every group and stay missing in the results.
+"""
+
+# Import necessary libraries
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+MAD_SCALE = 1.4826 # makes the median absolute deviation comparable to a standard deviation for normal data
+MEAN_AD_SCALE = 1.2533 # same for the mean absolute deviation, used when more than half the group shares one value
+MAX_ZSCORE = 10.0 # robust z-scores are clipped to this magnitude
+# Price multiples (P/E, P/B, P/S, P/FCF, EV/...) are meaningless when zero or negative, so those values are ignored
+PRICE_MULTIPLE = re.compile(r'^(pe|pb|ps|pfcf|ev)[A-Z]')
+
+
+@dataclass
+class Ranking:
+    """
+    Percentile (0 to 1, the share of the group at or below the value) and robust z-score of every symbol on every
+    metric, indexed like the ranked table.
+    """
+    percentile: pd.DataFrame
+    zscore: pd.DataFrame
+    group_size: pd.DataFrame # number of symbols with a value in each symbol's group, per metric
+
+
+def clean_metrics(table: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns the numeric columns of a metrics table, with zero and negative price multiples set to NaN.
+    """
+    values = table.select_dtypes('number').astype('float64')
+    multiples = [column for column in values.columns if PRICE_MULTIPLE.match(str(column))]
+    values[multiples] = values[multiples].where(values[multiples] > 0)
+    return values
+
+
+def rank_metrics(table: pd.DataFrame, groups: Optional[pd.Series] = None) -> Ranking:
+    """
+    Ranks every symbol on every metric within its group.
+
+    Parameters:
+        table (pd.DataFrame): Metrics, one row per symbol and one column per metric.
+        groups (pd.Series): Group of every symbol, e.g. its sector. Symbols with no group are not ranked. None ranks
+            all symbols as one group.
+
+    Returns:
+        Ranking: Percentiles, robust z-scores and group sizes.
+    """
+    values = clean_metrics(table)
+    if groups is None:
+        keys = pd.Series(0, index=values.index)
+    else:
+        keys = groups.reindex(values.index)
+    if keys.isna().all():
+        empty = pd.DataFrame(np.nan, index=values.index, columns=values.columns)
+        return Ranking(percentile=empty, zscore=empty.copy(), group_size=empty.copy())
+    grouped = values.groupby(keys, dropna=True)
+
+    percentile = grouped.rank(method='max', pct=True)
+    count = grouped.transform('count')
+
+    # Robust z-score: distance from the group median in units of the scaled median absolute deviation
+    median = grouped.transform('median')
+    deviation = (values - median).abs()
+    deviation_groups = deviation.groupby(keys, dropna=True)
+    scale = deviation_groups.transform('median') * MAD_SCALE
+    scale = scale.where(scale > 0, deviation_groups.transform('mean') * MEAN_AD_SCALE)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        zscore = ((values - median) / scale).where(scale > 0, 0.0).where(median.notna() & values.notna())
+
+    return Ranking(
+        percentile=percentile.reindex(values.index),
+        zscore=zscore.clip(-MAX_ZSCORE, MAX_ZSCORE),
+        group_size=count.reindex(values.index),
+    )
+
+
+def symbol_ranking(ranking: Ranking, symbol: str) -> pd.DataFrame:
+    """
+    Returns the percentile, z-score and group size of one symbol on every metric, one row per metric.
+    """
+    if symbol not in ranking.percentile.index:
+        return pd.DataFrame(columns=['Percentile', 'Z-Score', 'Group Size'])
+    return pd.DataFrame({
+        'Percentile': ranking.percentile.loc[symbol],
+        'Z-Score': ranking.zscore.loc[symbol],
+        'Group Size': ranking.group_size.loc[symbol],
+    })
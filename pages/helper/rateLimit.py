@@ -0,0 +1,141 @@
+"""
+This module provides client-side rate limiting for the data providers used by the application, so concurrent
+sessions queue their requests instead of running into the providers' per-minute quotas.
+"""
+
+# Import necessary libraries
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+import pandas as pd
+import streamlit as st
+from pages.helper.utils import get_secret
+
+
+# Requests per minute allowed for each provider. Override them with a [RATE_LIMITS] table in the Streamlit secrets,
+# e.g. RATE_LIMITS = { fmp = 750, alpha_vantage = 75 }. Limits apply per server process.
+DEFAULT_RATE_LIMITS = {
+    'fmp': 300,
+    'alpha_vantage': 5,
+    'finnhub': 60,
+    'polygon': 5,
+}
+
+
+class TokenBucket:
+    """
+    Token bucket that refills at a steady rate. Callers that find the bucket empty reserve the next token and
+    wait for it, so requests are queued in arrival order instead of failing.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = burst if burst is not None else max(1.0, rate_per_minute / 6.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+        # Usage counters
+        self.requests = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+        self.recent = deque()
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """
+        Takes one token from the bucket, waiting until one is available.
+
+        Parameters:
+            timeout (float): Maximum seconds to wait, or None to wait as long as needed.
+
+        Returns:
+            bool: True if a token was taken, False if it would have taken longer than the timeout.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+
+            # A negative balance means earlier callers are already queued for the next tokens
+            wait = max(0.0, (1 - self.tokens) / self.rate)
+            if timeout is not None and wait > timeout:
+                return False
+            self.tokens -= 1
+
+            self.requests += 1
+            if wait > 0:
+                self.throttled += 1
+                self.total_wait += wait
+            self.recent.append(now + wait)
+
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    def usage(self) -> Dict[str, float]:
+        """
+        Returns the usage counters of the bucket.
+
+        Returns:
+            dict: Requests made, requests in the last minute, throttled requests and time spent waiting.
+        """
+        with self.lock:
+            cutoff = time.monotonic() - 60
+            while self.recent and self.recent[0] < cutoff:
+                self.recent.popleft()
+            return {
+                'Limit (per minute)': self.rate * 60,
+                'Requests': self.requests,
+                'Requests (last minute)': len(self.recent),
+                'Throttled': self.throttled,
+                'Total Wait (s)': round(self.total_wait, 2),
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider: str) -> TokenBucket:
+    """
+    Returns the shared rate limiter of a data provider, creating it on first use.
+
+    Parameters:
+        provider (str): Provider name, e.g. 'fmp', 'alpha_vantage', 'finnhub' or 'polygon'.
+
+    Returns:
+        TokenBucket: The provider's rate limiter.
+    """
+    with _limiters_lock:
+        if provider not in _limiters:
+            limits = dict(DEFAULT_RATE_LIMITS)
+            limits.update(get_secret('RATE_LIMITS', {}))
+            _limiters[provider] = TokenBucket(float(limits.get(provider, 60)))
+        return _limiters[provider]
+
+
+def rate_limit_usage() -> pd.DataFrame:
+    """
+    Returns the usage counters of every provider that has made requests in this process.
+
+    Returns:
+        pd.DataFrame: One row of usage counters per provider.
+    """
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return pd.DataFrame({provider: limiter.usage() for provider, limiter in limiters.items()}).T
+
+
+def show_rate_limit_usage() -> None:
+    """
+    Shows the usage counters of every provider in a sidebar expander, so throttling can be spotted while the
+    application runs.
+    """
+    usage = rate_limit_usage()
+    with st.sidebar.expander("API usage"):
+        if usage.empty:
+            st.caption("No requests made since the server started.")
+        else:
+            st.dataframe(usage)
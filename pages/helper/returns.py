@@ -0,0 +1,214 @@
+"""
+This module computes portfolio returns: the time-weighted return (TWR) from the daily value series, and money-weighted
+returns (XIRR) from dated cash flows. The XIRR solver works on a matrix of cash flow series at once, so the IRRs of
+every ticker, account or sub-period are found in a single batched call.
+"""
+
+# Import necessary libraries
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+DAYS_PER_YEAR = 365.0
+NEWTON_ITERATIONS = 50
+BISECTION_ITERATIONS = 200
+TOLERANCE = 1e-10
+RATE_BOUNDS = (-0.9999, 1e4) # bracket searched when Newton's method does not converge
+
+
+def _npv(rates: np.ndarray, amounts: np.ndarray, years: np.ndarray) -> np.ndarray:
+    return np.sum(amounts * np.power(1.0 + rates[:, None], -years), axis=1)
+
+
+def xirr_batch(amounts: np.ndarray, years: np.ndarray, guess: float = 0.1) -> np.ndarray:
+    """
+    Solves the annual internal rate of return of many cash flow series at once.
+
+    Newton's method runs on all series together. Series where it does not converge fall back to bisection over
+    RATE_BOUNDS, which is also run for all of them together.
+
+    Parameters:
+        amounts (np.ndarray): Cash flows, one series per row (negative for money invested). Pad with NaN or 0.
+        years (np.ndarray): Time of each cash flow in years from the start of its series, same shape as amounts.
+        guess (float): Starting rate for Newton's method.
+
+    Returns:
+        np.ndarray: Annual rate per series, NaN where the flows do not change sign or no root is found.
+    """
+    amounts = np.atleast_2d(np.asarray(amounts, dtype='float64'))
+    years = np.broadcast_to(np.asarray(years, dtype='float64'), amounts.shape)
+    padded = np.isnan(amounts) | np.isnan(years)
+    amounts = np.where(padded, 0.0, amounts)
+    years = np.where(padded, 0.0, years)
+
+    # A rate of return only exists when money goes both in and out
+    solvable = (amounts > 0).any(axis=1) & (amounts < 0).any(axis=1)
+
+    rates = np.full(amounts.shape[0], guess)
+    converged = ~solvable
+    with np.errstate(over='ignore', invalid='ignore', divide='ignore'):
+        for _ in range(NEWTON_ITERATIONS):
+            active = ~converged
+            if not active.any():
+                break
+            discount = np.power(1.0 + rates[active, None], -years[active])
+            value = np.sum(amounts[active] * discount, axis=1)
+            slope = np.sum(-years[active] * amounts[active] * discount, axis=1) / (1.0 + rates[active])
+            step = value / slope
+            new_rates = rates[active] - step
+
+            # Leave Newton's method to the bisection fallback when it diverges or leaves the valid range
+            failed = ~np.isfinite(new_rates) | (new_rates <= RATE_BOUNDS[0])
+            new_rates = np.where(failed, np.nan, new_rates)
+            rates[active] = new_rates
+            done = failed | (np.abs(step) < TOLERANCE)
+            converged[np.flatnonzero(active)[done]] = True
+
+        unresolved = solvable & (~np.isfinite(rates) | ~converged)
+        if unresolved.any():
+            rates[unresolved] = _bisect(amounts[unresolved], years[unresolved])
+
+    rates[~solvable] = np.nan
+    return rates
+
+
+def _bisect(amounts: np.ndarray, years: np.ndarray) -> np.ndarray:
+    """
+    Finds a root of every series by bisection over RATE_BOUNDS. Series without a sign change get NaN.
+    """
+    low = np.full(amounts.shape[0], RATE_BOUNDS[0])
+    high = np.full(amounts.shape[0], RATE_BOUNDS[1])
+    f_low = _npv(low, amounts, years)
+    f_high = _npv(high, amounts, years)
+    bracketed = np.sign(f_low) != np.sign(f_high)
+
+    for _ in range(BISECTION_ITERATIONS):
+        mid = (low + high) / 2
+        f_mid = _npv(mid, amounts, years)
+        same_side = np.sign(f_mid) == np.sign(f_low)
+        low = np.where(same_side, mid, low)
+        f_low = np.where(same_side, f_mid, f_low)
+        high = np.where(same_side, high, mid)
+        if np.all(high - low < TOLERANCE):
+            break
+
+    return np.where(bracketed, (low + high) / 2, np.nan)
+
+
+def xirr(flows: pd.Series) -> float:
+    """
+    Returns the annual internal rate of return of dated cash flows.
+
+    Parameters:
+        flows (pd.Series): Cash flows indexed by date (negative for money invested).
+
+    Returns:
+        float: Annual rate, NaN if it cannot be solved.
+    """
+    dates = pd.DatetimeIndex(flows.index)
+    years = (dates - dates.min()).days.to_numpy() / DAYS_PER_YEAR
+    return float(xirr_batch(flows.to_numpy()[None, :], years[None, :])[0])
+
+
+def grouped_xirr(flows: pd.DataFrame, group: str = 'Ticker', date: str = 'Date', amount: str = 'Amount') -> pd.Series:
+    """
+    Returns the internal rate of return of every group of cash flows, solved in one batched call.
+
+    Parameters:
+        flows (pd.DataFrame): One row per cash flow with a group, a date and an amount.
+        group (str): Column identifying the series.
+        date (str): Column with the date of each flow.
+        amount (str): Column with the amount of each flow (negative for money invested).
+
+    Returns:
+        pd.Series: Annual rate per group.
+    """
+    if flows.empty:
+        return pd.Series(dtype='float64')
+
+    flows = flows.sort_values([group, date], kind='stable')
+    years = (flows[date] - flows.groupby(group)[date].transform('min')).dt.days / DAYS_PER_YEAR
+    slot = flows.groupby(group).cumcount()
+
+    # Pad every series to the same length so they can be solved as one matrix
+    amounts = pd.pivot(flows.assign(_slot=slot), index=group, columns='_slot', values=amount)
+    times = pd.pivot(flows.assign(_slot=slot, _years=years), index=group, columns='_slot', values='_years')
+    return pd.Series(xirr_batch(amounts.to_numpy(), times.to_numpy()), index=amounts.index)
+
+
+def ticker_flows(transactions: pd.DataFrame, market_values: Optional[pd.Series] = None,
+                 as_of: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+    """
+    Returns the cash flows of every ticker from the investor's side: purchases are negative, and sale proceeds,
+    dividends and the current value of the shares still held are positive.
+
+    Parameters:
+        transactions (pd.DataFrame): Events as returned by transactionLog.load_transactions.
+        market_values (pd.Series): Current value of the shares held per ticker.
+        as_of (pd.Timestamp): Date of the current values. Defaults to today.
+
+    Returns:
+        pd.DataFrame: Ticker, Date and Amount of every flow.
+    """
+    value = transactions['Shares'] * transactions['Price']
+    kind = transactions['Type']
+    amounts = np.select(
+        [kind == 'buy', kind == 'sell', kind == 'dividend'], [-value, value, transactions['Amount']], np.nan
+    )
+    flows = pd.DataFrame({'Ticker': transactions['Ticker'], 'Date': transactions['Date'], 'Amount': amounts}).dropna()
+
+    if market_values is not None and not market_values.empty:
+        as_of = pd.Timestamp(as_of) if as_of is not None else pd.Timestamp.today().normalize()
+        terminal = pd.DataFrame({'Ticker': market_values.index, 'Date': as_of, 'Amount': market_values.to_numpy()})
+        flows = pd.concat([flows, terminal[terminal['Amount'] > 0]], ignore_index=True)
+    return flows
+
+
+def time_weighted_return(nav: pd.DataFrame) -> pd.Series:
+    """
+    Returns the daily time-weighted return of the portfolio. Each day's return removes the cash put in or taken out
+    that day, so the result measures the investments and not the timing of deposits.
+
+    Parameters:
+        nav (pd.DataFrame): NAV and Net Flow indexed by date, as returned by portfolio.get_nav.
+
+    Returns:
+        pd.Series: Return of each day. Cumulative TWR is (1 + returns).prod() - 1.
+    """
+    previous = nav['NAV'].shift(1)
+    returns = (nav['NAV'] - nav['Net Flow']) / previous - 1
+    return returns.where(previous > 0, 0.0).fillna(0.0)
+
+
+def annualize(total_return: float, days: float) -> float:
+    """
+    Converts a return earned over a number of calendar days to an annual rate.
+    """
+    if days <= 0:
+        return np.nan
+    return (1 + total_return) ** (DAYS_PER_YEAR / days) - 1
+
+
+def portfolio_returns(nav: pd.DataFrame) -> dict:
+    """
+    Summarizes the portfolio's time-weighted and money-weighted returns.
+
+    Parameters:
+        nav (pd.DataFrame): NAV and Net Flow indexed by date, as returned by portfolio.get_nav.
+
+    Returns:
+        dict: TWR, Annualized TWR and XIRR (money-weighted annual return).
+    """
+    if nav.empty:
+        return {'TWR': np.nan, 'Annualized TWR': np.nan, 'XIRR': np.nan}
+
+    twr = float((1 + time_weighted_return(nav)).prod() - 1)
+    days = (nav.index[-1] - nav.index[0]).days
+
+    # Deposits are money invested (negative for the investor), and the final value is paid back on the last day
+    flows = -nav['Net Flow'][nav['Net Flow'] != 0]
+    flows.loc[nav.index[-1]] = flows.get(nav.index[-1], 0.0) + nav['NAV'].iloc[-1]
+
+    return {'TWR': twr, 'Annualized TWR': annualize(twr, days), 'XIRR': xirr(flows.sort_index())}
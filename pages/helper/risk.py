@@ -0,0 +1,126 @@
+"""
+This module computes risk statistics of the current holdings from a matrix of daily closes: rolling volatility, beta
+against a benchmark, historical and parametric Value at Risk (VaR) and Conditional VaR (CVaR), the covariance and
+correlation matrices and the maximum drawdown. Every statistic is computed for all columns of the matrix at once.
+"""
+
+# Import necessary libraries
+from dataclasses import dataclass
+from typing import Optional
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+
+BENCHMARK = 'SPY'
+TRADING_DAYS = 252
+LOOKBACK_DAYS = 252 # daily returns used for beta, VaR and the covariance matrix
+VOLATILITY_WINDOW = 21 # trading days in each rolling volatility estimate
+CONFIDENCE = 0.95
+PORTFOLIO = 'Portfolio'
+
+
+@dataclass
+class RiskReport:
+    """
+    Risk statistics of a portfolio and its holdings. Volatilities are annualized; VaR and CVaR are one-day losses
+    expressed as positive fractions of value.
+    """
+    weights: pd.Series
+    value: float
+    volatility: pd.Series # annualized volatility per holding and for the portfolio
+    rolling_volatility: pd.DataFrame
+    beta: pd.Series
+    var: pd.DataFrame # Historical and Parametric VaR per holding and for the portfolio
+    cvar: pd.DataFrame
+    covariance: pd.DataFrame # annualized
+    correlation: pd.DataFrame
+    max_drawdown: pd.Series
+    confidence: float = CONFIDENCE
+
+
+def _tail_stats(returns: np.ndarray, confidence: float):
+    """
+    Returns the historical VaR and CVaR of every column of a returns matrix.
+    """
+    cutoff = np.nanquantile(returns, 1 - confidence, axis=0)
+    tail = np.where(returns <= cutoff, returns, np.nan)
+    with np.errstate(invalid='ignore'):
+        return -cutoff, -np.nanmean(tail, axis=0)
+
+
+def compute_risk(closes: pd.DataFrame, shares: pd.Series, benchmark: Optional[pd.Series] = None,
+                 confidence: float = CONFIDENCE, lookback: int = LOOKBACK_DAYS,
+                 window: int = VOLATILITY_WINDOW) -> RiskReport:
+    """
+    Computes the risk statistics of the holdings, treating the portfolio as the current shares held over the whole
+    lookback period.
+
+    Parameters:
+        closes (pd.DataFrame): Daily closes, one column per ticker.
+        shares (pd.Series): Shares held per ticker.
+        benchmark (pd.Series): Daily closes of the benchmark used for beta.
+        confidence (float): Confidence level of VaR and CVaR.
+        lookback (int): Number of most recent daily returns to use.
+        window (int): Trading days in each rolling volatility estimate.
+
+    Returns:
+        RiskReport: Statistics for every holding and for the portfolio (the 'Portfolio' entry).
+
+    Raises:
+        ValueError: If there are fewer than two days on which every holding has a price.
+    """
+    # Holdings without any stored prices are left out
+    tickers = [ticker for ticker in shares.index if ticker in closes.columns and closes[ticker].notna().any()]
+    # Only days on which every holding has a price, so the portfolio value does not jump when one starts trading
+    closes = closes[tickers].sort_index().ffill().dropna()
+    if len(closes) < 2:
+        raise ValueError("Not enough price history to compute risk statistics")
+    shares = shares.reindex(tickers).astype('float64')
+
+    # Value the current shares on every day, then append the portfolio as one more column of the matrix
+    values = closes.to_numpy() * shares.to_numpy()
+    latest = values[-1]
+    weights = pd.Series(latest / latest.sum(), index=tickers)
+    prices = closes.assign(**{PORTFOLIO: values.sum(axis=1)})
+    prices = prices.iloc[-(lookback + 1):]
+    returns = prices.pct_change().iloc[1:]
+
+    matrix = returns.to_numpy()
+    volatility = pd.Series(np.nanstd(matrix, axis=0, ddof=1) * np.sqrt(TRADING_DAYS), index=returns.columns)
+    rolling_volatility = returns.rolling(window).std() * np.sqrt(TRADING_DAYS)
+
+    historical_var, historical_cvar = _tail_stats(matrix, confidence)
+
+    # Parametric VaR and CVaR assume normally distributed daily returns
+    z = NormalDist().inv_cdf(1 - confidence)
+    mean = np.nanmean(matrix, axis=0)
+    std = np.nanstd(matrix, axis=0, ddof=1)
+    parametric_var = -(mean + z * std)
+    parametric_cvar = -(mean - std * NormalDist().pdf(z) / (1 - confidence))
+
+    var = pd.DataFrame({'Historical': historical_var, 'Parametric': parametric_var}, index=returns.columns)
+    cvar = pd.DataFrame({'Historical': historical_cvar, 'Parametric': parametric_cvar}, index=returns.columns)
+
+    asset_returns = returns[tickers]
+    covariance = asset_returns.cov() * TRADING_DAYS
+    correlation = asset_returns.corr()
+
+    # Beta of every column against the benchmark in one matrix product
+    if benchmark is not None and not benchmark.dropna().empty:
+        benchmark_returns = benchmark.sort_index().ffill().pct_change().reindex(returns.index)
+        aligned = returns[benchmark_returns.notna()]
+        b = benchmark_returns.dropna().to_numpy()
+        demeaned = np.nan_to_num(aligned.to_numpy() - np.nanmean(aligned.to_numpy(), axis=0))
+        beta = pd.Series(demeaned.T @ (b - b.mean()) / np.sum((b - b.mean()) ** 2), index=returns.columns)
+    else:
+        beta = pd.Series(np.nan, index=returns.columns)
+
+    max_drawdown = (prices / prices.cummax() - 1).min()
+
+    return RiskReport(
+        weights=weights, value=float(latest.sum()), volatility=volatility,
+        rolling_volatility=rolling_volatility, beta=beta, var=var, cvar=cvar,
+        covariance=covariance, correlation=correlation, max_drawdown=max_drawdown, confidence=confidence,
+    )
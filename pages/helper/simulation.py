@@ -0,0 +1,151 @@
+"""
+This module runs Monte Carlo simulations of the current holdings. Correlated daily returns are drawn either by
+resampling whole historical days (bootstrap) or from a multivariate normal fitted to history, for many paths at once.
+Paths are generated in chunks to bound memory, and the chunks can be spread over a process pool. Every chunk has
+its own seed, so the results are the same whether it runs in one process or several.
+"""
+
+# Import necessary libraries
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+SIMULATION_METHODS = {
+    'bootstrap': 'Historical Bootstrap',
+    'normal': 'Multivariate Normal',
+}
+LOOKBACK_DAYS = 3*252 # historical daily returns the simulation is fitted to
+CHUNK_ELEMENTS = 2**24 # simulated returns (paths × days × holdings) generated at a time
+SAMPLE_PATHS = 1000 # paths kept in full for percentile bands
+PERCENTILES = [5, 25, 50, 75, 95]
+
+
+@dataclass
+class SimulationResult:
+    """
+    Terminal values and maximum drawdowns of every simulated path, plus a sample of full value paths.
+    """
+    initial_value: float
+    terminal_values: np.ndarray
+    max_drawdowns: np.ndarray
+    sample_paths: np.ndarray # paths × (horizon + 1) values, starting at the initial value
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Returns the percentiles of terminal value, return and maximum drawdown across all paths.
+        """
+        summary = pd.DataFrame({
+            'Terminal Value': np.percentile(self.terminal_values, PERCENTILES),
+            'Return': np.percentile(self.terminal_values / self.initial_value - 1, PERCENTILES),
+            'Max Drawdown': np.percentile(self.max_drawdowns, PERCENTILES),
+        }, index=[f"P{p}" for p in PERCENTILES])
+        summary.index.name = 'Percentile'
+        return summary
+
+    def probability_of_loss(self) -> float:
+        return float(np.mean(self.terminal_values < self.initial_value))
+
+    def bands(self) -> pd.DataFrame:
+        """
+        Returns the percentiles of the sampled path values on each simulated day.
+        """
+        return pd.DataFrame(np.percentile(self.sample_paths, PERCENTILES, axis=0).T,
+                            columns=[f"P{p}" for p in PERCENTILES])
+
+
+def _simulate_chunk(n_paths: int, horizon: int, method: str, history: np.ndarray, mean: np.ndarray,
+                    cholesky: np.ndarray, holdings: np.ndarray, seed: np.random.SeedSequence, keep: int):
+    """
+    Simulates one chunk of paths.
+
+    Returns:
+        tuple: Terminal values, maximum drawdowns and the first `keep` full value paths of the chunk.
+    """
+    rng = np.random.default_rng(seed)
+    if method == 'bootstrap':
+        # Resample whole historical days, which keeps the correlation between holdings
+        returns = history[rng.integers(0, len(history), size=(n_paths, horizon))]
+    else:
+        shocks = rng.standard_normal((n_paths * horizon, len(mean)), dtype=np.float32)
+        returns = (shocks @ cholesky.T + mean).reshape(n_paths, horizon, len(mean))
+
+    # Buy and hold: each holding grows with its own cumulative return (a holding cannot lose more than its value)
+    np.maximum(returns, -0.9999, out=returns)
+    np.log1p(returns, out=returns)
+    np.cumsum(returns, axis=1, out=returns)
+    np.exp(returns, out=returns)
+    values = returns @ holdings
+    values = np.concatenate([np.full((n_paths, 1), holdings.sum(), dtype=values.dtype), values], axis=1)
+
+    drawdowns = (values / np.maximum.accumulate(values, axis=1) - 1).min(axis=1)
+    return values[:, -1], drawdowns, values[:keep]
+
+
+def simulate_portfolio(closes: pd.DataFrame, shares: pd.Series, n_paths: int = 100_000, horizon: int = 252,
+                       method: str = 'bootstrap', lookback: int = LOOKBACK_DAYS,
+                       processes: Optional[int] = None, seed: Optional[int] = None) -> SimulationResult:
+    """
+    Simulates the value of the current holdings over a horizon.
+
+    Parameters:
+        closes (pd.DataFrame): Daily closes, one column per ticker.
+        shares (pd.Series): Shares held per ticker.
+        n_paths (int): Number of simulated paths.
+        horizon (int): Trading days simulated.
+        method (str): 'bootstrap' or 'normal'.
+        lookback (int): Number of most recent daily returns the simulation is fitted to.
+        processes (int): Size of the process pool the chunks are spread over. None runs them in this process.
+        seed (int): Seed for reproducible results.
+
+    Returns:
+        SimulationResult: Distribution of terminal value and maximum drawdown.
+
+    Raises:
+        ValueError: If the method is unknown or there is not enough price history.
+    """
+    if method not in SIMULATION_METHODS:
+        raise ValueError(f"Unknown simulation method '{method}', expected one of {list(SIMULATION_METHODS)}")
+
+    tickers = [ticker for ticker in shares.index if ticker in closes.columns and closes[ticker].notna().any()]
+    closes = closes[tickers].sort_index().ffill().dropna()
+    if len(closes) < 3:
+        raise ValueError("Not enough price history to run a simulation")
+
+    history = closes.pct_change().iloc[1:].iloc[-lookback:].to_numpy(dtype=np.float32)
+    holdings = (closes.iloc[-1] * shares.reindex(tickers)).to_numpy(dtype=np.float32)
+
+    mean = history.mean(axis=0)
+    covariance = np.atleast_2d(np.cov(history, rowvar=False))
+    try:
+        cholesky = np.linalg.cholesky(covariance)
+    except np.linalg.LinAlgError:
+        # Holdings that move together exactly make the covariance singular; use its positive part instead
+        eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+        cholesky = eigenvectors * np.sqrt(np.clip(eigenvalues, 0, None))
+    cholesky = cholesky.astype(np.float32)
+
+    # Split the paths into chunks small enough to keep in memory, each with an independent random stream
+    chunk_size = max(1, min(n_paths, CHUNK_ELEMENTS // (horizon * len(tickers))))
+    sizes = [min(chunk_size, n_paths - start) for start in range(0, n_paths, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    keep = -(-SAMPLE_PATHS // len(sizes))
+    args = [(size, horizon, method, history, mean, cholesky, holdings, chunk_seed, keep)
+            for size, chunk_seed in zip(sizes, seeds)]
+
+    if processes and processes > 1 and len(sizes) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            chunks = list(executor.map(_simulate_chunk, *zip(*args)))
+    else:
+        chunks = [_simulate_chunk(*chunk_args) for chunk_args in args]
+
+    terminal_values, drawdowns, samples = zip(*chunks)
+    return SimulationResult(
+        initial_value=float(holdings.sum()),
+        terminal_values=np.concatenate(terminal_values),
+        max_drawdowns=np.concatenate(drawdowns),
+        sample_paths=np.concatenate(samples)[:SAMPLE_PATHS],
+    )
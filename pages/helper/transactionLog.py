@@ -0,0 +1,559 @@
+"""
+This module keeps every portfolio transaction (buys, sells, dividends and splits) in a single append-only log of
+JSON lines. Holdings are computed from the last position snapshot plus the events appended after it, so loading
+them does not get slower as the log grows. Trades from the open and closed trade ledgers are kept in the log as
+well. When a ledger file changes, the differences are appended: void events cancel the trades that were edited or
+removed, followed by the new versions, so lines already in the log are never rewritten.
+"""
+
+# Import necessary libraries
+import glob
+import hashlib
+import io
+import json
+import os
+import pickle
+import re
+import threading
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError: # Windows has no advisory file locks, so only threads of one process are kept apart there
+    fcntl = None
+
+from pages.helper.costBasis import COST_BASIS_METHODS, match_lots, summarize_lots
+from pages.helper.ledger import (LEDGER_CACHE_PATH, PAST_TRADES_PATH, TRADES_PATH, coerce_columns, load_past_trades,
+                                 load_trades)
+
+
+TRANSACTIONS_PATH = os.path.join('data', 'transactions.jsonl')
+SNAPSHOT_EVERY = 250 # events replayed on top of a snapshot before a new snapshot is written
+SNAPSHOT_VERSION = 3 # increased when the way positions are computed changes, so older snapshots are not reused
+EVENT_TYPES = ('buy', 'sell', 'dividend', 'split')
+VOID_TYPE = 'void' # cancels the earlier event with the same id, e.g. a ledger trade that was edited or removed
+LEDGER_SOURCE = 'ledger' # source of the events imported from the trade ledgers
+# Ledger entries whose ticker is not a tradable symbol (e.g. 'S&P 500' benchmark trades) are not imported
+TICKER_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9.\-]*$')
+
+# Mapping of the transaction log fields to DataFrame columns and their types
+EVENT_COLUMNS = {
+    'date': ('Date', 'datetime64[ns]'),
+    'type': ('Type', 'object'),
+    'ticker': ('Ticker', 'object'),
+    'shares': ('Shares', 'float64'), # buys and sells
+    'price': ('Price', 'float64'), # buys and sells
+    'amount': ('Amount', 'float64'), # cash paid by a dividend
+    'ratio': ('Ratio', 'float64'), # new shares per old share of a split
+    'company': ('Company', 'object'),
+    'source': ('Source', 'object'), # 'ledger' for events imported from the trade ledgers
+    'id': ('Id', 'object'), # identifies an imported ledger trade, so a void event can cancel it
+}
+
+
+@dataclass
+class Positions:
+    """
+    Open lots, realized gains and dividends of the portfolio after the first `offset` bytes of the log.
+    """
+    offset: int = 0
+    events: int = 0
+    head: bytes = b'' # start of the log, used to detect a log that was rewritten
+    generation: str = '' # generation of the log the positions were computed from, changed whenever it is rewritten
+    last_date: Optional[pd.Timestamp] = None # latest event date applied, later events dated before it need a replay
+    lots: pd.DataFrame = field(default_factory=lambda: pd.DataFrame({
+        'Ticker': pd.Series(dtype='object'), 'Date': pd.Series(dtype='datetime64[ns]'),
+        'Shares': pd.Series(dtype='float64'), 'Price': pd.Series(dtype='float64'),
+    }))
+    realized: pd.Series = field(default_factory=lambda: pd.Series(dtype='float64'))
+    dividends: pd.Series = field(default_factory=lambda: pd.Series(dtype='float64'))
+
+    def holdings(self, market_prices: Optional[pd.Series] = None) -> pd.DataFrame:
+        """
+        Returns one row per ticker with Shares, Cost/Share, Total Cost, Realized Gain and Dividends, plus
+        Market Price, Total Value and Unrealized Gain when market prices are given.
+        """
+        holdings = summarize_lots(self.lots, self.realized, market_prices)
+        tickers = holdings.index.union(self.dividends.index)
+        holdings = holdings.reindex(tickers)
+        holdings.index.name = 'Ticker'
+        holdings[['Shares', 'Total Cost', 'Realized Gain']] = holdings[['Shares', 'Total Cost', 'Realized Gain']].fillna(0.0)
+        holdings['Dividends'] = self.dividends.reindex(tickers, fill_value=0.0)
+        return holdings
+
+
+_positions: Dict[Tuple[str, str], Positions] = {} # (log path, method) -> latest positions
+_snapshot_events: Dict[Tuple[str, str], Optional[int]] = {} # (log path, method) -> events in the snapshot on disk
+_positions_lock = threading.Lock()
+_append_lock = threading.Lock()
+
+
+def _format_event(event: dict) -> str:
+    """
+    Serializes an event as one JSON line, leaving out empty fields.
+    """
+    record = {}
+    for key, value in event.items():
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            continue
+        if isinstance(value, pd.Timestamp):
+            value = value.strftime('%Y-%m-%d')
+        elif isinstance(value, np.generic):
+            value = value.item()
+        record[key] = value
+    return json.dumps(record) + '\n'
+
+
+def _ledger_events() -> pd.DataFrame:
+    """
+    Converts the open and closed trade ledgers to events. Every closed trade becomes a buy and a sell.
+
+    Returns:
+        pd.DataFrame: Events with the log fields, sorted by date with buys before sells on the same day.
+    """
+    frames = []
+    try:
+        trades = load_trades()
+        frames.append(pd.DataFrame({
+            'date': trades['Date'], 'type': 'buy', 'ticker': trades['Ticker'],
+            'shares': trades['Shares'], 'price': trades['Cost/Share'], 'company': trades['Company'],
+        }))
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error occurred while reading open trades: {e}")
+
+    try:
+        past_trades = load_past_trades()
+        frames.append(pd.DataFrame({
+            'date': past_trades['Entry Date'], 'type': 'buy', 'ticker': past_trades['Ticker'],
+            'shares': past_trades['Shares'], 'price': past_trades['Entry Price'],
+        }))
+        frames.append(pd.DataFrame({
+            'date': past_trades['Sell Date'], 'type': 'sell', 'ticker': past_trades['Ticker'],
+            'shares': past_trades['Shares'], 'price': past_trades['Sell Price'],
+        }))
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error occurred while reading past trades: {e}")
+
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=list(EVENT_COLUMNS))
+
+    # Buys are listed before sells, so sorting keeps them first on the same day
+    events = pd.concat(frames, ignore_index=True).sort_values('date', kind='stable')
+    tradable = events['ticker'].astype(str).str.match(TICKER_PATTERN)
+    for ticker in events.loc[~tradable, 'ticker'].unique():
+        print(f"Skipping ledger trades of '{ticker}', which is not a tradable symbol")
+    events = events[tradable].assign(source=LEDGER_SOURCE)
+
+    # Every entry is identified by its content; identical entries are told apart by their occurrence
+    lines = pd.Series([_format_event(event) for event in events.to_dict('records')], index=events.index)
+    occurrence = lines.groupby(lines).cumcount()
+    events['id'] = [hashlib.sha1(f"{line}{n}".encode()).hexdigest()[:16] for line, n in zip(lines, occurrence)]
+    return events
+
+
+def _ledger_fingerprint() -> list:
+    """
+    Returns the size and modification time of the trade ledgers, which change whenever a ledger is edited.
+    """
+    fingerprint = []
+    for ledger_path in (TRADES_PATH, PAST_TRADES_PATH):
+        try:
+            stat = os.stat(ledger_path)
+            fingerprint.append([ledger_path, stat.st_mtime_ns, stat.st_size])
+        except OSError:
+            fingerprint.append([ledger_path, None, None])
+    return fingerprint
+
+
+def _state_file(path: str) -> str:
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(LEDGER_CACHE_PATH, f"{stem}-ledgers.json")
+
+
+def _read_state(path: str) -> dict:
+    """
+    Returns the ledger fingerprint the log was last synced with and the generation of the log.
+    """
+    try:
+        with open(_state_file(path)) as f:
+            state = json.load(f)
+        return state if isinstance(state, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _net_events(events: pd.DataFrame) -> pd.DataFrame:
+    """
+    Leaves out the void events and the events they cancel. Each void event cancels the earliest event before it
+    that has the same id and is not cancelled yet.
+    """
+    voids = (events['Type'] == VOID_TYPE).to_numpy()
+    if not voids.any():
+        return events
+
+    keep = ~voids
+    pending: Dict[str, list] = {} # id -> positions of the events not cancelled yet
+    for position, (event_id, is_void) in enumerate(zip(events['Id'], voids)):
+        if pd.isna(event_id):
+            continue
+        if not is_void:
+            pending.setdefault(event_id, []).append(position)
+        elif pending.get(event_id):
+            keep[pending[event_id].pop(0)] = False
+    return events[keep]
+
+
+class _LogLock:
+    """
+    Keeps other threads and, where file locks are available, other processes from writing the log at the same time.
+    """
+
+    def __init__(self, path: str):
+        self.path = f"{path}.lock"
+
+    def __enter__(self):
+        _append_lock.acquire()
+        self._file = None
+        if fcntl is not None:
+            try:
+                self._file = open(self.path, 'a')
+                fcntl.flock(self._file, fcntl.LOCK_EX)
+            except OSError as e:
+                print(f"Error occurred while locking the transaction log: {e}")
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._file is not None:
+            self._file.close() # closing the file releases the lock
+        _append_lock.release()
+
+
+def _rewrite_log(path: str, events: pd.DataFrame) -> str:
+    """
+    Writes a new log and discards the snapshots of the previous one.
+
+    Returns:
+        str: The generation of the new log.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.writelines(_format_event(event) for event in events.to_dict('records'))
+    os.replace(tmp_path, path)
+
+    stem = os.path.splitext(os.path.basename(path))[0]
+    for snapshot_file in glob.glob(os.path.join(LEDGER_CACHE_PATH, f"{stem}-snapshot-*.pkl")):
+        try:
+            os.remove(snapshot_file)
+        except OSError as e:
+            print(f"Error occurred while removing position snapshot: {e}")
+    return uuid.uuid4().hex
+
+
+def _ledger_corrections(events: pd.DataFrame, ledger_events: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns the events to append so the imported trades in the log match the ledgers: a void event for every
+    imported trade no longer in the ledgers, then every ledger trade not imported yet.
+    """
+    imported = _net_events(events)
+    imported = imported[imported['Source'] == LEDGER_SOURCE]
+    removed = imported[~imported['Id'].isin(ledger_events['id'])]
+    voids = pd.DataFrame({
+        'date': removed['Date'], 'type': VOID_TYPE, 'ticker': removed['Ticker'], 'source': LEDGER_SOURCE,
+        'id': removed['Id'],
+    })
+    added = ledger_events[~ledger_events['id'].isin(imported['Id'])]
+    frames = [frame for frame in (voids, added) if not frame.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=list(EVENT_COLUMNS))
+
+
+def _migrate_legacy_log(events: pd.DataFrame, ledger_events: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns the events of a log written before imported trades were tagged, with the imported ledger trades
+    (including those of symbols that are no longer imported) replaced by the current ledger trades.
+    """
+    events = events.rename(columns={name: key for key, (name, _) in EVENT_COLUMNS.items()})
+    recorded = events[events['source'] != LEDGER_SOURCE]
+    recorded = recorded[recorded['ticker'].astype(str).str.match(TICKER_PATTERN)]
+    trade_key = ['date', 'type', 'ticker', 'shares', 'price']
+    matched = recorded[trade_key].merge(ledger_events[trade_key].drop_duplicates(), how='left', indicator=True)
+    recorded = recorded[(matched['_merge'] == 'left_only').to_numpy()]
+
+    # Ledger trades come first on the same day, then the recorded events in log order
+    frames = [frame for frame in (ledger_events, recorded) if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=list(EVENT_COLUMNS))
+    migrated = pd.concat(frames, ignore_index=True)
+    return migrated.assign(date=pd.to_datetime(migrated['date'])).sort_values('date', kind='stable')
+
+
+def _sync_with_ledgers(path: str) -> None:
+    """
+    Creates the transaction log from the trade ledgers, or appends the changes of the ledgers if they changed since
+    the log was last synced. Events recorded with append_transaction are kept. Only a log written before imported
+    trades were tagged is rewritten, which starts a new generation of the log.
+
+    Parameters:
+        path (str): Path of the transaction log.
+    """
+    fingerprint = _ledger_fingerprint()
+    state = _read_state(path)
+    if os.path.exists(path) and state.get('ledgers') == fingerprint and state.get('generation'):
+        return
+
+    with _LogLock(path):
+        # Another process may have synced the log while this one waited for the lock
+        state = _read_state(path)
+        if os.path.exists(path) and state.get('ledgers') == fingerprint and state.get('generation'):
+            return
+
+        ledger_events = _ledger_events()
+        generation = state.get('generation')
+        if not os.path.exists(path):
+            generation = _rewrite_log(path, ledger_events)
+        else:
+            events = _read_events(path)[0]
+            imported = events[events['Source'] == LEDGER_SOURCE]
+            if (not events.empty and events['Source'].isna().all()) or imported['Id'].isna().any():
+                generation = _rewrite_log(path, _migrate_legacy_log(events, ledger_events))
+            else:
+                corrections = _ledger_corrections(events, ledger_events)
+                if not corrections.empty:
+                    with open(path, 'a') as f:
+                        f.write(''.join(_format_event(event) for event in corrections.to_dict('records')))
+                # A log synced by an earlier version has no generation yet
+                generation = generation or uuid.uuid4().hex
+
+        try:
+            os.makedirs(LEDGER_CACHE_PATH, exist_ok=True)
+            tmp_file = f"{_state_file(path)}.{os.getpid()}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump({'ledgers': fingerprint, 'generation': generation}, f)
+            os.replace(tmp_file, _state_file(path))
+        except OSError as e:
+            print(f"Error occurred while recording the trade ledgers: {e}")
+
+
+def _read_events(path: str, offset: int = 0) -> Tuple[pd.DataFrame, int]:
+    """
+    Reads the complete lines of the log after a byte offset.
+
+    Parameters:
+        path (str): Path of the transaction log.
+        offset (int): Byte offset to start reading from.
+
+    Returns:
+        tuple: The events as a typed DataFrame, and the offset just after the last complete line.
+    """
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read()
+
+    # A line still being written by another process is picked up on the next read
+    end = data.rfind(b'\n') + 1
+    text = data[:end].decode('utf-8')
+    if text.strip():
+        raw = pd.read_json(io.StringIO(text), lines=True, dtype=False, convert_dates=False)
+    else:
+        raw = pd.DataFrame()
+    return coerce_columns(raw, EVENT_COLUMNS), offset + end
+
+
+def load_transactions(path: str = TRANSACTIONS_PATH) -> pd.DataFrame:
+    """
+    Loads the full transaction log, creating it from the trade ledgers if it does not exist yet and importing
+    their changes if they changed. Void events and the events they cancel are left out.
+
+    Parameters:
+        path (str): Path of the transaction log.
+
+    Returns:
+        pd.DataFrame: Date, Type, Ticker, Shares, Price, Amount, Ratio and Company of every event, in log order.
+    """
+    _sync_with_ledgers(path)
+    return _net_events(_read_events(path)[0])
+
+
+def append_transaction(event_type: str, ticker: str, date, shares: Optional[float] = None,
+                       price: Optional[float] = None, amount: Optional[float] = None,
+                       ratio: Optional[float] = None, company: Optional[str] = None,
+                       path: str = TRANSACTIONS_PATH) -> None:
+    """
+    Appends one event to the transaction log.
+
+    Parameters:
+        event_type (str): 'buy', 'sell', 'dividend' or 'split'.
+        ticker (str): Stock ticker.
+        date: Date of the event, e.g. '2025-01-28'.
+        shares (float): Number of shares bought or sold.
+        price (float): Price per share of a buy or sell.
+        amount (float): Cash received from a dividend.
+        ratio (float): New shares per old share of a split, e.g. 2 for a 2-for-1 split.
+        company (str): Optional company name.
+        path (str): Path of the transaction log.
+
+    Raises:
+        ValueError: If the event type is unknown or a required field is missing.
+    """
+    required = {'buy': ('shares', 'price'), 'sell': ('shares', 'price'), 'dividend': ('amount',), 'split': ('ratio',)}
+    if event_type not in EVENT_TYPES:
+        raise ValueError(f"Unknown transaction type '{event_type}', expected one of {list(EVENT_TYPES)}")
+
+    event = {
+        'date': pd.Timestamp(date), 'type': event_type, 'ticker': ticker, 'shares': shares, 'price': price,
+        'amount': amount, 'ratio': ratio, 'company': company,
+    }
+    missing = [name for name in required[event_type] if event[name] is None]
+    if missing:
+        raise ValueError(f"A {event_type} transaction needs {', '.join(missing)}")
+
+    _sync_with_ledgers(path)
+
+    # A single write of one line in append mode keeps concurrent writers from interleaving
+    with _LogLock(path), open(path, 'a') as f:
+        f.write(_format_event(event))
+
+
+def _apply_events(positions: Positions, events: pd.DataFrame, method: str) -> Positions:
+    """
+    Applies new events on top of existing positions.
+
+    Parameters:
+        positions (Positions): Positions before the events.
+        events (pd.DataFrame): Typed events from the log.
+        method (str): Cost basis method used to match sells against lots.
+
+    Returns:
+        Positions: Positions after the events. The offset is left for the caller to set.
+    """
+    lots = positions.lots.copy()
+    trades = events[events['Type'].isin(['buy', 'sell'])]
+    trades = pd.DataFrame({
+        'Ticker': trades['Ticker'],
+        'Date': trades['Date'],
+        'Shares': trades['Shares'].where(trades['Type'] == 'buy', -trades['Shares']),
+        'Price': trades['Price'],
+    })
+
+    # Restate the lots and trades dated before a split in post-split shares
+    for split in events[events['Type'] == 'split'].itertuples():
+        for frame in (lots, trades):
+            before = (frame['Ticker'] == split.Ticker) & (frame['Date'] < split.Date)
+            frame.loc[before, 'Shares'] *= split.Ratio
+            frame.loc[before, 'Price'] /= split.Ratio
+
+    open_lots, realized = match_lots(pd.concat([lots, trades], ignore_index=True), method)
+
+    dividends = events[events['Type'] == 'dividend']
+    dividends = dividends['Amount'].groupby(dividends['Ticker']).sum()
+
+    return Positions(
+        offset=positions.offset,
+        events=positions.events + len(events),
+        head=positions.head,
+        generation=positions.generation,
+        last_date=max(filter(pd.notna, [positions.last_date, events['Date'].max()]), default=None),
+        lots=open_lots.reset_index(drop=True),
+        realized=positions.realized.add(realized, fill_value=0),
+        dividends=positions.dividends.add(dividends, fill_value=0),
+    )
+
+
+def _snapshot_file(path: str, method: str) -> str:
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(LEDGER_CACHE_PATH, f"{stem}-snapshot-v{SNAPSHOT_VERSION}-{method}.pkl")
+
+
+def _read_snapshot(path: str, method: str) -> Optional[Positions]:
+    try:
+        with open(_snapshot_file(path, method), 'rb') as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Error occurred while reading position snapshot: {e}")
+        return None
+
+
+def _write_snapshot(path: str, method: str, positions: Positions) -> None:
+    snapshot_file = _snapshot_file(path, method)
+    try:
+        os.makedirs(LEDGER_CACHE_PATH, exist_ok=True)
+        tmp_file = f"{snapshot_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'wb') as f:
+            pickle.dump(positions, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, snapshot_file)
+    except Exception as e:
+        print(f"Error occurred while writing position snapshot: {e}")
+
+
+def _is_valid(positions: Positions, size: int, head: bytes, generation: str) -> bool:
+    """
+    Checks that positions were computed from the current log and not from an older, rewritten one.
+    """
+    return positions.generation == generation and positions.offset <= size and head[:len(positions.head)] == positions.head
+
+
+def load_positions(method: str = 'fifo', path: str = TRANSACTIONS_PATH) -> Positions:
+    """
+    Returns the current positions: the latest snapshot plus the events appended to the log after it. A new
+    snapshot is written once SNAPSHOT_EVERY events have been replayed on top of the previous one. Appended events
+    dated before events already applied, and void events, are replayed with the whole log, so the positions never
+    depend on when snapshots were taken.
+
+    Parameters:
+        method (str): Cost basis method used to match sells against lots, one of COST_BASIS_METHODS.
+        path (str): Path of the transaction log.
+
+    Returns:
+        Positions: Open lots, realized gains and dividends.
+    """
+    if method not in COST_BASIS_METHODS:
+        raise ValueError(f"Unknown cost basis method '{method}', expected one of {list(COST_BASIS_METHODS)}")
+    _sync_with_ledgers(path)
+
+    key = (path, method)
+    with _positions_lock:
+        generation = _read_state(path).get('generation', '')
+        size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            head = f.read(256)
+
+        # Start from the positions already computed in this process, or from the snapshot on disk
+        positions = _positions.get(key)
+        if positions is None or not _is_valid(positions, size, head, generation):
+            positions = _read_snapshot(path, method)
+            if positions is None or not _is_valid(positions, size, head, generation):
+                positions = Positions()
+                _snapshot_events[key] = None
+            else:
+                _snapshot_events[key] = positions.events
+
+        if positions.offset < size:
+            events, offset = _read_events(path, positions.offset)
+            back_dated = positions.last_date is not None and (events['Date'] < positions.last_date).any()
+            if back_dated or (events['Type'] == VOID_TYPE).any():
+                # Sells after a back-dated or cancelled event may have been matched against different lots
+                positions = Positions()
+                events, offset = _read_events(path)
+                events = _net_events(events)
+                _snapshot_events[key] = None
+            if not events.empty:
+                positions = _apply_events(positions, events, method)
+            positions.offset = offset
+            positions.head = head
+            positions.generation = generation
+
+            snapshot_events = _snapshot_events.get(key)
+            if snapshot_events is None or positions.events - snapshot_events >= SNAPSHOT_EVERY:
+                _write_snapshot(path, method, positions)
+                _snapshot_events[key] = positions.events
+
+        _positions[key] = positions
+        return positions
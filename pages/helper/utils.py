@@ -101,4 +101,21 @@ def color_highlighter(val: str) -> str:
     if val.startswith('-'):
         return 'color: rgba(255, 0, 0, 0.9);'
     else:
-        return None
\ No newline at end of file
+        return None
+
+
+def get_secret(name: str, default=None):
+    """
+    Returns a value from the Streamlit secrets, or a default if it is not configured.
+
+    Parameters:
+        name (str): Name of the secret.
+        default: Value returned when the secret or the secrets file is missing.
+
+    Returns:
+        The configured value, or the default.
+    """
+    try:
+        return st.secrets[name]
+    except (KeyError, FileNotFoundError):
+        return default
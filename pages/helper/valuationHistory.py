@@ -0,0 +1,145 @@
+"""
+This module analyses the history of valuation multiples returned by Finnhub basic financials (P/E, P/B, P/S and
+EV/EBITDA). Series are aligned on calendar quarters (or years), so the series of many symbols form one table, and
+the rolling mean, median, standard deviation bands, percentile and z-score of every column are computed in one
+pass over that table.
+"""
+
+# Import necessary libraries
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+VALUATION_SERIES = {
+    'peTTM': 'P/E (TTM)',
+    'pb': 'P/B',
+    'ps': 'P/S',
+    'psTTM': 'P/S (TTM)',
+    'evEbitdaTTM': 'EV/EBITDA (TTM)',
+}
+FREQUENCIES = {'quarterly': 'Q', 'annual': 'Y'}
+DEFAULT_WINDOW = 20 # periods in each rolling estimate
+MIN_PERIODS = 2 # periods needed before any statistic is reported
+BAND_WIDTH = 1.0 # standard deviations between the mean and each band
+STATISTICS = ['Value', 'Mean', 'Median', 'Std', 'Upper Band', 'Lower Band', 'Percentile', 'Z-Score']
+
+
+def series_history(payload: dict, series: Optional[List[str]] = None, frequency: str = 'quarterly') -> pd.DataFrame:
+    """
+    Extracts valuation series from a Finnhub basic financials payload.
+
+    Parameters:
+        payload (dict): Response of company_basic_financials.
+        series (list): Series to extract. Defaults to the keys of VALUATION_SERIES.
+        frequency (str): 'quarterly' or 'annual'.
+
+    Returns:
+        pd.DataFrame: One column per series found, indexed by the end of each calendar period, oldest first.
+    """
+    series = series if series is not None else list(VALUATION_SERIES)
+    raw = ((payload or {}).get('series') or {}).get(frequency) or {}
+    columns = {}
+    for name in series:
+        points = pd.DataFrame(raw.get(name) or [], columns=['period', 'v'])
+        dates = pd.to_datetime(points['period'], errors='coerce')
+        points = points.assign(period=dates).dropna(subset=['period'])
+        if points.empty:
+            continue
+        # Fiscal period dates differ between companies, so each point is moved to the end of its calendar period
+        periods = points['period'].dt.to_period(FREQUENCIES[frequency]).dt.to_timestamp(how='end').dt.normalize()
+        columns[name] = pd.to_numeric(points['v'], errors='coerce').groupby(periods.to_numpy()).last()
+    history = pd.DataFrame(columns)
+    history.index.name = 'Period'
+    return history.sort_index()
+
+
+def history_panel(payloads: Dict[str, dict], series: Optional[List[str]] = None,
+                  frequency: str = 'quarterly') -> pd.DataFrame:
+    """
+    Aligns the valuation series of many symbols in one table.
+
+    Parameters:
+        payloads (dict): Finnhub basic financials payload per symbol.
+        series (list): Series to extract. Defaults to the keys of VALUATION_SERIES.
+        frequency (str): 'quarterly' or 'annual'.
+
+    Returns:
+        pd.DataFrame: Columns are (symbol, series) pairs, indexed by period.
+    """
+    histories = {symbol: series_history(payload, series, frequency) for symbol, payload in payloads.items()}
+    histories = {symbol: history for symbol, history in histories.items() if not history.empty}
+    if not histories:
+        return pd.DataFrame(columns=pd.MultiIndex.from_tuples([], names=['Symbol', 'Series']))
+    panel = pd.concat(histories, axis=1, names=['Symbol', 'Series'])
+    return panel.sort_index()
+
+
+def rolling_statistics(history: pd.DataFrame, window: int = DEFAULT_WINDOW, min_periods: int = MIN_PERIODS,
+                       band_width: float = BAND_WIDTH) -> pd.DataFrame:
+    """
+    Computes rolling statistics of every column of a history table at once. Each statistic covers the trailing
+    window ending at its period; periods without a value are skipped.
+
+    Parameters:
+        history (pd.DataFrame): Values indexed by period, e.g. from series_history or history_panel.
+        window (int): Periods in each rolling window.
+        min_periods (int): Values needed in a window before statistics are reported.
+        band_width (float): Standard deviations between the mean and the upper and lower bands.
+
+    Returns:
+        pd.DataFrame: The input columns with one more column level holding the statistic (see STATISTICS). The
+        percentile is the share of the window at or below the value, between 0 and 1.
+    """
+    names = list(history.columns.names) + ['Statistic']
+    if history.columns.empty:
+        return pd.DataFrame(index=history.index, columns=pd.MultiIndex.from_tuples([], names=names))
+
+    values = history.astype('float64')
+    rolling = values.rolling(window, min_periods=min(min_periods, window))
+    mean = rolling.mean()
+    std = rolling.std()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        zscore = (values - mean) / std.where(std > 0)
+
+    statistics = pd.concat({
+        'Value': values,
+        'Mean': mean,
+        'Median': rolling.median(),
+        'Std': std,
+        'Upper Band': mean + band_width * std,
+        'Lower Band': mean - band_width * std,
+        'Percentile': rolling.rank(method='max', pct=True).where(values.notna()),
+        'Z-Score': zscore,
+    }, axis=1)
+
+    # Move the statistic to the last column level and keep the columns in the order of the input
+    statistics = statistics.reorder_levels(list(range(1, statistics.columns.nlevels)) + [0], axis=1)
+    keys = [column if isinstance(column, tuple) else (column,) for column in history.columns]
+    columns = pd.MultiIndex.from_tuples([(*key, stat) for key in keys for stat in STATISTICS], names=names)
+    return statistics.reindex(columns=columns)
+
+
+def latest_statistics(statistics: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns the statistics of the most recent period of every column that has a value.
+
+    Parameters:
+        statistics (pd.DataFrame): Result of rolling_statistics.
+
+    Returns:
+        pd.DataFrame: One row per input column, one column per statistic, plus the Period of the value.
+    """
+    # Period stays a date column even when no series has a value
+    dtypes = {'Period': 'datetime64[ns]', **dict.fromkeys(STATISTICS, 'float64')}
+    if statistics.columns.empty:
+        return pd.DataFrame(columns=list(dtypes)).astype(dtypes)
+    values = statistics.xs('Value', axis=1, level=-1)
+    latest = values.apply(pd.Series.last_valid_index).dropna()
+    rows = {}
+    for column, period in latest.items():
+        key = column if isinstance(column, tuple) else (column,)
+        rows[column] = [period, *statistics.loc[period, [(*key, stat) for stat in STATISTICS]].to_numpy()]
+    summary = pd.DataFrame(list(rows.values()), index=latest.index, columns=['Period'] + STATISTICS)
+    return summary.astype(dtypes)
@@ -0,0 +1,155 @@
+import threading
+import time
+
+import pytest
+
+from pages.helper import cache as cache_module
+from pages.helper.cache import DiskCache, disk_cached
+from pages.helper.concurrency import SingleFlight
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = DiskCache(str(tmp_path / 'cache.sqlite'))
+    monkeypatch.setattr(cache_module, '_default_cache', cache)
+    monkeypatch.setattr(cache_module, 'LEASE_POLL_INTERVAL', 0.01)
+    return cache
+
+
+def in_thread(func, *args):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(func(*args)))
+    thread.start()
+    thread.join(5)
+    return result[0]
+
+
+def make_older(cache, seconds):
+    with cache._connect() as conn:
+        conn.execute('UPDATE cache SET created_at = created_at - ?', (seconds,))
+
+
+def wait_until(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_lease_is_held_until_released_or_expired(cache):
+    assert cache.acquire_lease('key')
+    assert not in_thread(cache.acquire_lease, 'key')
+
+    # Only the holder can renew or release the lease
+    owner = cache.lease_owner()
+    assert cache.renew_lease('key', owner)
+    assert not cache.renew_lease('key', 'someone-else')
+    in_thread(cache.release_lease, 'key')
+    assert not in_thread(cache.acquire_lease, 'key')
+
+    cache.release_lease('key')
+    assert in_thread(cache.acquire_lease, 'key', 0)
+    # An expired lease is taken over, e.g. from a crashed process
+    time.sleep(0.01)
+    assert cache.acquire_lease('key')
+
+
+def test_single_flight_shares_one_call_between_concurrent_callers():
+    flights = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'value'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flights.do('key', fetch)))]
+    threads[0].start()
+    assert started.wait(5)
+    threads += [threading.Thread(target=lambda: results.append(flights.do('key', fetch))) for _ in range(3)]
+    for thread in threads[1:]:
+        thread.start()
+    # Give the other callers time to join the running call
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == ['value'] * 4
+    assert len(calls) == 1
+    # A finished call is not remembered
+    assert flights.do('key', lambda: 'again') == 'again'
+
+
+def test_failed_single_flight_call_is_raised_and_forgotten():
+    flights = SingleFlight()
+
+    def fail():
+        raise ValueError('bad')
+
+    with pytest.raises(ValueError):
+        flights.do('key', fail)
+    assert flights._calls == {}
+
+
+def test_stale_entries_are_served_while_they_refresh(cache):
+    values = iter(['first', 'second', 'third'])
+    calls = []
+
+    @disk_cached('test', ttl=60, stale_ttl=60)
+    def fetch(symbol):
+        calls.append(symbol)
+        return next(values)
+
+    assert fetch('AAA') == 'first'
+    assert fetch('AAA') == 'first'
+    assert calls == ['AAA']
+
+    # A stale entry is returned at once and refreshed in the background
+    make_older(cache, 90)
+    assert fetch('AAA') == 'first'
+    wait_until(lambda: cache.get('test:{"symbol": "AAA"}')[0] == 'second')
+    assert fetch('AAA') == 'second'
+
+    # An entry past the stale window is refetched before returning
+    make_older(cache, 200)
+    assert fetch('AAA') == 'third'
+    assert calls == ['AAA'] * 3
+
+
+def test_failed_refetch_serves_the_expired_entry_and_is_not_cached(cache):
+    values = iter(['first', None, 'third'])
+
+    @disk_cached('test', ttl=60)
+    def fetch(symbol):
+        return next(values)
+
+    assert fetch('AAA') == 'first'
+    make_older(cache, 90)
+    assert fetch('AAA') == 'first'
+    assert fetch('AAA') == 'third'
+
+
+def test_a_fetch_in_another_process_is_waited_for(cache):
+    calls = []
+
+    @disk_cached('test', ttl=60)
+    def fetch(symbol):
+        calls.append(symbol)
+        return 'mine'
+
+    # Another process holds the lease of the key while it fetches the value
+    key = 'test:{"symbol": "AAA"}'
+    assert in_thread(cache.acquire_lease, key)
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(fetch('AAA')))
+    waiter.start()
+    time.sleep(0.05)
+    cache.set(key, 'theirs', 'test')
+    waiter.join(5)
+
+    assert result == ['theirs']
+    assert calls == []
@@ -0,0 +1,47 @@
+import threading
+import time
+
+from pages.helper.concurrency import iter_concurrently, map_concurrently, run_concurrently
+
+
+def test_queued_calls_get_their_own_timeout():
+    # Each call takes most of its timeout, so only a per-call clock lets every one of them finish
+    results = map_concurrently(lambda x: time.sleep(0.15) or x * 2, range(6), max_workers=2, timeout=0.3)
+    assert results == [0, 2, 4, 6, 8, 10]
+
+
+def test_overrunning_calls_are_returned_as_default():
+    release = threading.Event()
+
+    def call(x):
+        if x == 0:
+            release.wait(5)
+        return x
+
+    started = time.monotonic()
+    try:
+        results = map_concurrently(call, range(4), max_workers=2, timeout=0.2, default='late')
+    finally:
+        release.set()
+    assert results == ['late', 1, 2, 3]
+    assert time.monotonic() - started < 2
+
+
+def test_queue_is_abandoned_once_every_worker_overruns():
+    release = threading.Event()
+    try:
+        outcomes = list(iter_concurrently(lambda x: release.wait(5), range(3), max_workers=2, timeout=0.2))
+    finally:
+        release.set()
+    assert len(outcomes) == 3
+    assert all(isinstance(error, TimeoutError) for _, _, error in outcomes)
+
+
+def test_task_errors_keep_the_task_order():
+    def fail():
+        raise ValueError('bad')
+
+    results = run_concurrently({'slow': lambda: time.sleep(0.1), 'fail': fail, 'ok': lambda: 1}, timeout=1)
+    assert results.data == {'ok': 1}
+    assert list(results.errors) == ['slow', 'fail']
+    assert results.errors['fail'] == 'bad'
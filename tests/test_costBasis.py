@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+
+from pages.helper.costBasis import COST_BASIS_METHODS, compute_cost_basis
+
+
+def interleaved_ledger():
+    # Buy 10 @ 10, sell 5 @ 12, then buy 10 @ 20 after the sale
+    return pd.DataFrame({
+        'Ticker': ['X', 'X', 'X'],
+        'Date': pd.to_datetime(['2025-01-15', '2025-02-15', '2025-03-15']),
+        'Shares': [10.0, -5.0, 10.0],
+        'Price': [10.0, 12.0, 20.0],
+    })
+
+
+@pytest.mark.parametrize('method', list(COST_BASIS_METHODS))
+def test_sell_only_consumes_lots_bought_before_it(method):
+    holdings = compute_cost_basis(interleaved_ledger(), method)
+
+    assert holdings.loc['X', 'Realized Gain'] == pytest.approx(10.0)
+    assert holdings.loc['X', 'Shares'] == pytest.approx(15.0)
+    assert holdings.loc['X', 'Total Cost'] == pytest.approx(250.0)
+
+
+@pytest.mark.parametrize('method', list(COST_BASIS_METHODS))
+def test_ledger_order_does_not_matter(method):
+    ledger = interleaved_ledger()
+    shuffled = ledger.iloc[[2, 0, 1]]
+
+    pd.testing.assert_frame_equal(compute_cost_basis(shuffled, method), compute_cost_basis(ledger, method))
+
+
+def oversold_ledger():
+    # The first sale exceeds the shares held, so it only consumes the first lot
+    return pd.DataFrame({
+        'Ticker': ['X'] * 5,
+        'Date': pd.to_datetime(['2025-01-01', '2025-01-02', '2025-01-03', '2025-01-04', '2025-01-05']),
+        'Shares': [10.0, -15.0, 10.0, 10.0, -5.0],
+        'Price': [1.0, 5.0, 2.0, 3.0, 5.0],
+    })
+
+
+@pytest.mark.parametrize('method, total_cost, realized', [
+    ('fifo', 40.0, 80.0),
+    ('lifo', 35.0, 75.0),
+    ('average', 37.5, 77.5),
+])
+def test_oversold_sale_only_consumes_the_shares_held(method, total_cost, realized):
+    holdings = compute_cost_basis(oversold_ledger(), method)
+
+    assert holdings.loc['X', 'Shares'] == pytest.approx(15.0)
+    assert holdings.loc['X', 'Total Cost'] == pytest.approx(total_cost)
+    assert holdings.loc['X', 'Realized Gain'] == pytest.approx(realized)
+
+
+def test_unknown_method_is_rejected():
+    with pytest.raises(ValueError):
+        compute_cost_basis(oversold_ledger(), 'hifo')
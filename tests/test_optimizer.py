@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pages.helper.optimizer import optimize_weights, portfolio_statistics
+
+
+TICKERS = ['A', 'B', 'C', 'D', 'E']
+SECTORS = pd.Series(['S1', 'S1', 'S2', 'S2', 'S3'], index=TICKERS)
+
+
+def inputs():
+    vol = np.array([0.10, 0.15, 0.30, 0.35, 0.40])
+    corr = np.array([
+        [1.0, 0.3, 0.2, 0.1, 0.0],
+        [0.3, 1.0, 0.2, 0.1, 0.0],
+        [0.2, 0.2, 1.0, 0.6, 0.5],
+        [0.1, 0.1, 0.6, 1.0, 0.5],
+        [0.0, 0.0, 0.5, 0.5, 1.0],
+    ])
+    cov = pd.DataFrame(np.outer(vol, vol) * corr, index=TICKERS, columns=TICKERS)
+    return pd.Series(0.08, index=TICKERS), cov
+
+
+def spread(weights, mean, cov):
+    contributions = portfolio_statistics(weights, mean, cov)['Risk Contribution']
+    return float(((contributions - contributions.mean()) ** 2).sum())
+
+
+def test_risk_parity_without_binding_limits_equalizes_contributions():
+    mean, cov = inputs()
+    weights = optimize_weights(mean, cov, 'risk_parity')
+
+    contributions = portfolio_statistics(weights, mean, cov)['Risk Contribution']
+    assert contributions.to_numpy() == pytest.approx(np.full(5, 0.2), abs=1e-6)
+
+
+def test_risk_parity_with_binding_limits_stays_as_equal_as_allowed():
+    mean, cov = inputs()
+    caps = {'S1': 0.5, 'S2': 0.5, 'S3': 0.5}
+    weights = optimize_weights(mean, cov, 'risk_parity', max_weight=0.4, sectors=SECTORS, sector_caps=caps)
+
+    assert weights.sum() == pytest.approx(1.0)
+    assert weights.max() <= 0.4 + 1e-9
+    assert weights.groupby(SECTORS).sum().max() <= 0.5 + 1e-9
+    assert (portfolio_statistics(weights, mean, cov)['Risk Contribution'] >= 0).all()
+
+    # No feasible portfolio on a coarse grid spreads the risk more evenly
+    grid = np.linspace(0.0, 0.4, 9)
+    best = np.inf
+    for a in grid:
+        for c in grid:
+            for e in grid:
+                candidate = pd.Series([a, 0.5 - a, c, 0.5 - c - e, e], index=TICKERS)
+                if 0 <= candidate['D'] <= 0.4 and 0.5 - a <= 0.4:
+                    best = min(best, spread(candidate, mean, cov))
+    assert spread(weights, mean, cov) <= best + 1e-12
@@ -0,0 +1,23 @@
+import pandas as pd
+
+from pages.helper.peerMetrics import FETCHED_AT, PeerMetricsStore, _normalize
+
+
+def test_streamed_rows_match_normalizing_the_whole_table(tmp_path):
+    store = PeerMetricsStore(str(tmp_path / 'metrics.parquet'))
+    rows = {}
+    for i in range(40):
+        metrics = {'peTTM': float(i), 'name': f'Company {i}', 'mixed': 'n/a' if i == 30 else float(i), 'empty': None}
+        store.add(f'S{i}', metrics, fetched_at=1.0)
+        rows[f'S{i}'] = {**metrics, FETCHED_AT: 1.0}
+        store.lookup([f'S{i}'])
+        if i == 20:
+            store.flush()
+    store.add('S3', {'peTTM': 99.0}, fetched_at=1.0)
+    rows['S3'] = {'peTTM': 99.0, FETCHED_AT: 1.0}
+
+    expected = pd.json_normalize(list(rows.values()))
+    expected.index = pd.Index(list(rows), name='symbol')
+    expected = _normalize(expected)
+    table = store.table().reindex(index=expected.index, columns=expected.columns)
+    pd.testing.assert_frame_equal(table, expected)
@@ -0,0 +1,91 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pages.helper import portfolio
+from pages.helper.portfolio import compute_nav, get_nav
+from pages.helper.priceStore import PRICE_COLUMNS, PriceStore
+
+
+TODAY = pd.Timestamp.today().normalize()
+DATES = pd.bdate_range(TODAY - pd.offsets.BDay(40), TODAY, name='Date')
+
+
+def events(*rows):
+    columns = ['Date', 'Type', 'Ticker', 'Shares', 'Price', 'Amount', 'Ratio']
+    return pd.DataFrame([dict(zip(columns, row)) for row in rows], columns=columns)
+
+
+TRANSACTIONS = events(
+    (DATES[0], 'buy', 'AAA', 10.0, 10.0, np.nan, np.nan),
+    (DATES[5], 'buy', 'BBB', 4.0, 50.0, np.nan, np.nan),
+    (DATES[10], 'split', 'AAA', np.nan, np.nan, np.nan, 2.0),
+    (DATES[20], 'sell', 'AAA', 6.0, 7.0, np.nan, np.nan),
+    (DATES[25], 'dividend', 'BBB', np.nan, np.nan, 3.0, np.nan),
+)
+
+
+def save_closes(store, ticker, closes):
+    store._save(ticker, pd.DataFrame({column: closes for column in PRICE_COLUMNS}, index=closes.index))
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(portfolio, 'NAV_CACHE_PATH', str(tmp_path / 'nav'))
+    store = PriceStore(str(tmp_path / 'prices'))
+    save_closes(store, 'AAA', pd.Series(np.linspace(10, 6, len(DATES)), index=DATES))
+    save_closes(store, 'BBB', pd.Series(np.linspace(50, 60, len(DATES)), index=DATES))
+    return store
+
+
+@pytest.fixture
+def revalued_from(monkeypatch):
+    # First date of every compute_nav call made by get_nav
+    starts = []
+
+    def recording(transactions, store=None, dates=None):
+        starts.append(dates[0])
+        return compute_nav(transactions, store, dates)
+
+    monkeypatch.setattr(portfolio, 'compute_nav', recording)
+    return starts
+
+
+def cached_file():
+    [name] = [name for name in os.listdir(portfolio.NAV_CACHE_PATH) if not name.endswith('-prices.parquet')]
+    return os.path.join(portfolio.NAV_CACHE_PATH, name)
+
+
+def test_nav_is_valued_from_split_adjusted_positions(store):
+    nav = compute_nav(TRANSACTIONS, store)
+
+    closes = store.close_matrix(['AAA', 'BBB'])
+    # Closes are split-adjusted, so the shares bought before the split are counted in post-split shares
+    assert nav['NAV'].loc[DATES[6]] == pytest.approx(20 * closes.loc[DATES[6], 'AAA'] + 4 * closes.loc[DATES[6], 'BBB'])
+    assert nav['NAV'].loc[DATES[-1]] == pytest.approx(14 * 6 + 4 * 60)
+    assert nav['Cost Basis'].iloc[-1] == pytest.approx(100 + 200 - 42 - 3)
+
+
+def test_cached_nav_only_revalues_days_after_the_last_cached_day(store, revalued_from):
+    full = get_nav(TRANSACTIONS, store)
+
+    # A series cached 10 business days ago is extended from its last day
+    pd.read_parquet(cached_file()).loc[:DATES[-11]].to_parquet(cached_file())
+    nav = get_nav(TRANSACTIONS, store)
+
+    assert revalued_from == [DATES[0], DATES[-11]]
+    pd.testing.assert_frame_equal(nav, full, check_freq=False)
+
+
+def test_cached_nav_is_revalued_from_the_first_corrected_price(store, revalued_from):
+    get_nav(TRANSACTIONS, store)
+
+    corrected = store.history('BBB')['Close'].copy()
+    corrected.loc[DATES[15]:] += 1.0
+    save_closes(store, 'BBB', corrected)
+    nav = get_nav(TRANSACTIONS, store)
+
+    assert revalued_from == [DATES[0], DATES[15]]
+    pd.testing.assert_frame_equal(nav, compute_nav(TRANSACTIONS, store), check_freq=False)
@@ -0,0 +1,53 @@
+import threading
+
+import pandas as pd
+
+from pages.helper.priceStore import PRICE_COLUMNS, PriceStore
+
+
+def bars(dates, close):
+    index = pd.DatetimeIndex(pd.to_datetime(dates), name='Date')
+    return pd.DataFrame({column: float(close) for column in PRICE_COLUMNS}, index=index)
+
+
+def test_failed_download_is_retried_on_the_next_refresh(tmp_path, monkeypatch):
+    store = PriceStore(str(tmp_path))
+    calls = []
+    results = [{}, {'AAA': bars(['2025-01-02', '2025-01-03'], 10)}]
+    monkeypatch.setattr(store, '_download', lambda tickers, start: calls.append(list(tickers)) or results.pop(0))
+
+    store.refresh(['AAA'])
+    assert store.history('AAA').empty
+
+    store.refresh(['AAA'])
+    assert len(store.history('AAA')) == 2
+
+    # A successful refresh is not repeated within the refresh interval
+    store.refresh(['AAA'])
+    assert calls == [['AAA'], ['AAA']]
+
+
+def test_tickers_being_downloaded_are_not_downloaded_again(tmp_path, monkeypatch):
+    store = PriceStore(str(tmp_path))
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def download(tickers, start):
+        calls.append(list(tickers))
+        if 'AAA' in tickers:
+            started.set()
+            release.wait(5)
+        return {ticker: bars(['2025-01-02'], 10) for ticker in tickers}
+
+    monkeypatch.setattr(store, '_download', download)
+    first = threading.Thread(target=store.refresh, args=(['AAA'],))
+    first.start()
+    assert started.wait(5)
+
+    # Another session only downloads the tickers that are not in flight
+    store.refresh(['AAA', 'BBB'])
+    release.set()
+    first.join(5)
+
+    assert calls == [['AAA'], ['BBB']]
+    assert not store.history('AAA').empty
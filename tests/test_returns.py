@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pages.helper import returns
+from pages.helper.returns import grouped_xirr, xirr, xirr_batch
+
+
+NAN = np.nan
+AMOUNTS = np.array([
+    [-100.0, 110.0, NAN],
+    [-100.0, 50.0, 60.0],
+    [-100.0, -50.0, 170.0],
+    [-100.0, 1.0, NAN],
+])
+YEARS = np.array([
+    [0.0, 1.0, NAN],
+    [0.0, 0.5, 1.0],
+    [0.0, 1.0, 2.0],
+    [0.0, 1.0, NAN],
+])
+
+
+@pytest.fixture
+def bisected(monkeypatch):
+    # Number of series handed to the bisection fallback
+    counts = []
+    bisect = returns._bisect
+    monkeypatch.setattr(returns, '_bisect', lambda amounts, years: counts.append(len(amounts)) or bisect(amounts, years))
+    return counts
+
+
+def test_padded_series_are_solved_together(bisected):
+    rates = xirr_batch(AMOUNTS, YEARS)
+
+    assert rates[0] == pytest.approx(0.1)
+    assert rates[3] == pytest.approx(-0.99)
+    npv = np.nansum(AMOUNTS * (1 + rates[:, None]) ** -YEARS, axis=1)
+    assert npv == pytest.approx(np.zeros(4), abs=1e-6)
+    # Newton's method leaves the valid range on the last series only
+    assert bisected == [1]
+
+
+def test_bisection_finds_the_same_rates_as_newton(monkeypatch):
+    newton = xirr_batch(AMOUNTS, YEARS)
+    monkeypatch.setattr(returns, 'NEWTON_ITERATIONS', 0)
+
+    assert xirr_batch(AMOUNTS, YEARS) == pytest.approx(newton, abs=1e-8)
+
+
+def test_series_without_a_sign_change_have_no_rate(bisected):
+    rates = xirr_batch([[100.0, 50.0], [-100.0, -50.0], [NAN, NAN]], [[0.0, 1.0], [0.0, 1.0], [NAN, NAN]])
+
+    assert np.isnan(rates).all()
+    assert bisected == []
+
+
+def test_grouped_xirr_matches_each_series_on_its_own():
+    flows = pd.DataFrame({
+        'Ticker': ['AAA', 'BBB', 'AAA', 'BBB', 'BBB'],
+        'Date': pd.to_datetime(['2023-01-01', '2023-03-01', '2024-01-01', '2023-09-01', '2024-03-01']),
+        'Amount': [-100.0, -50.0, 120.0, -50.0, 110.0],
+    })
+    rates = grouped_xirr(flows)
+
+    for ticker, group in flows.groupby('Ticker'):
+        assert rates[ticker] == pytest.approx(xirr(group.set_index('Date')['Amount']))
+    assert rates['AAA'] == pytest.approx(0.2)
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pages.helper.risk import PORTFOLIO, TRADING_DAYS, compute_risk
+
+
+DATES = pd.bdate_range('2023-01-02', periods=300)
+
+
+def market():
+    rng = np.random.default_rng(7)
+    benchmark_returns = rng.normal(0.0004, 0.01, len(DATES) - 1)
+    noise = rng.normal(0.0, 0.01, len(DATES) - 1)
+
+    def prices(daily):
+        return 100 * np.concatenate([[1.0], np.cumprod(1 + daily)])
+
+    closes = pd.DataFrame({
+        'AAA': prices(2 * benchmark_returns),
+        'BBB': prices(0.5 * benchmark_returns + noise),
+    }, index=DATES)
+    return closes, pd.Series(prices(benchmark_returns), index=DATES)
+
+
+def test_statistics_match_column_by_column_references():
+    closes, benchmark = market()
+    shares = pd.Series({'AAA': 10.0, 'BBB': 30.0})
+    report = compute_risk(closes, shares, benchmark, lookback=250)
+
+    prices = closes.assign(**{PORTFOLIO: closes @ shares}).iloc[-251:]
+    returns = prices.pct_change().iloc[1:]
+    benchmark_returns = benchmark.pct_change().reindex(returns.index)
+    for column in returns:
+        r = returns[column]
+        assert report.volatility[column] == pytest.approx(r.std() * np.sqrt(TRADING_DAYS))
+        assert report.beta[column] == pytest.approx(r.cov(benchmark_returns) / benchmark_returns.var())
+        assert report.var.loc[column, 'Historical'] == pytest.approx(-r.quantile(0.05))
+        assert report.cvar.loc[column, 'Historical'] == pytest.approx(-r[r <= r.quantile(0.05)].mean())
+        assert report.max_drawdown[column] == pytest.approx((prices[column] / prices[column].cummax() - 1).min())
+
+    # AAA moves twice as much as the benchmark
+    assert report.beta['AAA'] == pytest.approx(2.0)
+    assert report.value == pytest.approx(float(closes.iloc[-1] @ shares))
+    assert report.weights.sum() == pytest.approx(1.0)
+    pd.testing.assert_frame_equal(report.covariance, returns[['AAA', 'BBB']].cov() * TRADING_DAYS)
+
+
+def test_parametric_var_is_a_normal_quantile():
+    closes, _ = market()
+    report = compute_risk(closes, pd.Series({'AAA': 1.0}))
+
+    returns = closes['AAA'].pct_change().iloc[-252:]
+    assert report.var.loc['AAA', 'Parametric'] == pytest.approx(-(returns.mean() - 1.6448536 * returns.std()))
+    assert report.cvar.loc['AAA', 'Parametric'] > report.var.loc['AAA', 'Parametric']
+    assert report.beta.isna().all()
+
+
+def test_holdings_without_prices_are_left_out():
+    closes, benchmark = market()
+    # BBB starts trading late, and CCC has no stored prices at all
+    closes.loc[:DATES[99], 'BBB'] = np.nan
+    closes['CCC'] = np.nan
+    report = compute_risk(closes, pd.Series({'AAA': 1.0, 'BBB': 1.0, 'CCC': 1.0}), benchmark)
+
+    assert list(report.weights.index) == ['AAA', 'BBB']
+    assert len(report.rolling_volatility) == len(DATES) - 101
+
+
+def test_too_little_history_is_rejected():
+    closes, _ = market()
+    with pytest.raises(ValueError):
+        compute_risk(closes.iloc[:1], pd.Series({'AAA': 1.0}))
@@ -0,0 +1,160 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from pages.helper import ledger, transactionLog
+from pages.helper.transactionLog import append_transaction, load_positions, load_transactions
+
+
+OPEN_TRADES = [
+    {'ticker': 'AAA', 'company': 'Alpha', 'date': '2024-01-10', 'shares': 10, 'cost_share': 10.0},
+    {'ticker': 'BBB', 'company': 'Beta', 'date': '2024-02-10', 'shares': 5, 'cost_share': 20.0},
+    {'ticker': 'S&P 500', 'company': 'Index', 'date': '2024-02-10', 'shares': 1, 'cost_share': 5000.0},
+]
+PAST_TRADES = [
+    {'ticker': 'CCC', 'entry_date': '2024-01-05', 'entry_price': 30.0, 'share_number': 4,
+     'sell_date': '2024-03-01', 'sell_price': 35.0},
+]
+
+
+def write_ledger(path, records):
+    with open(path, 'w') as f:
+        json.dump(records, f)
+    # Make every edit visible to the size and modification time fingerprint
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+@pytest.fixture
+def log_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('data')
+    cache = str(tmp_path / 'cache')
+    monkeypatch.setattr(ledger, 'LEDGER_CACHE_PATH', cache)
+    monkeypatch.setattr(transactionLog, 'LEDGER_CACHE_PATH', cache)
+    monkeypatch.setattr(transactionLog, '_positions', {})
+    monkeypatch.setattr(transactionLog, '_snapshot_events', {})
+    write_ledger(ledger.TRADES_PATH, OPEN_TRADES)
+    write_ledger(ledger.PAST_TRADES_PATH, PAST_TRADES)
+    return tmp_path
+
+
+def fresh_holdings(method='fifo'):
+    # Positions replayed from the whole log, without the positions or snapshots computed so far
+    transactionLog._positions.clear()
+    transactionLog._snapshot_events.clear()
+    for name in os.listdir(transactionLog.LEDGER_CACHE_PATH):
+        if '-snapshot-' in name:
+            os.remove(os.path.join(transactionLog.LEDGER_CACHE_PATH, name))
+    return load_positions(method).holdings()
+
+
+def test_ledgers_are_imported_without_untradable_symbols(log_dir):
+    transactions = load_transactions()
+
+    assert sorted(transactions['Ticker'].unique()) == ['AAA', 'BBB', 'CCC']
+    holdings = load_positions().holdings()
+    assert holdings.loc['AAA', 'Shares'] == 10
+    assert holdings.loc['CCC', 'Shares'] == 0
+    assert holdings.loc['CCC', 'Realized Gain'] == pytest.approx(20.0)
+
+
+def test_appended_transactions_are_applied(log_dir):
+    load_positions()
+    append_transaction('sell', 'AAA', '2024-04-01', shares=4, price=15.0)
+    append_transaction('dividend', 'BBB', '2024-04-15', amount=3.0)
+
+    holdings = load_positions().holdings()
+    assert holdings.loc['AAA', 'Shares'] == 6
+    assert holdings.loc['AAA', 'Realized Gain'] == pytest.approx(20.0)
+    assert holdings.loc['BBB', 'Dividends'] == pytest.approx(3.0)
+    assert len(load_transactions()) == 6
+
+
+def test_append_transaction_rejects_incomplete_events(log_dir):
+    with pytest.raises(ValueError):
+        append_transaction('buy', 'AAA', '2024-04-01', shares=1)
+    with pytest.raises(ValueError):
+        append_transaction('transfer', 'AAA', '2024-04-01')
+
+
+@pytest.mark.parametrize('snapshot_every', [1, 1000])
+def test_incremental_replay_matches_a_full_replay(log_dir, monkeypatch, snapshot_every):
+    monkeypatch.setattr(transactionLog, 'SNAPSHOT_EVERY', snapshot_every)
+    load_positions('lifo')
+    append_transaction('buy', 'AAA', '2024-05-01', shares=10, price=20.0)
+    load_positions('lifo')
+    append_transaction('sell', 'AAA', '2024-06-01', shares=5, price=25.0)
+    load_positions('lifo')
+    # Dated before the sell, so the sell must be matched against it under LIFO
+    append_transaction('buy', 'AAA', '2024-05-15', shares=5, price=30.0)
+    incremental = load_positions('lifo').holdings()
+
+    assert incremental.loc['AAA', 'Realized Gain'] == pytest.approx(-25.0)
+    pd.testing.assert_frame_equal(incremental, fresh_holdings('lifo'))
+
+
+def test_snapshot_is_reused_after_a_restart(log_dir, monkeypatch):
+    monkeypatch.setattr(transactionLog, 'SNAPSHOT_EVERY', 1)
+    load_positions()
+    append_transaction('buy', 'BBB', '2024-05-01', shares=5, price=22.0)
+    before = load_positions()
+
+    # A new process starts from the snapshot on disk and has nothing left to replay
+    transactionLog._positions.clear()
+    transactionLog._snapshot_events.clear()
+    after = load_positions()
+    assert after.offset == before.offset
+    assert after.events == before.events
+    pd.testing.assert_frame_equal(after.holdings(), before.holdings())
+
+
+def test_editing_a_ledger_appends_corrections(log_dir):
+    load_positions()
+    append_transaction('buy', 'AAA', '2024-05-01', shares=2, price=12.0)
+    load_positions()
+    with open(transactionLog.TRANSACTIONS_PATH, 'rb') as f:
+        logged = f.read()
+
+    edited = [dict(OPEN_TRADES[0], shares=20)] + OPEN_TRADES[2:]
+    write_ledger(ledger.TRADES_PATH, edited)
+    holdings = load_positions().holdings()
+
+    # Lines already in the log are kept, and the edit is appended
+    with open(transactionLog.TRANSACTIONS_PATH, 'rb') as f:
+        assert f.read().startswith(logged)
+    assert holdings.loc['AAA', 'Shares'] == 22
+    assert 'BBB' not in holdings.index
+    pd.testing.assert_frame_equal(holdings, fresh_holdings())
+
+    transactions = load_transactions()
+    assert (transactions['Type'] != transactionLog.VOID_TYPE).all()
+    assert sorted(transactions.loc[transactions['Ticker'] == 'AAA', 'Shares']) == [2.0, 20.0]
+
+
+def test_identical_ledger_entries_are_kept_apart(log_dir):
+    write_ledger(ledger.TRADES_PATH, [OPEN_TRADES[0], OPEN_TRADES[0]])
+    assert load_positions().holdings().loc['AAA', 'Shares'] == 20
+
+    write_ledger(ledger.TRADES_PATH, [OPEN_TRADES[0]])
+    assert load_positions().holdings().loc['AAA', 'Shares'] == 10
+
+
+def test_positions_of_a_rewritten_log_are_discarded(log_dir, monkeypatch):
+    monkeypatch.setattr(transactionLog, 'SNAPSHOT_EVERY', 1)
+    load_positions()
+
+    # A log written before imported trades were tagged is migrated by rewriting it
+    events = load_transactions().drop(columns=['Source', 'Id'])
+    events = events.rename(columns={name: key for key, (name, _) in transactionLog.EVENT_COLUMNS.items()})
+    with open(transactionLog.TRANSACTIONS_PATH, 'w') as f:
+        f.writelines(transactionLog._format_event(event) for event in events.to_dict('records'))
+        f.write(transactionLog._format_event({'date': pd.Timestamp('2024-05-01'), 'type': 'buy', 'ticker': 'BBB',
+                                              'shares': 1.0, 'price': 25.0}))
+    write_ledger(ledger.TRADES_PATH, OPEN_TRADES)
+
+    holdings = load_positions().holdings()
+    assert holdings.loc['BBB', 'Shares'] == 6
+    pd.testing.assert_frame_equal(holdings, fresh_holdings())
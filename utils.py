@@ -1,9 +1,28 @@
 import streamlit as st
+import pandas as pd
+import yfinance as yf
+from pages.helper.httpClient import http_get
 
 @st.cache_data(ttl=3600)
 def fetch_api(url):
-    import requests
-    return requests.get(url).json()
+    return http_get(url).json()
+
+def get_earnings_date(ticker):
+    # Look up the next earnings date from the Yahoo Finance calendar
+    try:
+        cal = yf.Ticker(ticker).calendar
+        if isinstance(cal, dict):
+            ed = cal.get("Earnings Date", ["N/A"])
+            earnings_date = ed[0] if isinstance(ed, list) else ed
+        elif isinstance(cal, pd.DataFrame):
+            # Ensure index exists before accessing
+            earnings_date = cal.loc["Earnings Date"].values[0] if "Earnings Date" in cal.index else "N/A"
+        else:
+            earnings_date = "N/A"
+    except Exception:
+        earnings_date = "N/A"
+
+    return str(earnings_date)
 
 def highlight_gains(val):
     try: